@@ -1,8 +1,12 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from datetime import datetime
 import json
+from utils.helpers import format_crisis_resources, get_chat_pipeline, init_session_state, persist_session_state, trace_page
+from utils.messages import Message, Role
+from utils.analytics import get_current_streak, get_mood_forecaster
+from utils.forecast import DETERIORATION_ALERT
+from utils.tracing import span
 
 # Load environment variables
 load_dotenv()
@@ -71,35 +75,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize services
-@st.cache_resource
-def init_services():
-    from services.firebase_service import FirebaseService
-    from services.gemini_service import GeminiService
-    
-    firebase = FirebaseService()
-    gemini = GeminiService()
-    
-    return firebase, gemini
-
-# Initialize session state
-def init_session_state():
-    if 'user_id' not in st.session_state:
-        st.session_state.user_id = f"user_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    
-    if 'conversation_history' not in st.session_state:
-        st.session_state.conversation_history = []
-    
-    if 'current_mood' not in st.session_state:
-        st.session_state.current_mood = 'neutral'
-    
-    if 'user_profile' not in st.session_state:
-        st.session_state.user_profile = {
-            'name': 'Friend',
-            'preferences': [],
-            'goals': []
-        }
-
 def main():
     init_session_state()
     
@@ -113,7 +88,7 @@ def main():
     """, unsafe_allow_html=True)
     
     # Sidebar navigation
-    with st.sidebar:
+    with st.sidebar, span('render.sidebar'):
         st.title("🧠 MindMate")
         st.write(f"Hello, {st.session_state.user_profile['name']}!")
         
@@ -134,6 +109,7 @@ def main():
             "😔 Down": "negative"
         }
         st.session_state.current_mood = mood_mapping.get(mood, "neutral")
+        persist_session_state()
         
         # Quick stats
         st.subheader("Your Stats")
@@ -143,7 +119,12 @@ def main():
             st.metric("Conversations", len(st.session_state.conversation_history))
         
         with col2:
-            st.metric("Current Streak", "3 days")
+            streak = get_current_streak()
+            st.metric("Current Streak", f"{streak} day{'s' if streak != 1 else ''}")
+        
+        forecast = get_mood_forecaster().forecast()
+        if forecast is not None and forecast['deterioration'] >= DETERIORATION_ALERT:
+            st.info("🔮 Tomorrow may be a tougher day. An exercise today could help.")
         
         # Quick actions
         st.subheader("Quick Actions")
@@ -158,24 +139,24 @@ def main():
     
     # Initialize services
     try:
-        firebase, gemini = init_services()
+        pipeline = get_chat_pipeline()
         
         # Display conversation history
         chat_container = st.container()
         
-        with chat_container:
+        with chat_container, span('render.history', messages=len(st.session_state.conversation_history)):
             if st.session_state.conversation_history:
-                for message in st.session_state.conversation_history[-10:]:  # Show last 10 messages
-                    if message['role'] == 'user':
+                for message in st.session_state.conversation_history.tail(10):  # Show last 10 messages
+                    if message.is_user:
                         st.markdown(f"""
                         <div class="chat-message user-message">
-                            <strong>You:</strong> {message['content']}
+                            <strong>You:</strong> {message.content}
                         </div>
                         """, unsafe_allow_html=True)
                     else:
                         st.markdown(f"""
                         <div class="chat-message ai-message">
-                            <strong>🧠 MindMate:</strong> {message['content']}
+                            <strong>🧠 MindMate:</strong> {message.content}
                         </div>
                         """, unsafe_allow_html=True)
             else:
@@ -186,52 +167,52 @@ def main():
                 </div>
                 """, unsafe_allow_html=True)
         
+        if st.session_state.get('crisis_resources'):
+            st.error(format_crisis_resources(st.session_state.crisis_resources))
+        
         # Chat input
         user_input = st.chat_input("Share what's on your mind...")
         
         if user_input:
-            # Add user message to history
-            st.session_state.conversation_history.append({
-                'role': 'user',
-                'content': user_input,
-                'timestamp': datetime.now(),
-                'mood': st.session_state.current_mood
-            })
-            
             # Generate AI response
             with st.spinner("MindMate is thinking..."):
                 try:
-                    ai_response = gemini.generate_response(
+                    ai_response = pipeline.run(
                         user_input,
                         st.session_state.conversation_history,
-                        st.session_state.current_mood
-                    )
-                    
-                    # Add AI response to history
-                    st.session_state.conversation_history.append({
-                        'role': 'assistant',
-                        'content': ai_response['response'],
-                        'timestamp': datetime.now(),
-                        'mood_detected': ai_response.get('mood_detected', 'neutral'),
-                        'events': ai_response.get('events', [])
-                    })
-                    
-                    # Save to Firebase
-                    firebase.save_conversation(
-                        st.session_state.user_id,
-                        user_input,
-                        ai_response
+                        st.session_state.current_mood,
+                        user_id=st.session_state.user_id,
+                        profile=st.session_state.user_profile
                     )
                     
-                    # Update mood if detected
-                    if ai_response.get('mood_detected'):
-                        st.session_state.current_mood = ai_response['mood_detected']
-                    
-                    # Show exercise suggestion if needed
-                    if ai_response.get('needs_exercise'):
-                        st.info("💡 I think some wellness exercises might help you feel better. Check out the Exercises page!")
-                    
-                    st.rerun()
+                    if ai_response.get('error'):
+                        st.warning(ai_response['error'])
+                    else:
+                        # Shown under the chat until a turn without a crisis replaces it
+                        st.session_state.crisis_resources = ai_response.get('crisis_resources')
+                        
+                        # Add both sides of the turn to history
+                        st.session_state.conversation_history.append(Message.create(
+                            Role.USER,
+                            user_input,
+                            mood=st.session_state.current_mood,
+                            timestamp=ai_response.get('timestamp')
+                        ))
+                        st.session_state.conversation_history.append(Message.create(
+                            Role.ASSISTANT,
+                            ai_response['response'],
+                            mood=ai_response.get('mood_detected', 'neutral'),
+                            needs_exercise=ai_response.get('needs_exercise', False),
+                            events=ai_response.get('events', []),
+                            timestamp=ai_response.get('timestamp')
+                        ))
+                        
+                        # Update mood if detected
+                        if ai_response.get('mood_detected'):
+                            st.session_state.current_mood = ai_response['mood_detected']
+                        
+                        persist_session_state()
+                        st.rerun()
                     
                 except Exception as e:
                     st.error(f"Sorry, I had trouble processing that. Error: {str(e)}")
@@ -239,12 +220,17 @@ def main():
                     # Fallback response
                     fallback_response = "I'm here to listen and support you. Sometimes I have technical difficulties, but I care about your wellbeing. Can you tell me more about how you're feeling?"
                     
-                    st.session_state.conversation_history.append({
-                        'role': 'assistant',
-                        'content': fallback_response,
-                        'timestamp': datetime.now()
-                    })
+                    st.session_state.conversation_history.append(Message.create(
+                        Role.USER,
+                        user_input,
+                        mood=st.session_state.current_mood
+                    ))
+                    st.session_state.conversation_history.append(Message.create(
+                        Role.ASSISTANT,
+                        fallback_response
+                    ))
                     
+                    persist_session_state()
                     st.rerun()
     
     except Exception as e:
@@ -253,30 +239,30 @@ def main():
         
         # Basic offline chat
         if st.session_state.conversation_history:
-            for message in st.session_state.conversation_history[-5:]:
-                if message['role'] == 'user':
-                    st.chat_message("user").write(message['content'])
+            for message in st.session_state.conversation_history.tail(5):
+                if message.is_user:
+                    st.chat_message("user").write(message.content)
                 else:
-                    st.chat_message("assistant").write(message['content'])
+                    st.chat_message("assistant").write(message.content)
         
         user_input = st.chat_input("Share what's on your mind...")
         if user_input:
-            st.session_state.conversation_history.append({
-                'role': 'user',
-                'content': user_input,
-                'timestamp': datetime.now()
-            })
+            st.session_state.conversation_history.append(Message.create(
+                Role.USER,
+                user_input
+            ))
             
             # Simple offline response
             offline_response = f"Thank you for sharing that with me. I understand you're feeling {st.session_state.current_mood}. I'm here to listen and support you, even when my AI features aren't working perfectly."
             
-            st.session_state.conversation_history.append({
-                'role': 'assistant',
-                'content': offline_response,
-                'timestamp': datetime.now()
-            })
+            st.session_state.conversation_history.append(Message.create(
+                Role.ASSISTANT,
+                offline_response
+            ))
             
+            persist_session_state()
             st.rerun()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with trace_page('home'):
+        main()
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""Analytics figure payloads: JSON size and build time by history length
+
+Run from the repository root:
+
+    python benchmarks/bench_charts.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_timeline import make_daily
+
+from utils.analytics import _trend_figure
+from utils.chart_data import TREND_RANGES, zoom_window
+
+SIZES = (365, 3650, 36500)
+
+def main():
+    for size in SIZES:
+        daily = make_daily(size)
+        print(f"{size} days")
+        for label, days in TREND_RANGES.items():
+            window = zoom_window(daily, days)
+            seconds = min(timeit.repeat(lambda: _trend_figure(window), number=1, repeat=3))
+            payload = len(_trend_figure(window).to_json())
+            print(f"  {label:<14} {payload / 1024:8.1f} KiB {seconds * 1000:8.2f} ms")
+
+if __name__ == '__main__':
+    main()
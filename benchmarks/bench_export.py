@@ -0,0 +1,73 @@
+"""Analytics exports: per-entry CSV vs the daily CSV, Parquet and Arrow IPC files
+
+Run from the repository root:
+
+    python benchmarks/bench_export.py
+"""
+import io
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.export import DailyExport, EXPORT_MOODS, iter_pages, spool_daily_export
+
+YEARS = (1, 10)
+ENTRIES_PER_DAY = 4
+MOODS = EXPORT_MOODS[:5]
+
+def make_history(days, seed=11):
+    rng = np.random.default_rng(seed)
+    now = datetime.now()
+    count = days * ENTRIES_PER_DAY
+    offsets = rng.integers(0, days * 24 * 60, count)
+    return [
+        {'mood': MOODS[code], 'description': '', 'timestamp': now - timedelta(minutes=int(minutes)),
+         'date': (now - timedelta(minutes=int(minutes))).date().isoformat()}
+        for code, minutes in zip(rng.integers(0, len(MOODS), count), offsets)
+    ]
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def main():
+    loaders = {
+        'csv': lambda data: pd.read_csv(io.BytesIO(data)),
+        'csv.gz': lambda data: pd.read_csv(io.BytesIO(data), compression='gzip'),
+        'parquet': lambda data: pd.read_parquet(io.BytesIO(data)),
+        'arrow': lambda data: pa.ipc.open_file(pa.BufferReader(data)).read_pandas()
+    }
+
+    for years in YEARS:
+        history = make_history(years * 365)
+        print(f"{years} year(s), {len(history)} entries")
+
+        raw, seconds = timed(lambda: pd.DataFrame(history).to_csv(index=False).encode())
+        _, load = timed(lambda: loaders['csv'](raw))
+        print(f"  {'entry csv':<10} {len(raw) / 1024:9.1f} KiB  write {seconds * 1000:7.1f} ms  load {load * 1000:6.1f} ms")
+
+        def daily_frame():
+            daily = DailyExport()
+            for page in iter_pages(history):
+                daily.add_mood_page(page)
+            return daily.to_frame()
+
+        frame, aggregate = timed(daily_frame)
+        print(f"  {'aggregate':<10} {len(frame):9d} days  {aggregate * 1000:13.1f} ms")
+
+        for label, fmt, compress in (('csv', 'csv', False), ('csv.gz', 'csv', True),
+                                     ('parquet', 'parquet', False), ('arrow', 'arrow', False)):
+            data, seconds = timed(lambda: spool_daily_export(frame, fmt, compress=compress).read())
+            _, load = timed(lambda: loaders[label](data))
+            print(f"  {label:<10} {len(data) / 1024:9.1f} KiB  write {seconds * 1000:7.1f} ms  load {load * 1000:6.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Recent Activity timeline: per-row markup vs the single-pass timeline_html
+
+Run from the repository root:
+
+    python benchmarks/bench_timeline.py
+"""
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.analytics import MOOD_COLORS
+from utils.analytics_engine import build_observations, daily_scores
+from utils.chat_renderer import MOOD_EMOJIS
+from utils.timeline import timeline_days, timeline_html
+
+SIZES = (365, 3650)
+MOODS = ('positive', 'neutral', 'anxious', 'stressed', 'negative')
+
+def make_daily(days, seed=7):
+    rng = np.random.default_rng(seed)
+    now = datetime.now()
+    history = [
+        {'mood': MOODS[code], 'description': '', 'timestamp': now - timedelta(days=int(day))}
+        for day, code in zip(range(days - 1, -1, -1), rng.integers(0, len(MOODS), days))
+    ]
+    return daily_scores(build_observations(history, ()))
+
+def per_row_html(days):
+    """The old page loop: iterrows, inline styles and strftime for each entry"""
+    chunks = []
+    for day, row in days.iterrows():
+        mood_emoji = dict(MOOD_EMOJIS)
+        color = MOOD_COLORS[row['mood']]
+        chunks.append(f"""
+        <div style="
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            padding: 10px;
+            margin: 5px 0;
+            border-left: 4px solid {color};
+            background: #f8f9fa;
+            border-radius: 5px;
+        ">
+            <span><strong>{day.strftime('%B %d, %Y')}</strong></span>
+            <span style="color: {color};">
+                {mood_emoji[row['mood']]} {row['mood'].title()}
+            </span>
+        </div>
+        """)
+    return chunks
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"  {label:<14} {seconds * 1000:8.2f} ms")
+
+def main():
+    for size in SIZES:
+        days = timeline_days(make_daily(size), None)
+        number = max(1, 3650 // size)
+        print(f"{len(days)} entries")
+        bench('per-row', lambda: per_row_html(days), number)
+        bench('timeline_html', lambda: timeline_html(days, MOOD_COLORS), number)
+        print(f"  {'elements':<14} {len(days):8d} -> 1")
+        print(f"  {'html bytes':<14} {sum(map(len, per_row_html(days))):8d} -> {len(timeline_html(days, MOOD_COLORS))}")
+
+if __name__ == '__main__':
+    main()
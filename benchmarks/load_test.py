@@ -0,0 +1,391 @@
+"""Load test: many simulated users driving MindMate at the same time
+
+Run from the repository root:
+
+    python benchmarks/load_test.py --sessions 200
+    python benchmarks/load_test.py --sessions 500 --concurrency 100 --turns 3 --think 1.0 --output load.json
+
+Each session is one user with a stored history. The user chats and switches
+mood on the home page, then chats on the Chat page. They run an exercise,
+open Analytics and change its ranges, visit Profile, and go back home.
+Every page runs through Streamlit's AppTest in this one process, so the
+sessions share caches, the task executor and the session store as they
+would on one server node. Gemini and Firestore are the in-process stand-ins
+from services.local_services, with configurable latency. Alternatively they
+can be replayed from a cassette (services.cassette) recorded by an earlier
+run, which makes runs repeatable:
+
+    python benchmarks/load_test.py --sessions 50 --record load.cassette
+    python benchmarks/load_test.py --sessions 50 --replay load.cassette --replay-speed fast
+
+The report gives rerun latency percentiles per page and action, plus
+throughput. It also gives the resident memory added per live session. That
+figure is an upper bound, because it includes AppTest's copy of each
+page's element tree.
+"""
+import argparse
+import functools
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+from urllib import parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import streamlit as st
+from streamlit import source_util
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.runtime.scriptrunner import RerunData
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.element_tree import parse_tree_from_messages
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+from services.cassette import FAST_SPEED, RECORD, RECORDED_SPEED, REPLAY, cassette_from_env
+
+MAIN_SCRIPT = 'app.py'
+
+PAGES = {
+    'home': MAIN_SCRIPT,
+    'chat': 'pages/1_💬_Chat.py',
+    'exercises': 'pages/2_🧘_Exercises.py',
+    'analytics': 'pages/3_📊_Analytics.py',
+    'profile': 'pages/4_👤_Profile.py'
+}
+
+MOOD_LABELS = ("😊 Happy", "😐 Neutral", "😰 Anxious", "😤 Stressed", "😔 Down")
+
+CHAT_MESSAGES = (
+    "I'm really anxious about my job interview tomorrow.",
+    "Work has been overwhelming with the deadline on Friday.",
+    "Had a great walk and feel much better today.",
+    "My doctor appointment is next week, I'm a bit worried.",
+    "I feel down and tired, nothing seems to help.",
+    "Just a normal day, nothing special."
+)
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Seconds one rerun may take before it counts as failed
+RERUN_TIMEOUT = 120
+
+SCRIPT_CACHE = ScriptCache()
+
+class _ScriptRunner(LocalScriptRunner):
+    """LocalScriptRunner that runs one page of the app and follows st.rerun()"""
+
+    def __init__(self, script_path, session_state, page_script_hash=''):
+        super().__init__(script_path, session_state)
+        self.page_script_hash = page_script_hash
+        # Compile each page once for all sessions, as the server does
+        self._script_cache = SCRIPT_CACHE
+
+    def run(self, widget_state=None, query_params=None, timeout=RERUN_TIMEOUT):
+        self.request_rerun(RerunData(
+            widget_states=widget_state,
+            query_string=parse.urlencode(query_params or {}, doseq=True),
+            page_script_hash=self.page_script_hash
+        ))
+        self.start()
+
+        # AppTest polls every 100 ms; joining times the run exactly. The
+        # thread ends once no rerun is pending, so st.rerun() is followed.
+        self._script_thread.join(timeout)
+        if self._script_thread.is_alive():
+            self.request_stop()
+            self.join()
+            raise RuntimeError(f"Script run timed out after {timeout}s")
+
+        # Keep only what the last run drew
+        messages = self.forward_msgs()
+        starts = [i for i, msg in enumerate(messages) if msg.WhichOneof('type') == 'new_session']
+        return parse_tree_from_messages(messages[starts[-1] if starts else 0:])
+
+class LoadAppTest(AppTest):
+    """AppTest for one browser session of the multipage app
+
+    AppTest.run installs a mock runtime for each run and removes it at the
+    end, which breaks any run still going in another thread, and it can only
+    run the main script. Here one runtime serves all sessions (see
+    install_runtime) and page picks the page to run, as the sidebar does.
+    """
+
+    def __init__(self, timeout=RERUN_TIMEOUT):
+        super().__init__(os.path.join(ROOT, MAIN_SCRIPT), default_timeout=timeout)
+        self.page = 'home'
+
+    def _run(self, widget_state=None, timeout=None):
+        script_runner = _ScriptRunner(self._script_path, self.session_state, page_hashes()[self.page])
+        self._tree = script_runner.run(widget_state, self.query_params, timeout or self.default_timeout)
+        self._tree._runner = self
+        self.query_params = parse.parse_qs(script_runner.event_data[-1]['client_state'].query_string)
+        return self
+
+@functools.lru_cache(maxsize=None)
+def page_hashes():
+    """Page name -> page_script_hash, as Streamlit numbers the app's pages"""
+    scripts = {os.path.basename(page['script_path']): page['page_script_hash']
+               for page in source_util.get_pages(os.path.join(ROOT, MAIN_SCRIPT)).values()}
+    return {page: scripts[os.path.basename(path)] for page, path in PAGES.items()}
+
+def install_runtime():
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+    # AppTest keeps a submitted chat message across st.rerun(), so the page
+    # would answer it again on every rerun; clear triggers before rerunning
+    rerun = st.rerun
+
+    def rerun_without_triggers():
+        ctx = get_script_run_ctx()
+        if ctx is not None:
+            ctx.session_state._state._reset_triggers()
+        rerun()
+
+    st.rerun = rerun_without_triggers
+
+def configure_environment(workdir, gemini_latency, firestore_latency, cassette=None, mode=None, speed=None):
+    """Point services at local stand-ins, or a cassette, and a throwaway session store"""
+    os.environ['MINDMATE_LOCAL_SERVICES'] = '1'
+    os.environ['MINDMATE_LOCAL_GEMINI_LATENCY'] = str(gemini_latency)
+    os.environ['MINDMATE_LOCAL_FIRESTORE_LATENCY'] = str(firestore_latency)
+    if cassette:
+        os.environ['MINDMATE_CASSETTE'] = cassette
+        os.environ['MINDMATE_CASSETTE_MODE'] = mode
+        os.environ['MINDMATE_CASSETTE_SPEED'] = speed
+    os.environ.setdefault('MINDMATE_SESSION_STORE', f"sqlite:///{os.path.join(workdir, 'sessions.db')}")
+    os.environ.setdefault('MINDMATE_SESSION_SPILL_DIR', os.path.join(workdir, 'spill'))
+
+def seed_users(user_ids, years, seed):
+    """Store a synthetic history for each simulated user"""
+    from services.session_store import create_session_store
+    from utils.synthetic_data import generate_user, write_session_store
+
+    store = create_session_store()
+    for index, user_id in enumerate(user_ids):
+        write_session_store(store, dict(generate_user(index, years=years, seed=seed), user_id=user_id))
+
+def rss_bytes():
+    """Current resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+
+        # Peak rather than current where /proc is missing; KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+class Session:
+    """One simulated user in one browser session"""
+
+    def __init__(self, user_id, rng, think=0.0, timeout=RERUN_TIMEOUT):
+        self.user_id = user_id
+        self.rng = rng
+        self.think = think
+        self.app = LoadAppTest(timeout)
+        self.app.session_state['user_id'] = self.user_id
+        self.timings = []  # (page, action, seconds)
+        self.errors = []
+
+    def open(self, page):
+        app = self.app
+
+        def navigate():
+            app.page = page
+            return app.run()
+
+        self.act(page, 'open', navigate)
+        return app
+
+    def act(self, page, action, run):
+        """Time one rerun; run() changes widgets and reruns the page"""
+        if self.think:
+            time.sleep(self.rng.uniform(0, 2 * self.think))
+        start = time.perf_counter()
+        try:
+            app = run()
+        except Exception as e:
+            self.errors.append(f"{page}/{action}: {type(e).__name__}: {e}")
+            return
+        self.timings.append((page, action, time.perf_counter() - start))
+        if app.exception:
+            self.errors.append(f"{page}/{action}: {app.exception[0].value}")
+
+    def chat(self, page, app):
+        message = self.rng.choice(CHAT_MESSAGES)
+        self.act(page, 'chat', lambda: app.chat_input[0].set_value(message).run())
+
+def run_session(session, turns):
+    """Walk one user through every page"""
+    rng = session.rng
+
+    home = session.open('home')
+    session.act('home', 'switch mood',
+                lambda: home.selectbox(key='mood_selector').set_value(rng.choice(MOOD_LABELS)).run())
+    for _ in range(turns):
+        session.chat('home', home)
+
+    chat = session.open('chat')
+    session.chat('chat', chat)
+
+    exercises = session.open('exercises')
+    session.act('exercises', 'switch mood', lambda: exercises.selectbox[0].set_value(rng.choice(MOOD_LABELS)).run())
+    starts = [button for button in exercises.button if (button.key or '').startswith('btn_')]
+    if starts:
+        exercise_id = rng.choice(starts).key[len('btn_'):]
+        session.act('exercises', 'start', lambda: exercises.button(key=f"btn_{exercise_id}").click().run())
+
+        # Shared outcome stats can reorder the list under the user; only
+        # complete the exercise if it is still open on the page
+        mood_after = [widget for widget in exercises.selectbox if widget.key == f"mood_after_{exercise_id}"]
+        if mood_after:
+            def complete():
+                mood_after[0].set_value(rng.choice(MOOD_LABELS))
+                return exercises.button(key=f"complete_{exercise_id}").click().run()
+
+            session.act('exercises', 'complete', complete)
+
+    analytics = session.open('analytics')
+    for key, action in (('trend_range', 'zoom'), ('timeline_period', 'timeline')):
+        widgets = [widget for widget in analytics.selectbox if widget.key == key]
+        if widgets:
+            session.act('analytics', action, lambda: widgets[0].set_value(rng.choice(widgets[0].options)).run())
+
+    session.open('profile')
+    session.open('home')
+    return session
+
+def percentile_row(label, seconds):
+    values = np.percentile(seconds, PERCENTILES) * 1000
+    return (f"  {label:<24} {len(seconds):7d} " + " ".join(f"{value:8.1f}" for value in values)
+            + f" {max(seconds) * 1000:8.1f}")
+
+def summarize(sessions, elapsed, rss_before, rss_after):
+    by_step = defaultdict(list)
+    for session in sessions:
+        for page, action, seconds in session.timings:
+            by_step[f"{page}/{action}"].append(seconds)
+    everything = [seconds for values in by_step.values() for seconds in values]
+    errors = [error for session in sessions for error in session.errors]
+
+    def stats(seconds):
+        return dict(zip((f"p{p}" for p in PERCENTILES), np.percentile(seconds, PERCENTILES).tolist()),
+                    count=len(seconds), max=max(seconds))
+
+    return {
+        'sessions': len(sessions),
+        'elapsed': elapsed,
+        'reruns': len(everything),
+        'reruns_per_second': len(everything) / elapsed,
+        'sessions_per_second': len(sessions) / elapsed,
+        'rss_before': rss_before,
+        'rss_after': rss_after,
+        'rss_per_session': (rss_after - rss_before) / max(len(sessions), 1),
+        'latency': dict({'all': stats(everything)} if everything else {},
+                        **{step: stats(values) for step, values in by_step.items()}),
+        'errors': errors
+    }, by_step, everything
+
+def print_report(summary, by_step, everything, concurrency):
+    mib = 1024 * 1024
+    print(f"\n{summary['sessions']} sessions, {concurrency} at a time, {summary['elapsed']:.1f} s")
+    print(f"Throughput: {summary['reruns_per_second']:.1f} reruns/s, {summary['sessions_per_second']:.2f} sessions/s")
+    print("\nRerun latency (ms)         count " + " ".join(f"{f'p{p}':>8}" for p in PERCENTILES) + "      max")
+    if everything:
+        print(percentile_row('all', everything))
+    for step, values in by_step.items():
+        print(percentile_row(step, values))
+    print(f"\nRSS: {summary['rss_before'] / mib:.0f} MiB before, {summary['rss_after'] / mib:.0f} MiB with all "
+          f"sessions live, {summary['rss_per_session'] / mib:.2f} MiB per session")
+    if 'cassette' in summary:
+        print("Cassette: " + ", ".join(f"{count} {name}" for name, count in summary['cassette'].items()))
+    if summary['errors']:
+        print(f"\n{len(summary['errors'])} error(s), first few:")
+        for error in summary['errors'][:5]:
+            print(f"  {error}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent MindMate sessions")
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, help="sessions running at once (default: all)")
+    parser.add_argument('--turns', type=int, default=2, help="chat messages sent from the home page")
+    parser.add_argument('--think', type=float, default=0.0, help="mean pause in seconds before each action")
+    parser.add_argument('--history-years', type=float, default=1.0, help="stored history per user, 0 for new users")
+    parser.add_argument('--gemini-latency', type=float, default=0.5, help="seconds per stand-in Gemini call")
+    parser.add_argument('--firestore-latency', type=float, default=0.02, help="seconds per stand-in Firestore call")
+    parser.add_argument('--seed', type=int, default=0)
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument('--record', metavar='CASSETTE', help="record Gemini and Firestore calls to this file")
+    cassette.add_argument('--replay', metavar='CASSETTE', help="answer Gemini and Firestore calls from this file")
+    parser.add_argument('--replay-speed', choices=(RECORDED_SPEED, FAST_SPEED), default=RECORDED_SPEED,
+                        help="wait out recorded latencies, or answer at once")
+    parser.add_argument('--output', help="also write the summary as JSON to this file")
+    args = parser.parse_args(argv)
+    concurrency = args.concurrency or args.sessions
+
+    cassette_path = args.record or args.replay
+    if cassette_path:
+        cassette_path = os.path.abspath(cassette_path)
+        if args.record and os.path.exists(cassette_path):
+            # Cassettes append; start a fresh recording
+            os.remove(cassette_path)
+
+    os.chdir(ROOT)
+    workdir = tempfile.mkdtemp(prefix='mindmate-load-')
+    configure_environment(workdir, args.gemini_latency, args.firestore_latency,
+                          cassette_path, RECORD if args.record else REPLAY, args.replay_speed)
+    install_runtime()
+
+    user_ids = [f"load-{args.seed}-{index}" for index in range(args.sessions)]
+    if args.history_years > 0:
+        print(f"Seeding {args.sessions} users with {args.history_years:g} year(s) of history...")
+        seed_users(user_ids + ['load-warmup'], args.history_years, args.seed)
+
+    # One untimed session imports every page and fills the shared caches
+    print("Warming up...")
+    warmup = run_session(Session('load-warmup', random.Random(args.seed)), args.turns)
+    if warmup.errors:
+        print(f"Warm-up failed: {warmup.errors[0]}")
+        return 1
+
+    sessions = [Session(user_id, random.Random(f"{args.seed}-{user_id}"), args.think) for user_id in user_ids]
+    del warmup
+    gc.collect()
+    rss_before = rss_bytes()
+
+    print(f"Running {args.sessions} sessions, {concurrency} at a time...")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda session: run_session(session, args.turns), sessions))
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    summary, by_step, everything = summarize(sessions, elapsed, rss_before, rss_bytes())
+    if args.record or args.replay:
+        summary['cassette'] = cassette_from_env().stats()
+    print_report(summary, by_step, everything, concurrency)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+    return 1 if summary['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
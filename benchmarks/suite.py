@@ -0,0 +1,317 @@
+"""Microbenchmarks for MindMate's hot paths, with saved baselines
+
+Run from the repository root:
+
+    python benchmarks/suite.py                      # run and print
+    python benchmarks/suite.py --save               # also store as the baseline
+    python benchmarks/suite.py --compare            # fail on regressions vs the baseline
+    python benchmarks/suite.py --filter mood --compare --threshold 0.3 --report report.md
+
+Cases listed in LATENCY_BUDGETS also fail any run, baseline or not, when a
+call exceeds the budget.
+
+Each case runs at several input sizes or message lengths and reports the
+best per-call time of several repeats. Cases that read Streamlit session
+state run inside an AppTest script so they exercise the real code.
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+# A case is a regression when it is this much slower than its baseline
+DEFAULT_THRESHOLD = 0.25
+
+# Timing repeats; the fastest is kept to reduce scheduler noise
+REPEATS = 5
+
+# Seconds per call a case may never exceed; catches sleeps and other synthetic delays
+LATENCY_BUDGETS = {
+    'chat_pipeline_progress': 0.05
+}
+
+MESSAGE_LENGTHS = (50, 500, 5000)
+HISTORY_SIZES = (100, 1000, 10000)
+
+SAMPLE_SENTENCES = (
+    "I'm really anxious about my job interview tomorrow. ",
+    "Work has been overwhelming with the deadline on Friday. ",
+    "Had a great walk and feel much better today. ",
+    "My doctor appointment is next week on March 12. ",
+    "I feel down and tired, nothing seems to help. "
+)
+
+MOODS = ('positive', 'neutral', 'anxious', 'stressed', 'negative')
+
+class Case(NamedTuple):
+    name: str
+    params: Tuple
+    # make(param) returns the zero-argument callable to time
+    make: Callable
+    session: bool = False
+
+def sample_text(length):
+    text = ''.join(SAMPLE_SENTENCES) * (length // sum(map(len, SAMPLE_SENTENCES)) + 1)
+    return text[:length]
+
+def sample_history(size):
+    from utils.messages import ConversationLog, Message, Role
+
+    start = datetime.now() - timedelta(minutes=size)
+    return ConversationLog(
+        Message.create(
+            Role.USER if i % 2 == 0 else Role.ASSISTANT,
+            SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)],
+            mood=None if i % 2 == 0 else MOODS[i % len(MOODS)],
+            timestamp=start + timedelta(minutes=i)
+        )
+        for i in range(size)
+    )
+
+def sample_mood_history(size):
+    start = datetime.now() - timedelta(hours=size)
+    return [
+        {'mood': MOODS[(i * 7) % len(MOODS)], 'description': '', 'timestamp': start + timedelta(hours=i),
+         'date': (start + timedelta(hours=i)).date().isoformat()}
+        for i in range(size)
+    ]
+
+def sample_reply(events):
+    return "```json\n" + json.dumps({
+        'response': "That sounds like a lot. Let's take it one step at a time.",
+        'mood_detected': 'anxious',
+        'needs_exercise': True,
+        'events': [{'description': f"event {i}", 'date': 'tomorrow', 'type': 'deadline'} for i in range(events)],
+        'key_insights': ["has an interview coming up"]
+    }) + "\n```"
+
+def _text_case(name, func):
+    return Case(name, MESSAGE_LENGTHS, lambda length: (lambda text=sample_text(length): func(text)))
+
+@functools.lru_cache(maxsize=None)
+def _gemini():
+    from services.gemini_service import GeminiService
+
+    # Prompt building and parsing never touch the API client
+    return GeminiService()
+
+class _InstantGemini:
+    """Answers immediately so a chat turn measures only MindMate's own work"""
+
+    def __init__(self):
+        self.gemini = _gemini()
+        self.reply = sample_reply(1)
+
+    def generate_response(self, user_message, conversation_history, current_mood, on_chunk=None):
+        if on_chunk is not None:
+            on_chunk(self.reply)
+        return self.gemini._parse_response(self.reply, current_mood)
+
+def _session_case(name, params, setup, call):
+    """Case run inside Streamlit: setup(param) returns session fields, call() the work"""
+    return Case(name, params, lambda param: (setup, call, param), session=True)
+
+def build_cases():
+    from utils import helpers
+
+    cases = [
+        _text_case('detect_mood_from_text', helpers.detect_mood_from_text),
+        _text_case('extract_events_from_text', helpers.extract_events_from_text),
+        _text_case('is_crisis_situation', helpers.is_crisis_situation),
+        Case('get_conversation_context', HISTORY_SIZES,
+             lambda size: (lambda history=sample_history(size): helpers.get_conversation_context(history))),
+        Case('format_timestamp', ('datetime', 'iso'),
+             lambda kind: (lambda value=(datetime.now() - timedelta(hours=5)) if kind == 'datetime'
+                           else (datetime.now() - timedelta(hours=5)).isoformat(): helpers.format_timestamp(value))),
+        Case('gemini_build_prompt', MESSAGE_LENGTHS,
+             lambda length: (lambda gemini=_gemini(), text=sample_text(length), history=sample_history(20):
+                             gemini._build_prompt(text, history, 'anxious'))),
+        Case('gemini_parse_response', (0, 10, 100),
+             lambda events: (lambda gemini=_gemini(), reply=sample_reply(events):
+                             gemini._parse_response(reply, 'neutral'))),
+        Case('chat_pipeline_turn', MESSAGE_LENGTHS, _make_chat_turn),
+        Case('chat_pipeline_progress', MESSAGE_LENGTHS, _make_progress_turn),
+        _session_case('get_mood_analytics', HISTORY_SIZES,
+                      lambda size: {'mood_history': sample_mood_history(size)},
+                      'get_mood_analytics'),
+        _session_case('calculate_mood_streak', HISTORY_SIZES,
+                      lambda size: {'mood_history': [dict(entry, mood='positive') for entry in sample_mood_history(size)]},
+                      'calculate_mood_streak'),
+        _session_case('export_user_data', HISTORY_SIZES,
+                      lambda size: {'mood_history': sample_mood_history(size), 'conversation_history': sample_history(size),
+                                    'user_id': 'bench', 'user_profile': {'name': 'Bench'}},
+                      'export_user_data')
+    ]
+    return cases
+
+def _make_chat_turn(length):
+    from services.chat_pipeline import ChatPipeline
+
+    pipeline = ChatPipeline(_InstantGemini(), max_workers=4)
+    text, history = sample_text(min(length, 1000)), sample_history(20)
+    return lambda: pipeline.run(text, history, 'neutral')
+
+def _make_progress_turn(length):
+    """Chat turn with the thinking indicator's progress callback, as the Chat page runs it"""
+    from services.chat_pipeline import ChatPipeline
+
+    pipeline = ChatPipeline(_InstantGemini(), max_workers=4)
+    text, history = sample_text(min(length, 1000)), sample_history(20)
+    events = []
+    pipeline.run(text, history, 'neutral', on_progress=events.append)
+    if events != ['analyzing', 'llm_started', 'first_chunk', 'llm_done']:
+        raise RuntimeError(f"Unexpected chat progress events: {events}")
+    return lambda: pipeline.run(text, history, 'neutral', on_progress=lambda event: None)
+
+def time_call(func):
+    """Best seconds per call over REPEATS runs of an auto-ranged loop"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=REPEATS, number=number)) / number
+
+def _session_call(name):
+    from utils import helpers
+
+    if name == 'export_user_data':
+        # Drain the stream; the export is lazy until read
+        return lambda: sum(len(chunk) for chunk in helpers.export_user_data(None, compress=True))
+    return getattr(helpers, name)
+
+def _session_script():
+    # Runs inside AppTest, so helpers see a real st.session_state
+    import streamlit as st
+    from benchmarks import suite
+
+    results = {}
+    for case_id, (setup, call, param) in st.session_state['bench_cases'].items():
+        st.session_state.update(setup(param))
+        results[case_id] = suite.time_call(suite._session_call(call))
+    st.session_state['bench_results'] = results
+
+def _run_session_cases(session_cases):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_function(_session_script, default_timeout=600)
+    app.session_state['bench_cases'] = session_cases
+    app.run()
+    if app.exception:
+        raise RuntimeError(f"Session benchmarks failed: {app.exception[0].value}")
+    return app.session_state['bench_results']
+
+def run(pattern=None):
+    """Seconds per call for every case id matching pattern"""
+    results = {}
+    session_cases = {}
+    for case in build_cases():
+        for param in case.params:
+            case_id = f"{case.name}[{param}]"
+            if pattern and pattern not in case_id:
+                continue
+            if case.session:
+                session_cases[case_id] = case.make(param)
+            else:
+                results[case_id] = time_call(case.make(param))
+                print(f"  {case_id:<42} {format_seconds(results[case_id])}", flush=True)
+
+    if session_cases:
+        for case_id, seconds in _run_session_cases(session_cases).items():
+            results[case_id] = seconds
+            print(f"  {case_id:<42} {format_seconds(seconds)}", flush=True)
+    return results
+
+def format_seconds(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.0f} ns"
+
+def save_baseline(results, path=BASELINE_PATH):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': results
+        }, f, indent=2, sort_keys=True)
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Markdown report rows and the case ids that regressed beyond threshold"""
+    rows = ["| case | baseline | current | change |", "| --- | ---: | ---: | ---: |"]
+    regressions = []
+    for case_id, seconds in results.items():
+        before = baseline.get(case_id)
+        if before is None:
+            rows.append(f"| {case_id} | - | {format_seconds(seconds).strip()} | new |")
+            continue
+        change = seconds / before - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(case_id)
+            flag = ' ❌'
+        rows.append(
+            f"| {case_id} | {format_seconds(before).strip()} | {format_seconds(seconds).strip()} | {change:+.1%}{flag} |"
+        )
+    return rows, regressions
+
+def over_budget(results, budgets=None):
+    """Case ids slower than their absolute budget in LATENCY_BUDGETS"""
+    budgets = LATENCY_BUDGETS if budgets is None else budgets
+    return [
+        case_id for case_id, seconds in results.items()
+        if seconds > budgets.get(case_id.split('[', 1)[0], float('inf'))
+    ]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run MindMate microbenchmarks")
+    parser.add_argument('--filter', help="only run case ids containing this text")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline JSON to save or compare against")
+    parser.add_argument('--save', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--compare', action='store_true', help="compare with the baseline and fail on regressions")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before a case fails, e.g. 0.25 for 25%%")
+    parser.add_argument('--report', help="write the comparison as Markdown to this file")
+    args = parser.parse_args(argv)
+
+    print(f"Running benchmarks{f' matching {args.filter!r}' if args.filter else ''}...")
+    results = run(args.filter)
+
+    status = 0
+    slow = over_budget(results)
+    if slow:
+        print(f"\n{len(slow)} case(s) over their latency budget: {', '.join(slow)}")
+        status = 1
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}; run with --save first")
+            return 2
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+        rows, regressions = compare(results, baseline, args.threshold)
+        report = "\n".join(rows)
+        print("\n" + report)
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                f.write(f"# Benchmark comparison (threshold {args.threshold:.0%})\n\n{report}\n")
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            status = 1
+
+    if args.save:
+        save_baseline(results, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,213 +1,129 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import random
+from utils.export import columnar_export_available, export_filename, export_mime_type
+from utils.helpers import export_daily_moods, init_services, init_session_state, trace_page
+from utils.tracing import span
+from utils.analytics import MOOD_COLORS, get_analytics_views, get_insights, get_mood_forecaster, get_trend_figure
+from utils.forecast import DETERIORATION_ALERT
+from utils.chart_data import TREND_RANGES
+from utils.timeline import TIMELINE_PERIODS, timeline_days, timeline_html
 
 st.set_page_config(page_title="Analytics - MindMate", page_icon="📊", layout="wide")
 
-st.title("📊 Mental Health Analytics")
-st.write("Track your progress and understand your mental health patterns")
+with trace_page('analytics'):
+    init_session_state()
 
-# Initialize session state for demo data
-if 'analytics_data' not in st.session_state:
-    # Generate demo data for the past 30 days
-    dates = [datetime.now() - timedelta(days=i) for i in range(30, 0, -1)]
-    moods = ['positive', 'neutral', 'anxious', 'stressed', 'negative']
-    
-    # Create realistic mood data with some patterns
-    demo_data = []
-    for i, date in enumerate(dates):
-        # Simulate weekly patterns (weekends more positive)
-        if date.weekday() >= 5:  # Weekend
-            mood = random.choices(moods, weights=[40, 30, 10, 10, 10])[0]
-        else:  # Weekday
-            mood = random.choices(moods, weights=[25, 25, 20, 20, 10])[0]
-        
-        demo_data.append({
-            'date': date.date(),
-            'mood': mood,
-            'mood_score': {
-                'positive': 5, 'neutral': 3, 'anxious': 2, 
-                'stressed': 2, 'negative': 1
-            }[mood]
-        })
-    
-    st.session_state.analytics_data = demo_data
-
-# Get analytics data
-data = pd.DataFrame(st.session_state.analytics_data)
-
-# Main metrics row
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    total_entries = len(data)
-    st.metric("Total Check-ins", total_entries, delta=f"+{random.randint(3, 8)} this week")
-
-with col2:
-    current_streak = random.randint(3, 12)
-    st.metric("Current Streak", f"{current_streak} days", delta="+2")
-
-with col3:
-    avg_mood = data['mood_score'].mean()
-    st.metric("Average Mood", f"{avg_mood:.1f}/5", delta="+0.3")
-
-with col4:
-    positive_days = len(data[data['mood'] == 'positive'])
-    positive_percent = (positive_days / total_entries) * 100
-    st.metric("Positive Days", f"{positive_percent:.0f}%", delta="+5%")
-
-# Mood trend chart
-st.subheader("📈 30-Day Mood Trend")
-
-# Create mood trend chart
-fig_trend = px.line(
-    data, 
-    x='date', 
-    y='mood_score',
-    title='Mood Score Over Time',
-    color_discrete_sequence=['#667eea']
-)
-
-fig_trend.update_layout(
-    xaxis_title="Date",
-    yaxis_title="Mood Score (1-5)",
-    height=400,
-    showlegend=False
-)
-
-fig_trend.update_traces(line=dict(width=3))
-st.plotly_chart(fig_trend, use_container_width=True)
-
-# Mood distribution
-col1, col2 = st.columns(2)
-
-with col1:
-    st.subheader("🎭 Mood Distribution")
-    
-    mood_counts = data['mood'].value_counts()
-    
-    # Create pie chart
-    fig_pie = px.pie(
-        values=mood_counts.values,
-        names=mood_counts.index,
-        title="Distribution of Moods",
-        color_discrete_map={
-            'positive': '#28a745',
-            'neutral': '#ffc107', 
-            'anxious': '#fd7e14',
-            'stressed': '#6f42c1',
-            'negative': '#dc3545'
-        }
-    )
-    
-    fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-    st.plotly_chart(fig_pie, use_container_width=True)
+    st.title("📊 Mental Health Analytics")
+    st.write("Track your progress and understand your mental health patterns")
 
-with col2:
-    st.subheader("📅 Weekly Patterns")
-    
-    # Add day of week to data
-    data['day_of_week'] = pd.to_datetime(data['date']).dt.day_name()
-    
-    # Calculate average mood score by day of week
-    weekly_avg = data.groupby('day_of_week')['mood_score'].mean().reindex([
-        'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'
-    ])
-    
-    fig_weekly = px.bar(
-        x=weekly_avg.index,
-        y=weekly_avg.values,
-        title="Average Mood by Day of Week",
-        color=weekly_avg.values,
-        color_continuous_scale='RdYlGn'
-    )
+    views = get_analytics_views()
+
+    if views['total_entries'] == 0:
+        st.info("📝 No mood data yet. Chat with MindMate and your mood patterns will show up here.")
+        st.stop()
+
+    week = views['week_over_week']
+
+    def format_delta(value, template):
+        return template.format(value) if value is not None else None
+
+    # Main metrics row
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Total Check-ins", views['total_entries'], delta=f"+{week['this_week']['check_ins']} this week")
+
+    with col2:
+        current_streak = views['current_streak']
+        st.metric(
+            "Current Streak",
+            f"{current_streak} day{'s' if current_streak != 1 else ''}",
+            delta=f"Best: {views['longest_streak']} days",
+            delta_color="off"
+        )
+
+    with col3:
+        st.metric(
+            "Average Mood",
+            f"{views['avg_mood']:.1f}/5",
+            delta=format_delta(week['delta']['avg_score'], "{:+.1f} vs last week")
+        )
+
+    with col4:
+        st.metric(
+            "Positive Days",
+            f"{views['positive_percent']:.0f}%",
+            delta=format_delta(week['delta']['positive_percent'], "{:+.0f}% vs last week")
+        )
+
+    # Next-day forecast
+    forecast = get_mood_forecaster().forecast()
+    if forecast is not None:
+        st.subheader("🔮 Tomorrow's Outlook")
+        col1, col2 = st.columns([1, 2])
     
-    fig_weekly.update_layout(
-        xaxis_title="Day of Week",
-        yaxis_title="Average Mood Score",
-        showlegend=False
-    )
+        with col1:
+            st.metric(
+                f"Forecast for {forecast['date'].strftime('%A')}",
+                f"{forecast['score']:.1f}/5",
+                delta=f"{forecast['score'] - forecast['baseline']:+.1f} vs your usual"
+            )
     
-    st.plotly_chart(fig_weekly, use_container_width=True)
-
-# Recent activity timeline
-st.subheader("⏰ Recent Activity")
-
-# Show last 7 days
-recent_data = data.tail(7).sort_values('date', ascending=False)
-
-for _, row in recent_data.iterrows():
-    mood_emoji = {
-        'positive': '😊',
-        'neutral': '😐', 
-        'anxious': '😰',
-        'stressed': '😤',
-        'negative': '😔'
-    }
+        with col2:
+            st.caption(f"Likely range {forecast['low']:.1f} to {forecast['high']:.1f}. "
+                       f"Chance of a harder day: {forecast['deterioration']:.0%}")
+            if forecast['deterioration'] >= DETERIORATION_ALERT:
+                st.warning("Tomorrow may be a tougher day. A short exercise today can help you get ahead of it.")
+                if st.button("🧘 Find an Exercise", key="forecast_exercise"):
+                    st.switch_page("pages/2_🧘_Exercises.py")
+
+    # Mood trend chart
+    st.subheader("📈 Mood Trend")
+
+    with span('render.trend'):
+        zoom = st.selectbox("Range", list(TREND_RANGES), index=len(TREND_RANGES) - 1, key="trend_range", label_visibility="collapsed")
+        st.plotly_chart(get_trend_figure(views, TREND_RANGES[zoom]), use_container_width=True)
+
+    # Mood distribution
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("🎭 Mood Distribution")
     
-    mood_color = {
-        'positive': '#28a745',
-        'neutral': '#ffc107',
-        'anxious': '#fd7e14', 
-        'stressed': '#6f42c1',
-        'negative': '#dc3545'
-    }
+        st.plotly_chart(views['fig_pie'], use_container_width=True)
+
+    with col2:
+        st.subheader("📅 Weekly Patterns")
     
-    st.markdown(f"""
-    <div style="
-        display: flex; 
-        justify-content: space-between; 
-        align-items: center;
-        padding: 10px;
-        margin: 5px 0;
-        border-left: 4px solid {mood_color[row['mood']]};
-        background: #f8f9fa;
-        border-radius: 5px;
-    ">
-        <span><strong>{row['date'].strftime('%B %d, %Y')}</strong></span>
-        <span style="color: {mood_color[row['mood']]};">
-            {mood_emoji[row['mood']]} {row['mood'].title()}
-        </span>
-    </div>
-    """, unsafe_allow_html=True)
-
-# AI Insights section
-st.subheader("🤖 AI Insights & Recommendations")
-
-insights = [
-    {
-        "icon": "🌅",
-        "title": "Morning Pattern",
-        "description": "You tend to have better moods in the morning. Try scheduling important tasks early in the day.",
-        "action": "Set morning intentions"
-    },
-    {
-        "icon": "📈", 
-        "title": "Positive Trend",
-        "description": "Your mood has improved 15% over the last two weeks. Great progress!",
-        "action": "Keep up current habits"
-    },
-    {
-        "icon": "🧘",
-        "title": "Stress Management", 
-        "description": "Breathing exercises seem to help you most on stressful days.",
-        "action": "Try 5-minute breathing breaks"
-    },
-    {
-        "icon": "🎯",
-        "title": "Goal Suggestion",
-        "description": "Aim for 5 consecutive positive days. You're currently at 2!",
-        "action": "Focus on self-care today"
-    }
-]
-
-cols = st.columns(2)
-for i, insight in enumerate(insights):
-    with cols[i % 2]:
-        st.markdown(f"""
+        st.plotly_chart(views['fig_weekly'], use_container_width=True)
+
+    st.subheader("🕐 Time of Day")
+
+    st.plotly_chart(views['fig_hourly'], use_container_width=True)
+
+    # Recent activity timeline
+    st.subheader("⏰ Recent Activity")
+
+    with span('render.timeline'):
+        period = st.selectbox("Period", list(TIMELINE_PERIODS), index=0, key="timeline_period", label_visibility="collapsed")
+        recent_days = timeline_days(views['daily'], TIMELINE_PERIODS[period])
+
+        if recent_days.empty:
+            st.caption("No check-ins in this period.")
+        else:
+            # One element for the whole list, however long the period
+            st.markdown(timeline_html(recent_days, MOOD_COLORS), unsafe_allow_html=True)
+
+    # AI Insights section
+    st.subheader("🤖 AI Insights & Recommendations")
+
+    # Derived from this user's data and recomputed only when it changes
+    with span('render.insights'):
+        insights = get_insights(views)
+
+        cols = st.columns(2)
+        for i, insight in enumerate(insights):
+            with cols[i % 2]:
+                st.markdown(f"""
         <div style="
             border: 1px solid #ddd;
             border-radius: 10px;
@@ -222,24 +138,42 @@ for i, insight in enumerate(insights):
         </div>
         """, unsafe_allow_html=True)
 
-# Export data option
-st.subheader("📤 Export Your Data")
-col1, col2 = st.columns(2)
-
-with col1:
-    if st.button("📊 Download CSV Report", use_container_width=True):
-        csv = data.to_csv(index=False)
-        st.download_button(
-            label="💾 Download CSV",
-            data=csv,
-            file_name=f"mindmate_data_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv"
-        )
-
-with col2:
-    if st.button("📈 Generate Summary Report", use_container_width=True):
-        st.info("📋 Summary report would be generated here with detailed insights and recommendations.")
-
-# Privacy notice
-st.markdown("---")
-st.caption("🔒 Your data is private and secure. Analytics are generated locally and help you understand your mental health patterns.")
\ No newline at end of file
+    # Export data option
+    st.subheader("📤 Export Your Data")
+    col1, col2 = st.columns(2)
+
+    with col1:
+        formats = {"CSV": 'csv'}
+        if columnar_export_available():
+            formats.update({"Parquet": 'parquet', "Arrow IPC": 'arrow'})
+        export_label = st.selectbox("Format", list(formats), key="export_format")
+        export_format = formats[export_label]
+        compress_csv = export_format == 'csv' and st.checkbox("Compress CSV (gzip)", value=False)
+    
+        if st.button("📊 Download Daily Report", use_container_width=True):
+            # One typed row per day, streamed from storage page by page
+            try:
+                firebase, _, _ = init_services()
+            except Exception:
+                firebase = None
+        
+            try:
+                export_file = export_daily_moods(export_format, firebase, compress=compress_csv)
+            except Exception as e:
+                print(f"Error exporting daily report: {e}")
+                st.error("Your daily report couldn't be exported completely. Please try again in a moment.")
+            else:
+                st.download_button(
+                    label=f"💾 Download {export_label}",
+                    data=export_file,
+                    file_name=export_filename("mindmate_daily", export_format, compress_csv),
+                    mime=export_mime_type(export_format, compress_csv)
+                )
+
+    with col2:
+        if st.button("📈 Generate Summary Report", use_container_width=True):
+            st.info("📋 Summary report would be generated here with detailed insights and recommendations.")
+
+    # Privacy notice
+    st.markdown("---")
+    st.caption("🔒 Your data is private and secure. Analytics are generated locally and help you understand your mental health patterns.")
\ No newline at end of file
@@ -0,0 +1,280 @@
+"""Record and replay Gemini and Firestore calls
+
+Cassettes are for load tests and offline development, e.g.
+benchmarks/load_test.py --record. With MINDMATE_CASSETTE set to a file,
+init_services wraps its services:
+
+    MINDMATE_CASSETTE_MODE=replay   recorded responses are served and no
+                                    client is created (the default when
+                                    the file already exists)
+    MINDMATE_CASSETTE_MODE=record   calls go through and each request,
+                                    response and latency is appended;
+                                    only with MINDMATE_LOCAL_SERVICES
+    MINDMATE_CASSETTE_SPEED=fast    replay without the recorded delays
+                                    (default: recorded)
+
+A recording holds every prompt and stored record verbatim, so recording
+real Gemini and Firestore traffic is refused unless explicitly allowed
+with MINDMATE_CASSETTE_ALLOW_LIVE=1. Files are created readable by their
+owner only.
+
+A cassette is JSON Lines, one call per line. Calls are matched on method
+and request: the Gemini prompt, or the Firestore call's arguments.
+Repeated requests replay their recordings in order, and the last one is
+reused once they run out. A request that was never recorded gets the next
+recording of the same method and counts as a miss, unless the cassette is
+strict.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+RECORDED_SPEED = 'recorded'
+FAST_SPEED = 'fast'
+
+# FirebaseService methods that go to Firestore; generators are recorded as lists of pages
+FIRESTORE_CALLS = (
+    'save_conversation', 'save_events', 'save_insights', 'save_mood_entry',
+    'get_user_conversations', 'get_mood_analytics'
+)
+FIRESTORE_PAGED_CALLS = ('iter_user_conversations', 'iter_mood_entries')
+
+# Request fields that differ on every run and are left out of the match
+VOLATILE_FIELDS = ('timings',)
+
+class CassetteMiss(KeyError):
+    """Raised by a strict cassette for a request it has no recording of"""
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    raise TypeError(f"Cannot record {type(value).__name__} in a cassette")
+
+def _decode(item):
+    if '__datetime__' in item:
+        return datetime.fromisoformat(item['__datetime__'])
+    return item
+
+def _stable(value):
+    if isinstance(value, dict):
+        return {key: _stable(item) for key, item in value.items() if key not in VOLATILE_FIELDS}
+    if isinstance(value, (list, tuple)):
+        return [_stable(item) for item in value]
+    return value
+
+def request_key(method, *args, **kwargs):
+    """Stable digest of a call's arguments"""
+    payload = json.dumps([method, _stable(args), _stable(kwargs)], default=_encode, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+class Cassette:
+    """Recorded calls in one file, shared by every wrapped service"""
+
+    def __init__(self, path, mode=RECORD, speed=RECORDED_SPEED, strict=False, allow_live=False):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == RECORD and not (allow_live or os.getenv('MINDMATE_LOCAL_SERVICES')):
+            raise ValueError(
+                "Refusing to record live Gemini and Firestore calls; set MINDMATE_LOCAL_SERVICES, "
+                "or MINDMATE_CASSETTE_ALLOW_LIVE=1 to record real traffic deliberately"
+            )
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.strict = strict
+
+        self._lock = threading.Lock()
+        self._recordings = defaultdict(list)  # (method, key) -> calls
+        self._by_method = defaultdict(list)
+        self._played = defaultdict(int)
+        self.counts = {'recorded': 0, 'hits': 0, 'misses': 0}
+
+        if mode == REPLAY:
+            self._load()
+
+    def _load(self):
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                call = json.loads(line, object_hook=_decode)
+                self._recordings[(call['method'], call['key'])].append(call)
+                self._by_method[call['method']].append(call)
+
+    def record(self, method, key, response, seconds, chunks=None):
+        call = {'method': method, 'key': key, 'seconds': round(seconds, 6), 'response': response}
+        if chunks is not None:
+            call['chunks'] = [[round(offset, 6), text] for offset, text in chunks]
+        line = json.dumps(call, default=_encode)
+
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            with open(fd, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+            self.counts['recorded'] += 1
+
+    def play(self, method, key):
+        """The recorded call for this request"""
+        with self._lock:
+            calls = self._recordings.get((method, key))
+            if calls:
+                self.counts['hits'] += 1
+                index = self._played[(method, key)]
+                self._played[(method, key)] += 1
+                return calls[min(index, len(calls) - 1)]
+
+            if self.strict or not self._by_method.get(method):
+                raise CassetteMiss(f"No recording of {method} for request {key[:12]}")
+            self.counts['misses'] += 1
+            calls = self._by_method[method]
+            index = self._played[method]
+            self._played[method] += 1
+            return calls[index % len(calls)]
+
+    def wait(self, call, started, offset=None):
+        """Sleep until offset (default: the whole call) after started, at recorded speed"""
+        if self.speed == RECORDED_SPEED:
+            target = call['seconds'] if offset is None else offset
+            time.sleep(max(0.0, target - (time.perf_counter() - started)))
+
+    def replay(self, method, key):
+        """The recorded response, returned after the recorded latency unless fast"""
+        started = time.perf_counter()
+        call = self.play(method, key)
+        self.wait(call, started)
+        return call['response']
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def gemini(self, service=None):
+        return CassetteGemini(self, service)
+
+    def firebase(self, service=None):
+        return CassetteFirebase(self, service)
+
+class CassetteGemini:
+    """GeminiService that records or replays generate_* calls"""
+
+    def __init__(self, cassette, service=None):
+        from services.gemini_service import GeminiService
+
+        self.cassette = cassette
+        self.service = service
+        self.enabled = service.enabled if service is not None else True
+        # _build_prompt needs no client, so replay can key on the prompt without one
+        self._prompter = service if service is not None else object.__new__(GeminiService)
+
+    def generate_response(self, user_message, conversation_history, current_mood, on_chunk=None):
+        key = request_key('generate_response', self._prompter._build_prompt(
+            user_message, conversation_history, current_mood
+        ))
+
+        if self.cassette.mode == REPLAY:
+            started = time.perf_counter()
+            call = self.cassette.play('generate_response', key)
+            for offset, text in call.get('chunks') or ():
+                self.cassette.wait(call, started, offset)
+                if on_chunk is not None:
+                    on_chunk(text)
+            self.cassette.wait(call, started)
+            return call['response']
+
+        chunks = None
+        started = time.perf_counter()
+        if on_chunk is None:
+            forward = None
+        else:
+            chunks = []
+
+            def forward(text):
+                chunks.append((time.perf_counter() - started, text))
+                on_chunk(text)
+
+        response = self.service.generate_response(user_message, conversation_history, current_mood, on_chunk=forward)
+        self.cassette.record('generate_response', key, response, time.perf_counter() - started, chunks)
+        return response
+
+    def generate_exercise_suggestions(self, mood, user_preferences=None):
+        key = request_key('generate_exercise_suggestions', mood, user_preferences)
+        if self.cassette.mode == REPLAY:
+            return self.cassette.replay('generate_exercise_suggestions', key)
+
+        started = time.perf_counter()
+        response = self.service.generate_exercise_suggestions(mood, user_preferences)
+        self.cassette.record('generate_exercise_suggestions', key, response, time.perf_counter() - started)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._prompter, name)
+
+class CassetteFirebase:
+    """FirebaseService that records or replays its Firestore calls"""
+
+    def __init__(self, cassette, service=None):
+        self.cassette = cassette
+        self.service = service
+        self.enabled = service.enabled if service is not None else True
+
+    def _call(self, method, args, kwargs, paged=False):
+        key = request_key(method, *args, **kwargs)
+        if self.cassette.mode == REPLAY:
+            return self.cassette.replay(method, key)
+
+        started = time.perf_counter()
+        result = getattr(self.service, method)(*args, **kwargs)
+        if paged:
+            result = list(result)
+        self.cassette.record(method, key, result, time.perf_counter() - started)
+        return result
+
+    def __getattr__(self, name):
+        if name in FIRESTORE_CALLS:
+            return lambda *args, **kwargs: self._call(name, args, kwargs)
+        if name in FIRESTORE_PAGED_CALLS:
+            return lambda *args, **kwargs: iter(self._call(name, args, kwargs, paged=True))
+        if self.service is None:
+            raise AttributeError(f"{name} is not available while replaying a cassette")
+        return getattr(self.service, name)
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+def open_cassette(path, mode=None, speed=RECORDED_SPEED, strict=False, allow_live=False):
+    """The process-wide cassette for path, so every service shares one file
+
+    Without a mode an existing file is replayed and a new one recorded.
+    """
+    with _cassettes_lock:
+        cassette = _cassettes.get(path)
+        if cassette is not None and mode in (None, cassette.mode) and (cassette.speed, cassette.strict) == (speed, strict):
+            return cassette
+        if mode is None:
+            mode = REPLAY if os.path.exists(path) else RECORD
+        cassette = _cassettes[path] = Cassette(path, mode, speed, strict, allow_live)
+        return cassette
+
+def cassette_from_env():
+    """Cassette configured by MINDMATE_CASSETTE*, or None"""
+    path = os.getenv('MINDMATE_CASSETTE')
+    if not path:
+        return None
+    return open_cassette(
+        path,
+        os.getenv('MINDMATE_CASSETTE_MODE') or None,
+        os.getenv('MINDMATE_CASSETTE_SPEED', RECORDED_SPEED),
+        os.getenv('MINDMATE_CASSETTE_STRICT', '').lower() in ('1', 'true', 'yes'),
+        os.getenv('MINDMATE_CASSETTE_ALLOW_LIVE', '').lower() in ('1', 'true', 'yes')
+    )
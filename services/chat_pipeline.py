@@ -0,0 +1,245 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+
+from utils.helpers import (
+    validate_input,
+    is_crisis_situation,
+    get_crisis_resources,
+    detect_mood_from_text,
+    extract_events_from_text,
+    get_supportive_response,
+    should_suggest_exercise,
+    save_mood_entry
+)
+from utils.analytics_engine import CHAT_MOOD_NOTE
+from utils.tracing import current_span, propagate, span
+
+# Upper bound on events kept from the LLM and local extraction combined
+MAX_EVENTS = 5
+
+# Model calls in flight per process; each holds a worker for the whole round trip
+DEFAULT_LLM_WORKERS = 8
+
+# Longest a turn waits for the model before answering from local analysis
+DEFAULT_LLM_TIMEOUT_SECONDS = 30
+
+# How long the progress relay waits for an event before checking on the LLM stage itself
+PROGRESS_POLL_SECONDS = 0.5
+
+# Status lines for the progress events emitted while a turn is generated
+PROGRESS_LABELS = {
+    'analyzing': "🧠 MindMate is reading your message...",
+    'llm_started': "🧠 MindMate is thinking...",
+    'first_chunk': "✍️ MindMate is writing..."
+}
+
+class ChatPipeline:
+    """Staged chat engine shared by the home page and the Chat page
+
+    Stages: validate -> (crisis check | local analysis | LLM call) -> merge -> persist.
+    Only the LLM call goes to the worker pool; the cheap crisis check and
+    local analysis run in the calling thread while it is in flight. Every
+    stage's duration is recorded.
+    """
+
+    STAGES = ('validate', 'crisis_check', 'local_analysis', 'llm', 'merge', 'persist')
+
+    def __init__(self, gemini=None, firebase=None, executor=None, max_workers=None, llm_timeout=None):
+        self.gemini = gemini
+        self.firebase = firebase
+        self.executor = executor
+        max_workers = int(max_workers or os.getenv('MINDMATE_CHAT_LLM_WORKERS', DEFAULT_LLM_WORKERS))
+        self.llm_timeout = float(llm_timeout or os.getenv('MINDMATE_CHAT_LLM_TIMEOUT', DEFAULT_LLM_TIMEOUT_SECONDS))
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mindmate-llm')
+        self._stats_lock = threading.Lock()
+        self._stage_stats = {stage: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0} for stage in self.STAGES}
+
+    def run(self, user_message, history, current_mood, user_id=None, profile=None, on_progress=None):
+        """Produce a response dict for one chat turn
+
+        on_progress, if given, is called in the calling thread with each
+        lifecycle event ('analyzing', 'llm_started', 'first_chunk',
+        'llm_done') as it actually happens.
+        """
+        with span('chat.turn', user=user_id, mood=current_mood, message_chars=len(user_message or '')):
+            return self._run_turn(user_message, history, current_mood, user_id, profile, on_progress)
+
+    def _run_turn(self, user_message, history, current_mood, user_id, profile, on_progress):
+        timings = {}
+        started = time.perf_counter()
+        turn_time = datetime.now()
+
+        valid, error = self._timed('validate', timings, validate_input, user_message)
+        if not valid:
+            return {'error': error, 'timings': timings}
+
+        progress = queue.Queue() if on_progress else None
+        deadline = time.monotonic() + self.llm_timeout
+
+        llm_future = self._pool.submit(
+            propagate(self._timed), 'llm', timings, self._call_llm, user_message, history, current_mood, progress
+        )
+        crisis = self._timed('crisis_check', timings, is_crisis_situation, user_message)
+        analysis = self._timed('local_analysis', timings, self._analyze, user_message)
+
+        if progress is not None:
+            self._relay_progress(progress, on_progress, llm_future, deadline)
+        llm_result = self._llm_result(llm_future, deadline)
+
+        name = (profile or {}).get('name', 'Friend')
+        result = self._timed('merge', timings, self._merge, llm_result, analysis, crisis, history, name)
+        # The page dates the turn's messages with this too, so the mood entry lines up with them
+        result['timestamp'] = turn_time
+
+        if user_id:
+            self._timed('persist', timings, self._persist, user_id, user_message, result, turn_time)
+
+        timings['total'] = (time.perf_counter() - started) * 1000
+        result['timings'] = timings
+        return result
+
+    def timing_summary(self):
+        """Per-stage count, mean and max duration in milliseconds"""
+        with self._stats_lock:
+            return {
+                stage: {
+                    'count': stats['count'],
+                    'mean_ms': stats['total_ms'] / stats['count'] if stats['count'] else 0.0,
+                    'max_ms': stats['max_ms']
+                }
+                for stage, stats in self._stage_stats.items()
+            }
+
+    def _timed(self, stage, timings, fn, *args):
+        start = time.perf_counter()
+        try:
+            with span(f'chat.{stage}'):
+                return fn(*args)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            timings[stage] = elapsed
+            with self._stats_lock:
+                stats = self._stage_stats[stage]
+                stats['count'] += 1
+                stats['total_ms'] += elapsed
+                stats['max_ms'] = max(stats['max_ms'], elapsed)
+
+    def _analyze(self, user_message):
+        return {
+            'mood': detect_mood_from_text(user_message),
+            'events': extract_events_from_text(user_message)
+        }
+
+    def _relay_progress(self, progress, on_progress, llm_future, deadline):
+        """Forward events from the LLM stage until it finishes or the turn runs out of time"""
+        event = 'analyzing'
+        while True:
+            try:
+                on_progress(event)
+            except Exception as e:
+                print(f"Chat progress callback failed: {e}")
+            if event == 'llm_done':
+                return
+            event = self._next_progress(progress, llm_future, deadline)
+
+    def _next_progress(self, progress, llm_future, deadline):
+        while True:
+            try:
+                return progress.get(timeout=max(0.0, min(PROGRESS_POLL_SECONDS, deadline - time.monotonic())))
+            except queue.Empty:
+                if llm_future.done() or time.monotonic() >= deadline:
+                    # Ended without reporting, e.g. the stage itself failed, or it is being abandoned
+                    return 'llm_done'
+
+    def _llm_result(self, llm_future, deadline):
+        try:
+            return llm_future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            # The call keeps its worker until it returns, but the user is answered now
+            print(f"LLM call exceeded {self.llm_timeout:g}s; answering from local analysis")
+            current_span().set(llm_timeout=True)
+            return None
+
+    def _call_llm(self, user_message, history, current_mood, progress=None):
+        if progress is None:
+            if self.gemini is None:
+                return None
+            return self.gemini.generate_response(user_message, history, current_mood)
+
+        first_chunk = []
+
+        def on_chunk(text):
+            if not first_chunk:
+                first_chunk.append(True)
+                progress.put('first_chunk')
+
+        progress.put('llm_started')
+        try:
+            if self.gemini is None:
+                return None
+            return self.gemini.generate_response(user_message, history, current_mood, on_chunk=on_chunk)
+        finally:
+            progress.put('llm_done')
+
+    def _merge(self, llm_result, analysis, crisis, history, name):
+        if llm_result is None or llm_result.get('fallback'):
+            # No model output to trust; answer from local analysis
+            mood = analysis['mood']
+            response = get_supportive_response(mood, name)
+            llm_events = (llm_result or {}).get('events', [])
+            insights = []
+        else:
+            mood = llm_result.get('mood_detected') or analysis['mood']
+            response = llm_result.get('response', '')
+            llm_events = llm_result.get('events', [])
+            insights = llm_result.get('key_insights', [])
+
+        events = list(llm_events)
+        seen = {(event.get('description'), event.get('date')) for event in events}
+        for event in analysis['events']:
+            key = (event.get('description'), event.get('date'))
+            if key not in seen:
+                events.append(event)
+                seen.add(key)
+
+        needs_exercise = bool((llm_result or {}).get('needs_exercise')) or should_suggest_exercise(mood, history)
+
+        result = {
+            'response': response,
+            'mood_detected': mood,
+            'needs_exercise': needs_exercise,
+            'events': events[:MAX_EVENTS],
+            'key_insights': insights,
+            'crisis': crisis
+        }
+        if crisis:
+            resources = get_crisis_resources()
+            result['mood_detected'] = 'crisis'
+            result['crisis_resources'] = resources
+            if llm_result is None or llm_result.get('fallback'):
+                result['response'] = resources['message']
+        return result
+
+    def _persist(self, user_id, user_message, result, turn_time):
+        """Record the turn's mood in the session, then queue storage work on the background executor"""
+        mood = result['mood_detected']
+        # Dated to this turn, and kept even when no storage is configured
+        save_mood_entry(mood, CHAT_MOOD_NOTE, timestamp=turn_time)
+
+        if self.firebase is None or self.executor is None:
+            return
+
+        firebase = self.firebase
+        self.executor.submit('save_conversation', firebase.save_conversation, user_id, user_message, result)
+
+        if result['events']:
+            self.executor.submit('index_events', firebase.save_events, user_id, result['events'])
+
+        if result['key_insights']:
+            self.executor.submit('store_insights', firebase.save_insights, user_id, result['key_insights'])
+
+        self.executor.submit('mood_rollup', firebase.save_mood_entry, user_id, mood, CHAT_MOOD_NOTE)
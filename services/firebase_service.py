@@ -1,8 +1,29 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
+import functools
 import os
 from datetime import datetime
 import json
+from utils.metrics import FIRESTORE_ERRORS, FIRESTORE_LATENCY
+from utils.tracing import current_span, span
+
+def _firestore_op(collection):
+    """Time the method and run it in a firestore.<name> span tagged with its collection and user"""
+    def decorate(method):
+        operation = method.__name__
+        name = f'firestore.{operation}'
+        
+        @functools.wraps(method)
+        def wrapper(self, user_id, *args, **kwargs):
+            with FIRESTORE_LATENCY.time(operation=operation), span(name, collection=collection, user=user_id):
+                return method(self, user_id, *args, **kwargs)
+        return wrapper
+    return decorate
+
+def _firestore_failed(operation, error):
+    """Record an error the operation handles itself"""
+    current_span().record_exception(error)
+    FIRESTORE_ERRORS.inc(operation=operation)
 
 class FirebaseService:
     def __init__(self):
@@ -25,6 +46,7 @@ class FirebaseService:
             print(f"Firebase initialization failed: {e}")
             self.enabled = False
     
+    @_firestore_op('conversations')
     def save_conversation(self, user_id, user_message, ai_response):
         """Save conversation to Firestore"""
         if not self.enabled:
@@ -45,8 +67,55 @@ class FirebaseService:
             
         except Exception as e:
             print(f"Error saving conversation: {e}")
+            _firestore_failed('save_conversation', e)
+            return False
+    
+    @_firestore_op('events')
+    def save_events(self, user_id, events):
+        """Index events mentioned in conversation"""
+        if not self.enabled or not events:
+            return False
+            
+        try:
+            batch = self.db.batch()
+            for event in events:
+                event_ref = self.db.collection('events').document()
+                batch.set(event_ref, {
+                    'user_id': user_id,
+                    'description': event.get('description', ''),
+                    'date': event.get('date', ''),
+                    'type': event.get('type', 'general'),
+                    'timestamp': datetime.now()
+                })
+            batch.commit()
+            current_span().set(documents=len(events))
+            return True
+            
+        except Exception as e:
+            print(f"Error saving events: {e}")
+            _firestore_failed('save_events', e)
+            return False
+    
+    @_firestore_op('insights')
+    def save_insights(self, user_id, insights):
+        """Store key insights to remember about the user"""
+        if not self.enabled or not insights:
+            return False
+            
+        try:
+            self.db.collection('insights').add({
+                'user_id': user_id,
+                'insights': list(insights),
+                'timestamp': datetime.now()
+            })
+            return True
+            
+        except Exception as e:
+            print(f"Error saving insights: {e}")
+            _firestore_failed('save_insights', e)
             return False
     
+    @_firestore_op('conversations')
     def get_user_conversations(self, user_id, limit=50):
         """Get user's conversation history"""
         if not self.enabled:
@@ -62,12 +131,60 @@ class FirebaseService:
                 conv['id'] = doc.id
                 conversations.append(conv)
             
+            current_span().set(documents=len(conversations))
             return conversations
             
         except Exception as e:
             print(f"Error fetching conversations: {e}")
+            _firestore_failed('get_user_conversations', e)
             return []
     
+    def iter_user_conversations(self, user_id, page_size=200):
+        """Yield user's conversation history page by page, oldest first"""
+        return self._iter_user_pages('conversations', user_id, page_size, 'iter_user_conversations')
+    
+    def iter_mood_entries(self, user_id, page_size=200):
+        """Yield user's mood entries page by page, oldest first"""
+        return self._iter_user_pages('mood_entries', user_id, page_size, 'iter_mood_entries')
+    
+    def _iter_user_pages(self, collection, user_id, page_size, operation):
+        """Cursor-paginate a user's documents ordered by timestamp
+        
+        A failed page raises, so callers never mistake a partial export for a complete one.
+        """
+        if not self.enabled:
+            return
+            
+        query = self.db.collection(collection).where('user_id', '==', user_id)
+        query = query.order_by('timestamp')
+        
+        last_doc = None
+        while True:
+            page_query = query.start_after(last_doc) if last_doc else query
+            page_attrs = {'collection': collection, 'user': user_id, 'page_size': page_size}
+            with FIRESTORE_LATENCY.time(operation=operation), span('firestore.page', **page_attrs) as page_span:
+                try:
+                    docs = list(page_query.limit(page_size).get())
+                except Exception as e:
+                    print(f"Error paging {collection}: {e}")
+                    _firestore_failed(operation, e)
+                    raise
+                page_span.set(documents=len(docs))
+            if not docs:
+                break
+            
+            page = []
+            for doc in docs:
+                item = doc.to_dict()
+                item['id'] = doc.id
+                page.append(item)
+            yield page
+            
+            if len(docs) < page_size:
+                break
+            last_doc = docs[-1]
+    
+    @_firestore_op('mood_entries')
     def save_mood_entry(self, user_id, mood, description=""):
         """Save mood entry"""
         if not self.enabled:
@@ -87,8 +204,10 @@ class FirebaseService:
             
         except Exception as e:
             print(f"Error saving mood: {e}")
+            _firestore_failed('save_mood_entry', e)
             return False
     
+    @_firestore_op('mood_entries')
     def get_mood_analytics(self, user_id, days=30):
         """Get mood analytics for user"""
         if not self.enabled:
@@ -104,6 +223,7 @@ class FirebaseService:
             moods = []
             for doc in query.get():
                 moods.append(doc.to_dict())
+            current_span().set(documents=len(moods))
             
             # Calculate analytics
             mood_counts = {}
@@ -119,4 +239,5 @@ class FirebaseService:
             
         except Exception as e:
             print(f"Error fetching analytics: {e}")
+            _firestore_failed('get_mood_analytics', e)
             return {}
\ No newline at end of file
@@ -3,6 +3,20 @@ import os
 import json
 import re
 from datetime import datetime, timedelta
+from utils.exercise_catalog import get_exercise_catalog
+from utils.metrics import GEMINI_ERRORS, GEMINI_FALLBACKS, GEMINI_LATENCY
+from utils.tracing import current_span, span, traced
+
+GEMINI_MODEL = 'gemini-1.5-flash'
+
+def _fallback_used(method, reason, error=None):
+    """Record that a reply was built without the model"""
+    call_span = current_span()
+    call_span.set(fallback=True)
+    GEMINI_FALLBACKS.inc(method=method, reason=reason)
+    if error is not None:
+        call_span.record_exception(error)
+        GEMINI_ERRORS.inc(method=method)
 
 class GeminiService:
     def __init__(self):
@@ -10,28 +24,63 @@ class GeminiService:
         
         if api_key and api_key != 'your_gemini_api_key_here':
             genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
+            self.model = genai.GenerativeModel(GEMINI_MODEL)
             self.enabled = True
         else:
             self.enabled = False
             print("Gemini API key not configured")
     
-    def generate_response(self, user_message, conversation_history, current_mood):
-        """Generate AI response with context"""
+    @traced('gemini.generate_response')
+    def generate_response(self, user_message, conversation_history, current_mood, on_chunk=None):
+        """Generate AI response with context
+
+        If on_chunk is given the reply is streamed and on_chunk is called with
+        each piece of text as it arrives.
+        """
+        current_span().set(mood=current_mood, stream=on_chunk is not None)
         if not self.enabled:
+            _fallback_used('generate_response', 'disabled')
             return self._fallback_response(user_message, current_mood)
         
         try:
-            # Build context from recent conversations
-            context = ""
-            if conversation_history:
-                recent_messages = conversation_history[-5:]
-                context = "\n".join([
-                    f"{'User' if msg['role'] == 'user' else 'Assistant'}: {msg['content']}"
-                    for msg in recent_messages
-                ])
+            with span('gemini.prompt') as prompt_span:
+                prompt = self._build_prompt(user_message, conversation_history, current_mood)
+                prompt_span.set(prompt_chars=len(prompt), history_messages=len(conversation_history or ()))
             
-            prompt = f"""
+            # Only model calls are timed; fallbacks are counted by GEMINI_FALLBACKS
+            with GEMINI_LATENCY.time(method='generate_response'), span('gemini.model', model=GEMINI_MODEL) as model_span:
+                if on_chunk is None:
+                    response = self.model.generate_content(prompt)
+                    text = response.text
+                else:
+                    chunks = []
+                    for chunk in self.model.generate_content(prompt, stream=True):
+                        chunks.append(chunk.text)
+                        on_chunk(chunk.text)
+                    text = ''.join(chunks)
+                    model_span.set(chunks=len(chunks))
+                model_span.set(response_chars=len(text))
+            
+            with span('gemini.parse'):
+                return self._parse_response(text, current_mood)
+            
+        except Exception as e:
+            print(f"Gemini API error: {e}")
+            _fallback_used('generate_response', 'error', e)
+            return self._fallback_response(user_message, current_mood)
+    
+    def _build_prompt(self, user_message, conversation_history, current_mood):
+        """Chat prompt with the last few messages as context"""
+        # Build context from recent conversations
+        context = ""
+        if conversation_history:
+            recent_messages = conversation_history[-5:]
+            context = "\n".join([
+                f"{'User' if msg.is_user else 'Assistant'}: {msg.content}"
+                for msg in recent_messages
+            ])
+        
+        return f"""
 You are MindMate, a compassionate AI mental health companion. You provide emotional support, remember conversations, and offer practical guidance.
 
 Current user mood: {current_mood}
@@ -63,32 +112,29 @@ Respond in JSON format:
     "key_insights": ["important things to remember"]
 }}
 """
-            
-            response = self.model.generate_content(prompt)
-            text = response.text.strip()
-            
-            # Clean and parse JSON
-            if text.startswith('```json'):
-                text = text[7:-3]
-            elif text.startswith('```'):
-                text = text[3:-3]
-            
-            try:
-                result = json.loads(text)
-                return result
-            except json.JSONDecodeError:
-                # If JSON parsing fails, extract just the response
-                return {
-                    "response": text,
-                    "mood_detected": current_mood,
-                    "needs_exercise": current_mood in ['anxious', 'stressed', 'negative'],
-                    "events": [],
-                    "key_insights": []
-                }
-            
-        except Exception as e:
-            print(f"Gemini API error: {e}")
-            return self._fallback_response(user_message, current_mood)
+    
+    def _parse_response(self, text, current_mood):
+        """Decode the model's JSON reply, keeping plain text replies as the response"""
+        text = text.strip()
+        
+        # Clean and parse JSON
+        if text.startswith('```json'):
+            text = text[7:-3]
+        elif text.startswith('```'):
+            text = text[3:-3]
+        
+        try:
+            result = json.loads(text)
+            return result
+        except json.JSONDecodeError:
+            # If JSON parsing fails, extract just the response
+            return {
+                "response": text,
+                "mood_detected": current_mood,
+                "needs_exercise": current_mood in ['anxious', 'stressed', 'negative'],
+                "events": [],
+                "key_insights": []
+            }
     
     def _fallback_response(self, user_message, current_mood):
         """Fallback response when API is unavailable"""
@@ -105,7 +151,8 @@ Respond in JSON format:
             "mood_detected": current_mood,
             "needs_exercise": current_mood in ['anxious', 'stressed', 'negative'],
             "events": self._extract_basic_events(user_message),
-            "key_insights": []
+            "key_insights": [],
+            "fallback": True
         }
     
     def _extract_basic_events(self, text):
@@ -131,9 +178,12 @@ Respond in JSON format:
         
         return events[:3]  # Return max 3 events
     
+    @traced('gemini.exercise_suggestions')
     def generate_exercise_suggestions(self, mood, user_preferences=None):
         """Generate mood-based exercise suggestions"""
+        current_span().set(mood=mood)
         if not self.enabled:
+            _fallback_used('exercise_suggestions', 'disabled')
             return self._fallback_exercises(mood)
         
         try:
@@ -163,7 +213,8 @@ Respond in JSON format:
 }}
 """
             
-            response = self.model.generate_content(prompt)
+            with GEMINI_LATENCY.time(method='exercise_suggestions'):
+                response = self.model.generate_content(prompt)
             text = response.text.strip()
             
             if text.startswith('```json'):
@@ -176,65 +227,12 @@ Respond in JSON format:
             
         except Exception as e:
             print(f"Exercise generation error: {e}")
+            _fallback_used('exercise_suggestions', 'error', e)
             return self._fallback_exercises(mood)
     
+    def _catalog_exercises(self, mood):
+        return [exercise.to_dict() for exercise in get_exercise_catalog().query(mood=mood)]
+    
     def _fallback_exercises(self, mood):
-        """Fallback exercises when API unavailable"""
-        exercises = {
-            'anxious': [
-                {
-                    "title": "4-7-8 Breathing",
-                    "description": "Breathe in for 4 counts, hold for 7, exhale for 8. Repeat 4 times.",
-                    "duration": "5 minutes",
-                    "type": "breathing", 
-                    "difficulty": "easy",
-                    "benefits": "Activates relaxation response, reduces anxiety"
-                },
-                {
-                    "title": "Progressive Muscle Relaxation",
-                    "description": "Starting with your toes, tense each muscle group for 5 seconds, then release. Work up to your head.",
-                    "duration": "10 minutes",
-                    "type": "physical",
-                    "difficulty": "easy", 
-                    "benefits": "Releases physical tension, promotes calm"
-                }
-            ],
-            'stressed': [
-                {
-                    "title": "Box Breathing",
-                    "description": "Breathe in for 4, hold for 4, out for 4, hold for 4. Repeat 8 times.",
-                    "duration": "6 minutes",
-                    "type": "breathing",
-                    "difficulty": "easy",
-                    "benefits": "Reduces stress hormones, improves focus"
-                },
-                {
-                    "title": "Mindful Walking",
-                    "description": "Walk slowly, focusing on each step. Notice how your feet feel touching the ground.",
-                    "duration": "10 minutes", 
-                    "type": "mindfulness",
-                    "difficulty": "easy",
-                    "benefits": "Grounds you in present moment, reduces stress"
-                }
-            ],
-            'negative': [
-                {
-                    "title": "Gratitude Practice",
-                    "description": "Write down 3 things you're grateful for, no matter how small. Reflect on why each matters.",
-                    "duration": "8 minutes",
-                    "type": "cognitive", 
-                    "difficulty": "easy",
-                    "benefits": "Shifts focus to positive, improves mood"
-                },
-                {
-                    "title": "Self-Compassion Meditation",
-                    "description": "Place hand on heart. Say: 'This is a moment of suffering. Suffering is part of life. May I be kind to myself.'",
-                    "duration": "10 minutes",
-                    "type": "mindfulness",
-                    "difficulty": "medium",
-                    "benefits": "Reduces self-criticism, increases emotional resilience"
-                }
-            ]
-        }
-        
-        return exercises.get(mood, exercises['anxious'])
\ No newline at end of file
+        """Fallback exercises when API unavailable, flagged so callers don't keep them as model output"""
+        return [dict(exercise, fallback=True) for exercise in self._catalog_exercises(mood)]
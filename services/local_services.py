@@ -0,0 +1,216 @@
+"""In-process stand-ins for Gemini and Firestore
+
+Used when MINDMATE_LOCAL_SERVICES is set, for load tests and offline
+development. They subclass the real services, so prompt building, reply
+parsing and every Firestore query the app makes run unchanged; only the
+network calls are replaced, by a configurable delay.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from services.firebase_service import FirebaseService
+from services.gemini_service import GeminiService
+from utils.metrics import GEMINI_LATENCY
+from utils.tracing import current_span, span, traced
+
+# Simulated round trip for a Gemini call and a Firestore request, in seconds
+DEFAULT_GEMINI_LATENCY = 0.5
+DEFAULT_FIRESTORE_LATENCY = 0.02
+
+# Pieces a streamed reply is split into
+STREAM_CHUNKS = 8
+
+_OPERATORS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a is not None and a < b,
+    '<=': lambda a, b: a is not None and a <= b,
+    '>': lambda a, b: a is not None and a > b,
+    '>=': lambda a, b: a is not None and a >= b,
+    'in': lambda a, b: a in b
+}
+
+class _Snapshot:
+    def __init__(self, doc_id, data, position):
+        self.id = doc_id
+        self._data = data
+        self._position = position
+
+    def to_dict(self):
+        return dict(self._data)
+
+class _DocumentRef:
+    def __init__(self, db, collection, doc_id):
+        self._db = db
+        self._collection = collection
+        self.id = doc_id
+
+    def set(self, data):
+        self._db._write([(self._collection, self.id, dict(data))])
+
+class _Query:
+    """The slice of the Firestore query API MindMate uses"""
+
+    def __init__(self, db, collection, filters=(), order=None, after=None, count=None):
+        self._db = db
+        self._collection = collection
+        self._filters = filters
+        self._order = order
+        self._after = after
+        self._count = count
+
+    def _with(self, **changes):
+        fields = dict(filters=self._filters, order=self._order, after=self._after, count=self._count)
+        fields.update(changes)
+        return _Query(self._db, self._collection, **fields)
+
+    def where(self, field, op, value):
+        return self._with(filters=self._filters + ((field, _OPERATORS[op], value),))
+
+    def order_by(self, field):
+        return self._with(order=field)
+
+    def start_after(self, snapshot):
+        return self._with(after=snapshot)
+
+    def limit(self, count):
+        return self._with(count=count)
+
+    def get(self):
+        self._db._wait()
+        with self._db._lock:
+            documents = list(self._db._collections.get(self._collection, {}).items())
+
+        # Like Firestore, ordering on a field skips documents without it
+        def sort_key(match):
+            return (match[2].get(self._order), match[0]) if self._order else (match[0],)
+
+        matches = sorted(
+            ((position, doc_id, data) for position, (doc_id, data) in enumerate(documents)
+             if all(test(data.get(field), value) for field, test, value in self._filters)
+             and (self._order is None or data.get(self._order) is not None)),
+            key=sort_key
+        )
+        if self._after is not None:
+            after = sort_key((self._after._position, self._after.id, self._after._data))
+            matches = [match for match in matches if sort_key(match) > after]
+        if self._count is not None:
+            matches = matches[:self._count]
+        return [_Snapshot(doc_id, data, position) for position, doc_id, data in matches]
+
+    def stream(self):
+        return iter(self.get())
+
+class _CollectionRef(_Query):
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return datetime.now(), ref
+
+    def document(self, doc_id=None):
+        return _DocumentRef(self._db, self._collection, doc_id or uuid.uuid4().hex[:20])
+
+class _Batch:
+    def __init__(self, db):
+        self._db = db
+        self._writes = []
+
+    def set(self, ref, data):
+        self._writes.append((ref._collection, ref.id, dict(data)))
+
+    def commit(self):
+        self._db._write(self._writes)
+        self._writes = []
+
+class LocalFirestore:
+    """Thread-safe in-memory document store answering like a Firestore client"""
+
+    def __init__(self, latency=None):
+        self.latency = float(latency if latency is not None
+                             else os.getenv('MINDMATE_LOCAL_FIRESTORE_LATENCY', DEFAULT_FIRESTORE_LATENCY))
+        self._lock = threading.Lock()
+        self._collections = {}
+        self.requests = 0
+
+    def _wait(self):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _write(self, writes):
+        self._wait()
+        with self._lock:
+            for collection, doc_id, data in writes:
+                self._collections.setdefault(collection, {})[doc_id] = data
+
+    def collection(self, name):
+        return _CollectionRef(self, name)
+
+    def batch(self):
+        return _Batch(self)
+
+# Shared by every LocalFirebaseService, as one Firestore project would be
+_default_db = None
+_default_db_lock = threading.Lock()
+
+def get_local_firestore():
+    global _default_db
+    with _default_db_lock:
+        if _default_db is None:
+            _default_db = LocalFirestore()
+        return _default_db
+
+class LocalFirebaseService(FirebaseService):
+    def __init__(self, db=None):
+        self.db = db or get_local_firestore()
+        self.enabled = True
+
+class LocalGeminiService(GeminiService):
+    """Answers after a delay with a reply built from the message's detected mood"""
+
+    def __init__(self, latency=None):
+        self.latency = float(latency if latency is not None
+                             else os.getenv('MINDMATE_LOCAL_GEMINI_LATENCY', DEFAULT_GEMINI_LATENCY))
+        self.enabled = True
+
+    @traced('gemini.generate_response')
+    def generate_response(self, user_message, conversation_history, current_mood, on_chunk=None):
+        from utils.helpers import detect_mood_from_text, extract_events_from_text
+
+        current_span().set(mood=current_mood, stream=on_chunk is not None, local=True)
+        with span('gemini.prompt') as prompt_span:
+            prompt = self._build_prompt(user_message, conversation_history, current_mood)
+            prompt_span.set(prompt_chars=len(prompt), history_messages=len(conversation_history or ()))
+
+        mood = detect_mood_from_text(user_message)
+        reply = self._fallback_response(user_message, mood)
+        text = "```json\n" + json.dumps({
+            'response': reply['response'],
+            'mood_detected': mood,
+            'needs_exercise': reply['needs_exercise'],
+            'events': extract_events_from_text(user_message),
+            'key_insights': []
+        }) + "\n```"
+
+        with GEMINI_LATENCY.time(method='generate_response'), span('gemini.model', model='local'):
+            if on_chunk is None:
+                time.sleep(self.latency)
+            else:
+                size = len(text) // STREAM_CHUNKS + 1
+                for start in range(0, len(text), size):
+                    time.sleep(self.latency / STREAM_CHUNKS)
+                    on_chunk(text[start:start + size])
+
+        with span('gemini.parse'):
+            return self._parse_response(text, current_mood)
+
+    @traced('gemini.exercise_suggestions')
+    def generate_exercise_suggestions(self, mood, user_preferences=None):
+        with GEMINI_LATENCY.time(method='exercise_suggestions'):
+            time.sleep(self.latency)
+        return self._catalog_exercises(mood)
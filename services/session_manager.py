@@ -0,0 +1,220 @@
+import os
+import re
+import stat
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from services.session_store import decode_state, encode_state
+
+# Session state keys that grow with usage and are spilled when a session goes cold
+HEAVY_FIELDS = ('conversation_history', 'mood_history')
+
+# Items sampled from the end of a collection when estimating its size
+SIZE_SAMPLE = 8
+
+def _deep_sizeof(obj, depth=0):
+    """Approximate memory of a record and the containers it holds"""
+    size = sys.getsizeof(obj)
+    if depth > 3:
+        return size
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += _deep_sizeof(key, depth + 1) + _deep_sizeof(value, depth + 1)
+    elif isinstance(obj, (list, tuple, set)):
+        for item in obj:
+            size += _deep_sizeof(item, depth + 1)
+    return size
+
+def estimate_size(value):
+    """Estimate a collection's footprint from a sample of its newest items"""
+    try:
+        count = len(value)
+    except TypeError:
+        return _deep_sizeof(value)
+    if not count:
+        return sys.getsizeof(value)
+
+    sample = list(value[-SIZE_SAMPLE:])
+    per_item = sum(_deep_sizeof(item) for item in sample) / len(sample)
+    return int(sys.getsizeof(value) + per_item * count)
+
+class SessionRestoreError(Exception):
+    """Raised when a spilled session's fields cannot be read back; they stay spilled"""
+
+def _private_dir(path):
+    """Create path readable only by this process's user, refusing one owned by anyone else"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+        raise PermissionError(f"Session spill directory {path} is owned by another user")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+class _SessionEntry:
+    __slots__ = ('state', 'last_active', 'resident_bytes', 'spilled')
+
+    def __init__(self, state):
+        self.state = state
+        self.last_active = time.time()
+        self.resident_bytes = 0
+        self.spilled = False
+
+class SessionStateManager:
+    """Tracks session activity and spills idle sessions' heavy state to disk"""
+
+    def __init__(self, spill_dir=None, idle_seconds=None, memory_budget_mb=None,
+                 min_idle_seconds=60, sweep_interval=30, is_session_active=None,
+                 is_session_running=None):
+        self.spill_dir = spill_dir or os.getenv(
+            'MINDMATE_SESSION_SPILL_DIR',
+            os.path.join(tempfile.gettempdir(), 'mindmate_sessions')
+        )
+        self.idle_seconds = float(idle_seconds or os.getenv('MINDMATE_SESSION_IDLE_SECONDS', 900))
+        budget_mb = float(memory_budget_mb or os.getenv('MINDMATE_SESSION_MEMORY_BUDGET_MB', 256))
+        self.memory_budget = int(budget_mb * 1024 * 1024)
+        self.min_idle_seconds = min_idle_seconds
+        self.sweep_interval = sweep_interval
+        self.is_session_active = is_session_active
+        # A running script owns its session state, so only sessions between runs are spilled
+        self.is_session_running = is_session_running or (lambda session_id: False)
+
+        _private_dir(self.spill_dir)
+        self._lock = threading.RLock()
+        self._sessions = OrderedDict()  # session_id -> _SessionEntry, least recently active first
+        self._last_sweep = 0.0
+
+    def touch(self, session_id, state):
+        """Record activity for a session and restore any spilled fields"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = _SessionEntry(state)
+                self._sessions[session_id] = entry
+            else:
+                entry.state = state
+                self._sessions.move_to_end(session_id)
+
+            entry.last_active = now
+            if entry.spilled:
+                self._rehydrate(session_id, entry, state)
+            entry.resident_bytes = self._resident_size(state)
+
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep(now, current_session=session_id)
+
+    def sweep(self, now=None, current_session=None):
+        """Spill idle sessions and enforce the global memory budget"""
+        now = now or time.time()
+
+        with self._lock:
+            self._last_sweep = now
+
+            for session_id, entry in list(self._sessions.items()):
+                if self.is_session_active and not self.is_session_active(session_id):
+                    # Session closed; nothing left to rehydrate into
+                    self._forget(session_id)
+                elif (not entry.spilled and now - entry.last_active >= self.idle_seconds
+                      and session_id != current_session and not self.is_session_running(session_id)):
+                    self._spill(session_id, entry)
+
+            resident = self.resident_bytes()
+            for session_id, entry in list(self._sessions.items()):
+                if resident <= self.memory_budget:
+                    break
+                if entry.spilled or session_id == current_session:
+                    continue
+                if now - entry.last_active < self.min_idle_seconds or self.is_session_running(session_id):
+                    # Possibly mid-run; its script may be reading these fields
+                    continue
+                resident -= entry.resident_bytes
+                self._spill(session_id, entry)
+
+    def resident_bytes(self):
+        """Estimated memory held by heavy fields of resident sessions"""
+        with self._lock:
+            return sum(
+                entry.resident_bytes for entry in self._sessions.values()
+                if not entry.spilled
+            )
+
+    def stats(self):
+        """Counts of tracked, resident and spilled sessions"""
+        with self._lock:
+            spilled = sum(1 for entry in self._sessions.values() if entry.spilled)
+            return {
+                'sessions': len(self._sessions),
+                'resident_sessions': len(self._sessions) - spilled,
+                'spilled_sessions': spilled,
+                'resident_bytes': self.resident_bytes(),
+                'memory_budget_bytes': self.memory_budget
+            }
+
+    def _resident_size(self, state):
+        return sum(
+            estimate_size(state[field]) for field in HEAVY_FIELDS
+            if field in state
+        )
+
+    def _spill_path(self, session_id):
+        safe_id = re.sub(r'[^A-Za-z0-9_-]', '_', session_id)
+        return os.path.join(self.spill_dir, f"{safe_id}.json.z")
+
+    def _spill(self, session_id, entry):
+        state = entry.state
+        fields = {field: state[field] for field in HEAVY_FIELDS if field in state}
+        if not fields:
+            return
+
+        try:
+            payload = encode_state(fields)
+            path = self._spill_path(session_id)
+            tmp_path = f"{path}.tmp"
+            with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error spilling session {session_id}: {e}")
+            return
+
+        for field in fields:
+            del state[field]
+        entry.spilled = True
+        entry.resident_bytes = 0
+
+    def _rehydrate(self, session_id, entry, state):
+        path = self._spill_path(session_id)
+        try:
+            with open(path, 'rb') as f:
+                fields = decode_state(f.read())
+        except (OSError, ValueError) as e:
+            raise SessionRestoreError(f"Session {session_id} could not be restored: {e}") from e
+
+        for field, value in fields.items():
+            state[field] = value
+        entry.spilled = False
+        self._remove_spill(session_id)
+
+    def discard_spill(self, session_id):
+        """Drop a spilled copy whose fields were recovered some other way"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and entry.spilled:
+                entry.spilled = False
+                self._remove_spill(session_id)
+
+    def _remove_spill(self, session_id):
+        try:
+            os.remove(self._spill_path(session_id))
+        except OSError:
+            pass
+
+    def _forget(self, session_id):
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None and entry.spilled:
+            self._remove_spill(session_id)
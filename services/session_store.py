@@ -0,0 +1,250 @@
+import json
+import numbers
+import os
+import sqlite3
+import time
+import zlib
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from utils.messages import ConversationLog
+
+# Session state keys shared across worker processes
+PERSISTED_FIELDS = (
+    'conversation_history',
+    'current_mood',
+    'user_profile',
+    'mood_history',
+    'exercise_completions',
+    'conversation_cleared_at'
+)
+
+# History fields that can be cleared, and the field holding when they last were
+CLEAR_MARKERS = {'conversation_history': 'conversation_cleared_at'}
+
+class SessionConflictError(Exception):
+    """Raised when another worker saved the session since it was loaded"""
+
+    def __init__(self, user_id, expected_version, actual_version):
+        super().__init__(
+            f"Session {user_id} is at version {actual_version}, expected {expected_version}"
+        )
+        self.user_id = user_id
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$datetime': value.isoformat()}
+    if isinstance(value, date):
+        return {'$date': value.isoformat()}
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return float(value)
+    raise TypeError(f"Cannot store {type(value).__name__} in a session")
+
+def _decode_object(obj):
+    if len(obj) == 1:
+        if '$datetime' in obj:
+            return datetime.fromisoformat(obj['$datetime'])
+        if '$date' in obj:
+            return date.fromisoformat(obj['$date'])
+    return obj
+
+def encode_state(state):
+    """Serialize session fields as compressed JSON"""
+    fields = dict(state)
+    if fields.get('conversation_history') is not None:
+        fields['conversation_history'] = [message.to_dict() for message in fields['conversation_history']]
+    return zlib.compress(json.dumps(fields, default=_encode_value, separators=(',', ':')).encode('utf-8'))
+
+def decode_state(payload):
+    """Deserialize session fields written by encode_state, raising ValueError if unreadable"""
+    try:
+        fields = json.loads(zlib.decompress(payload), object_hook=_decode_object)
+    except (zlib.error, UnicodeDecodeError) as e:
+        raise ValueError(f"Unreadable session payload: {e}") from e
+    if fields.get('conversation_history') is not None:
+        fields['conversation_history'] = ConversationLog.from_records(fields['conversation_history'])
+    return fields
+
+class SessionStore(ABC):
+    """Shared session persistence keyed by user ID with versioned writes"""
+
+    @abstractmethod
+    def version(self, user_id):
+        """Current version of a user's session, 0 if none is stored"""
+
+    @abstractmethod
+    def load(self, user_id):
+        """Return (state, version) for a user, or (None, 0) if none is stored"""
+
+    @abstractmethod
+    def save(self, user_id, state, expected_version):
+        """Write state if the stored version still matches, returning the new version"""
+
+    @abstractmethod
+    def delete(self, user_id):
+        """Remove a user's stored session"""
+
+    @abstractmethod
+    def iter_states(self):
+        """Yield (user_id, state) for every stored session"""
+
+class SQLiteSessionStore(SessionStore):
+    """Session store backed by a local SQLite file shared by all workers"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    user_id TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    state BLOB NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps this safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def version(self, user_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT version FROM sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def load(self, user_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT state, version FROM sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        if not row:
+            return None, 0
+        try:
+            return decode_state(row[0]), row[1]
+        except ValueError as e:
+            # e.g. written by an older release; the next save replaces it
+            print(f"Error decoding session for {user_id}: {e}")
+            return None, row[1]
+
+    def save(self, user_id, state, expected_version):
+        payload = encode_state(state)
+        new_version = expected_version + 1
+
+        with self._connect() as conn:
+            if expected_version == 0:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO sessions (user_id, version, state, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (user_id, new_version, payload, time.time())
+                )
+            else:
+                cursor = conn.execute(
+                    "UPDATE sessions SET version = ?, state = ?, updated_at = ? "
+                    "WHERE user_id = ? AND version = ?",
+                    (new_version, payload, time.time(), user_id, expected_version)
+                )
+
+            if cursor.rowcount == 0:
+                row = conn.execute(
+                    "SELECT version FROM sessions WHERE user_id = ?", (user_id,)
+                ).fetchone()
+                raise SessionConflictError(user_id, expected_version, row[0] if row else 0)
+
+        return new_version
+
+    def delete(self, user_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+
+    def iter_states(self):
+        with self._connect() as conn:
+            for user_id, payload in conn.execute("SELECT user_id, state FROM sessions"):
+                try:
+                    yield user_id, decode_state(payload)
+                except ValueError as e:
+                    print(f"Error decoding session for {user_id}: {e}")
+
+# URL scheme -> factory taking the rest of the URL
+SESSION_STORE_BACKENDS = {
+    'sqlite': SQLiteSessionStore
+}
+
+def register_session_store(scheme, factory):
+    """Make a session store backend available under a URL scheme"""
+    SESSION_STORE_BACKENDS[scheme] = factory
+
+def create_session_store(url=None):
+    """Build the configured session store, e.g. sqlite:///path/to/sessions.db"""
+    url = url or os.getenv('MINDMATE_SESSION_STORE', 'sqlite:///mindmate_sessions.db')
+    scheme, _, location = url.partition('://')
+
+    factory = SESSION_STORE_BACKENDS.get(scheme)
+    if factory is None:
+        raise ValueError(f"Unsupported session store: {url}")
+    if scheme == 'sqlite':
+        # sqlite:///relative.db and sqlite:////absolute/path.db
+        location = location[1:] if location.startswith('/') else location
+    return factory(location)
+
+def _record_key(record):
+    """Identity used to de-duplicate history entries when merging"""
+    if isinstance(record, dict):
+        return tuple(sorted((key, repr(value)) for key, value in record.items()))
+    return repr(record)
+
+def _sort_key(record):
+    timestamp = record.get('timestamp') if isinstance(record, dict) else getattr(record, 'timestamp', 0)
+    return timestamp.timestamp() if hasattr(timestamp, 'timestamp') else (timestamp or 0)
+
+def merge_states(local, remote):
+    """Combine a stale local state with the latest stored one
+
+    History fields keep every entry from both sides in time order; scalar
+    fields take the local value since it reflects the user's latest action.
+    A clear on either side is a tombstone: entries from before the latest
+    one are dropped, so a conflicting save cannot bring them back.
+    """
+    merged = dict(remote)
+    for field, local_value in local.items():
+        remote_value = remote.get(field)
+        if remote_value is None or not hasattr(local_value, '__iter__') or isinstance(local_value, (str, dict)):
+            merged[field] = local_value
+            continue
+
+        seen = {_record_key(record) for record in remote_value}
+        extra = [record for record in local_value if _record_key(record) not in seen]
+        if not extra:
+            merged[field] = remote_value
+            continue
+
+        combined = sorted(list(remote_value) + extra, key=_sort_key)
+        merged[field] = type(local_value)(combined)
+
+    for field, marker in CLEAR_MARKERS.items():
+        cleared_at = max(local.get(marker) or 0, remote.get(marker) or 0)
+        if not cleared_at:
+            continue
+        merged[marker] = cleared_at
+        if merged.get(field) is not None:
+            # Entries from the clear's own second survive rather than risk dropping new ones
+            merged[field] = type(merged[field])(
+                record for record in merged[field] if _sort_key(record) >= cleared_at
+            )
+    return merged
@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.exercise_catalog import get_exercise_catalog
+from utils.tracing import current_span
+
+# Moods warmed at startup
+SUGGESTION_MOODS = ('positive', 'neutral', 'anxious', 'stressed', 'negative')
+
+# Distinct (mood, preferences) entries kept before the least used is dropped
+MAX_SUGGESTION_KEYS = 64
+
+# Concurrent fetches on the cache's own pool, so warming never delays conversation saves
+SUGGESTION_WORKERS = 2
+
+# Wait before asking again after the model fell back to catalog exercises, doubled per failure
+RETRY_SECONDS = 60
+MAX_RETRY_SECONDS = 3600
+
+def normalize_preferences(preferences):
+    """Order- and case-insensitive key for a user's exercise preferences"""
+    if not preferences:
+        return ()
+    if isinstance(preferences, str):
+        preferences = preferences.split(',')
+    return tuple(sorted({str(preference).strip().lower() for preference in preferences if str(preference).strip()}))
+
+class SuggestionCache:
+    """In-memory AI exercise suggestions, filled and refreshed off the request path
+
+    get() never calls the LLM: a miss returns catalog exercises straight away
+    and queues a background fetch for next time.
+    """
+
+    def __init__(self, gemini=None, executor=None, refresh_seconds=None, max_keys=MAX_SUGGESTION_KEYS):
+        self.gemini = gemini
+        if executor is None and gemini is not None:
+            from services.task_executor import TaskExecutor
+            executor = TaskExecutor(SUGGESTION_WORKERS, max_keys, thread_name_prefix='mindmate-suggestions')
+        self.executor = executor
+        self.refresh_seconds = float(refresh_seconds or os.getenv('MINDMATE_SUGGESTION_REFRESH_SECONDS', 6 * 3600))
+        self.max_keys = max_keys
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (mood, preferences) -> (suggestions, fetched_at)
+        self._pending = set()
+        self._retries = {}  # key -> (consecutive fallbacks, earliest next fetch)
+        self._stop = threading.Event()
+        self._refresher = None
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        """Warm every mood and begin periodic refreshes"""
+        if self.gemini is None or self._refresher is not None:
+            return
+        for mood in SUGGESTION_MOODS:
+            self._schedule((mood, ()))
+
+        self._refresher = threading.Thread(target=self._refresh_loop, name='mindmate-suggestions', daemon=True)
+        self._refresher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def get(self, mood, preferences=None):
+        """Cached suggestions for a mood and preference set, or catalog exercises on a miss"""
+        key = (mood.lower(), normalize_preferences(preferences))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                current_span().set(cache_hit=True)
+                return entry[0]
+            self.misses += 1
+
+        current_span().set(cache_hit=False)
+        self._schedule(key)
+        return [exercise.to_dict() for exercise in get_exercise_catalog().query(mood=key[0])]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'pending': len(self._pending),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _schedule(self, key):
+        if self.gemini is None or self.executor is None:
+            return
+        with self._lock:
+            if key in self._pending or time.time() < self._retries.get(key, (0, 0))[1]:
+                return
+            self._pending.add(key)
+
+        if not self.executor.submit('exercise_suggestions', self._fetch, key):
+            with self._lock:
+                self._pending.discard(key)
+
+    def _fetch(self, key):
+        mood, preferences = key
+        try:
+            suggestions = self.gemini.generate_exercise_suggestions(mood, list(preferences) or None)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+        if any(suggestion.get('fallback') for suggestion in suggestions):
+            # Catalog exercises stand in for the model; don't serve them as its answer for hours
+            with self._lock:
+                failures = self._retries.get(key, (0, 0))[0]
+                delay = min(RETRY_SECONDS * 2 ** failures, MAX_RETRY_SECONDS)
+                self._retries[key] = (failures + 1, time.time() + delay)
+            return suggestions
+
+        with self._lock:
+            self._retries.pop(key, None)
+            self._entries[key] = (suggestions, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        return suggestions
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_seconds):
+            cutoff = time.time() - self.refresh_seconds
+            with self._lock:
+                stale = [key for key, (_, fetched_at) in self._entries.items() if fetched_at <= cutoff]
+            try:
+                for key in stale:
+                    self._schedule(key)
+            except RuntimeError as e:
+                # Executor shut down, e.g. at interpreter exit
+                print(f"Stopping suggestion refresh: {e}")
+                return
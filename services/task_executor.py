@@ -0,0 +1,80 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.tracing import propagate, span
+
+class TaskExecutor:
+    """Bounded thread pool for fire-and-forget work that runs after a response is shown"""
+
+    def __init__(self, max_workers=None, max_queue=None, thread_name_prefix='mindmate-task'):
+        self.max_workers = int(max_workers or os.getenv('MINDMATE_TASK_WORKERS', 4))
+        self.max_queue = int(max_queue or os.getenv('MINDMATE_TASK_QUEUE_SIZE', 256))
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=thread_name_prefix
+        )
+        # Caps queued plus running tasks so a slow backend cannot grow the queue without bound
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._counts = {
+            'queued': 0,
+            'running': 0,
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0
+        }
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Queue fn to run in the background; returns False if the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._counts['rejected'] += 1
+            print(f"Task queue full, dropping {name}")
+            return False
+
+        with self._lock:
+            self._counts['queued'] += 1
+            self._counts['submitted'] += 1
+
+        # Runs in the submitter's trace, so background writes show up under the turn that queued them
+        self._pool.submit(propagate(self._run), name, fn, args, kwargs)
+        return True
+
+    def _run(self, name, fn, args, kwargs):
+        with self._lock:
+            self._counts['queued'] -= 1
+            self._counts['running'] += 1
+
+        try:
+            with span(f'task.{name}'):
+                fn(*args, **kwargs)
+        except Exception as e:
+            print(f"Background task {name} failed: {e}")
+            with self._lock:
+                self._counts['failed'] += 1
+            return
+        finally:
+            with self._lock:
+                self._counts['running'] -= 1
+            self._slots.release()
+
+        with self._lock:
+            self._counts['completed'] += 1
+
+    def queue_depth(self):
+        with self._lock:
+            return self._counts['queued']
+
+    def metrics(self):
+        """Snapshot of queue depth and task outcome counters"""
+        with self._lock:
+            snapshot = dict(self._counts)
+        snapshot['max_workers'] = self.max_workers
+        snapshot['max_queue'] = self.max_queue
+        return snapshot
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,209 @@
+import itertools
+from datetime import date
+
+import plotly.graph_objects as go
+import streamlit as st
+
+from utils.analytics_engine import WEEKDAYS, build_observations, compute_analytics, current_streak, observation_days
+from utils.chart_data import downsample, zoom_window
+from utils.forecast import MoodForecaster
+from utils.insights import InsightState, build_insights
+from utils.tracing import current_span, span
+
+# Process-wide so a version identifies one snapshot of one session's data
+_versions = itertools.count(1)
+
+# Data versions kept in the frame and figure caches
+ANALYTICS_CACHE_ENTRIES = 256
+
+MOOD_COLORS = {
+    'positive': '#28a745',
+    'neutral': '#ffc107',
+    'anxious': '#fd7e14',
+    'stressed': '#6f42c1',
+    'negative': '#dc3545',
+    'crisis': '#dc3545'
+}
+
+def _data_fingerprint():
+    """Cheap identity of the session's mood sources, used to catch unbumped changes"""
+    mood_history = st.session_state.get('mood_history') or []
+    conversation = st.session_state.get('conversation_history') or ()
+    return (
+        len(mood_history),
+        mood_history[-1].get('timestamp') if mood_history else None,
+        len(conversation),
+        conversation[-1].key if len(conversation) else None
+    )
+
+def analytics_version():
+    """Version of this session's mood data, bumped whenever new entries arrive"""
+    fingerprint = _data_fingerprint()
+    if 'analytics_version' not in st.session_state or st.session_state.get('analytics_fingerprint') != fingerprint:
+        bump_analytics_version()
+        st.session_state.analytics_fingerprint = fingerprint
+    return st.session_state.analytics_version
+
+def bump_analytics_version():
+    st.session_state.analytics_version = next(_versions)
+
+@st.cache_data(max_entries=ANALYTICS_CACHE_ENTRIES, show_spinner=False)
+def build_mood_frame(version, _mood_history, _conversation_history):
+    """Check-in and chat mood observations as a DataFrame; cached per data version"""
+    return build_observations(_mood_history, _conversation_history)
+
+def _trend_figure(daily):
+    fig = go.Figure()
+    traces = (
+        ('score', 'Daily', dict(color='#667eea', width=2), 'lines+markers'),
+        ('rolling_7', '7-day average', dict(color='#764ba2', width=3), 'lines'),
+        ('rolling_30', '30-day average', dict(color='#28a745', width=3, dash='dot'), 'lines')
+    )
+    for column, name, line, mode in traces:
+        series = downsample(daily[column])
+        fig.add_trace(go.Scatter(
+            x=series.index, y=series.to_numpy(), name=name,
+            mode=mode, connectgaps=False, line=line, marker=dict(size=5)
+        ))
+    fig.update_layout(
+        title='Mood Score Over Time',
+        xaxis_title="Date",
+        yaxis_title="Mood Score (1-5)",
+        yaxis_range=[0.5, 5.5],
+        height=400,
+        legend=dict(orientation='h', y=-0.2)
+    )
+    return fig
+
+def _profile_figure(profile, title, x_title):
+    # Profiles are already one value per weekday or hour
+    fig = go.Figure(go.Bar(
+        x=profile.index,
+        y=profile.to_numpy(),
+        marker=dict(color=profile.to_numpy(), colorscale='RdYlGn', cmin=1, cmax=5, showscale=True)
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_title,
+        yaxis_title="Average Mood Score",
+        showlegend=False
+    )
+    return fig
+
+def _pie_figure(mood_counts):
+    # One slice per mood from the precomputed counts
+    fig = go.Figure(go.Pie(
+        labels=mood_counts.index,
+        values=mood_counts.to_numpy(),
+        marker=dict(colors=[MOOD_COLORS.get(mood, '#6c757d') for mood in mood_counts.index]),
+        textposition='inside',
+        textinfo='percent+label'
+    ))
+    fig.update_layout(title="Distribution of Moods")
+    return fig
+
+@st.cache_resource(max_entries=ANALYTICS_CACHE_ENTRIES, show_spinner=False)
+def build_analytics_views(version, today, _mood_history, _conversation_history):
+    """Metrics and Plotly figures for one data version as of one day
+
+    Streaks, week-over-week stats and the daily calendar run up to today,
+    so they are rebuilt after midnight even if the data hasn't changed.
+    Cached as shared objects, so callers must treat them as read-only.
+    """
+    current_span().set(cache_hit=False)
+    observations = build_mood_frame(version, _mood_history, _conversation_history)
+    views = compute_analytics(observations, today)
+
+    views.update({
+        'version': version,
+        'today': today,
+        'observations': observations,
+        'fig_pie': _pie_figure(views['mood_counts']),
+        'fig_weekly': _profile_figure(
+            views['weekday_profile'].reindex(WEEKDAYS), "Average Mood by Day of Week", "Day of Week"
+        ),
+        'fig_hourly': _profile_figure(
+            views['hour_profile'], "Average Mood by Hour of Day", "Hour of Day"
+        )
+    })
+    return views
+
+@st.cache_resource(max_entries=ANALYTICS_CACHE_ENTRIES, show_spinner=False)
+def build_trend_figure(version, today, days, _daily):
+    """Downsampled trend figure for one data version, day and zoom range"""
+    return _trend_figure(zoom_window(_daily, days))
+
+def get_trend_figure(views, days=None):
+    """Trend figure for views from get_analytics_views(), zoomed to the last `days` days"""
+    return build_trend_figure(views['version'], views['today'], days, views['daily'])
+
+def get_analytics_views():
+    """Analytics for the current session's mood history and conversation"""
+    # build_analytics_views clears cache_hit when it actually runs
+    with span('analytics.views', cache_hit=True) as views_span:
+        views = build_analytics_views(
+            analytics_version(),
+            date.today(),
+            st.session_state.get('mood_history') or [],
+            st.session_state.get('conversation_history') or ()
+        )
+        views_span.set(version=views['version'], entries=views['total_entries'])
+        return views
+
+def get_current_streak():
+    """Current check-in streak, memoized per data version and day
+
+    Matches get_analytics_views()['current_streak'] without building the
+    frames and figures, for pages that only show the streak.
+    """
+    key = (analytics_version(), date.today())
+    cached = st.session_state.get('analytics_streak')
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    streak = current_streak(observation_days(
+        st.session_state.get('mood_history') or [],
+        st.session_state.get('conversation_history') or ()
+    ), key[1])
+    st.session_state.analytics_streak = (key, streak)
+    return streak
+
+def get_insights(views):
+    """Insight cards for views from get_analytics_views(), memoized per data version and day
+
+    The hour and weekday totals live in session state and only absorb the
+    observations added since the last version.
+    """
+    completions = st.session_state.get('exercise_completions') or []
+    key = (views['version'], views['today'], len(completions))
+    cached = st.session_state.get('analytics_insights')
+    if cached is not None and cached[0] == key:
+        current_span().set(cache_hit=True)
+        return cached[1]
+    current_span().set(cache_hit=False)
+
+    state = st.session_state.get('insight_state') or InsightState()
+    insights = build_insights(state.update(views['observations']), views, completions)
+    st.session_state.insight_state = state
+    st.session_state.analytics_insights = (key, insights)
+    return insights
+
+def get_mood_forecaster():
+    """This session's forecaster, primed again whenever the data version changes
+
+    save_mood_entry feeds new entries in directly and re-keys it with
+    keep_mood_forecaster, so only loads, logins and cleared chats re-prime.
+    """
+    version = analytics_version()
+    cached = st.session_state.get('mood_forecaster')
+    if cached is None or cached[0] != version:
+        cached = (version, MoodForecaster.from_observations(build_observations(
+            st.session_state.get('mood_history') or [],
+            st.session_state.get('conversation_history') or ()
+        )))
+        st.session_state.mood_forecaster = cached
+    return cached[1]
+
+def keep_mood_forecaster(forecaster):
+    """Mark forecaster as up to date with the session's current mood data"""
+    st.session_state.mood_forecaster = (analytics_version(), forecaster)
@@ -0,0 +1,195 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.messages import MOOD_SCORES
+
+# Description on mood history entries written from chat replies
+CHAT_MOOD_NOTE = "Detected in chat"
+
+# A day whose average score reaches this counts as a positive day
+POSITIVE_DAY_SCORE = 4.0
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+OBSERVATION_COLUMNS = ['timestamp', 'mood', 'mood_score', 'source']
+
+# Local wall-clock times are packed as microseconds since this naive epoch,
+# which pandas converts far faster than a list of datetime objects
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+def _as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return datetime.fromtimestamp(value)
+
+def build_observations(mood_history=(), conversation_history=()):
+    """One row per mood observation from check-ins and chat replies, oldest first
+
+    Chat moods come from the conversation log. Their mood history copies are
+    only used for the time before the log starts, e.g. after a cleared chat.
+    """
+    timestamps = []
+    moods = []
+    sources = []
+    log_start = conversation_history[0].created_at if len(conversation_history) else datetime.max
+
+    for entry in mood_history:
+        if entry.get('timestamp') is None:
+            continue
+        timestamp = _as_datetime(entry['timestamp'])
+        from_chat = entry.get('description') == CHAT_MOOD_NOTE
+        if from_chat and timestamp >= log_start:
+            continue
+        timestamps.append((timestamp - _EPOCH) // _MICROSECOND)
+        moods.append(entry.get('mood') or 'neutral')
+        sources.append('chat' if from_chat else 'check_in')
+
+    for message in conversation_history:
+        if message.is_user or message.mood is None:
+            continue
+        timestamps.append((message.created_at - _EPOCH) // _MICROSECOND)
+        moods.append(message.mood.value)
+        sources.append('chat')
+
+    frame = pd.DataFrame({
+        'timestamp': pd.to_datetime(np.array(timestamps, dtype=np.int64), unit='us'),
+        'mood': pd.Series(moods, dtype='object').str.lower(),
+        'source': pd.Series(sources, dtype='object')
+    })
+    frame['mood_score'] = frame['mood'].map(MOOD_SCORES).fillna(MOOD_SCORES['neutral']).astype(float)
+    return frame.sort_values('timestamp', kind='stable', ignore_index=True)[OBSERVATION_COLUMNS]
+
+def daily_scores(observations, today=None):
+    """Per-day mean score, check-in count, dominant mood and rolling means
+
+    The index covers every calendar day from the first observation to today,
+    so days without check-ins appear with a count of 0.
+    """
+    today = pd.Timestamp(today or date.today()).normalize()
+    if observations.empty:
+        return pd.DataFrame(
+            columns=['score', 'count', 'mood', 'rolling_7', 'rolling_30'],
+            index=pd.DatetimeIndex([], name='date')
+        )
+
+    days = observations['timestamp'].dt.normalize()
+    grouped = observations.groupby(days)['mood_score']
+    start = min(days.iloc[0], today)
+    calendar = pd.date_range(start, max(days.iloc[-1], today), freq='D', name='date')
+
+    daily = pd.DataFrame({
+        'score': grouped.mean(),
+        'count': grouped.size()
+    }).reindex(calendar)
+    daily['count'] = daily['count'].fillna(0).astype(int)
+
+    mood_counts = observations.groupby([days, observations['mood']]).size().unstack(fill_value=0)
+    daily['mood'] = mood_counts.idxmax(axis=1).reindex(calendar)
+
+    # Rolling windows are in calendar days; empty days are skipped, not zero
+    daily['rolling_7'] = daily['score'].rolling(7, min_periods=1).mean()
+    daily['rolling_30'] = daily['score'].rolling(30, min_periods=1).mean()
+    return daily
+
+def _run_lengths(active):
+    """Lengths of consecutive True runs in a boolean array"""
+    padded = np.concatenate(([False], active, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[1::2] - edges[::2]
+
+def streaks(daily):
+    """Current and longest runs of consecutive days with a check-in
+
+    A streak still counts as current if today has no check-in yet but
+    yesterday did.
+    """
+    if daily.empty:
+        return 0, 0
+
+    active = daily['count'].to_numpy() > 0
+    runs = _run_lengths(active)
+    longest = int(runs.max()) if runs.size else 0
+
+    end = len(active) if active[-1] else len(active) - 1
+    gaps = np.flatnonzero(~active[:end])
+    current = end - (gaps[-1] + 1 if gaps.size else 0)
+    return int(current), longest
+
+def observation_days(mood_history=(), conversation_history=()):
+    """Calendar days with at least one mood observation, without building the frame"""
+    days = {_as_datetime(entry['timestamp']).date() for entry in mood_history if entry.get('timestamp') is not None}
+    days.update(
+        message.created_at.date() for message in conversation_history
+        if not message.is_user and message.mood is not None
+    )
+    return days
+
+def current_streak(days, today=None):
+    """The current run of streaks() from a set of observation days"""
+    today = today or date.today()
+    day = today if today in days else today - timedelta(days=1)
+    streak = 0
+    while day in days:
+        streak += 1
+        day -= timedelta(days=1)
+    return streak
+
+def _window_stats(daily, start, end):
+    window = daily.loc[start:end]
+    days_with_data = window['score'].notna()
+    return {
+        'check_ins': int(window['count'].sum()),
+        'avg_score': float(window['score'].mean()) if days_with_data.any() else None,
+        'positive_percent': float((window['score'] >= POSITIVE_DAY_SCORE).sum() / days_with_data.sum() * 100)
+        if days_with_data.any() else None
+    }
+
+def week_over_week(daily, today=None):
+    """This week's (last 7 days) stats, last week's, and their differences"""
+    today = pd.Timestamp(today or date.today()).normalize()
+    this_week = _window_stats(daily, today - pd.Timedelta(days=6), today)
+    last_week = _window_stats(daily, today - pd.Timedelta(days=13), today - pd.Timedelta(days=7))
+
+    deltas = {}
+    for key in this_week:
+        current, previous = this_week[key], last_week[key]
+        deltas[key] = current - previous if current is not None and previous is not None else None
+    return {'this_week': this_week, 'last_week': last_week, 'delta': deltas}
+
+def weekday_profile(observations):
+    """Mean score per day of week, Monday first"""
+    profile = observations.groupby(observations['timestamp'].dt.dayofweek)['mood_score'].mean()
+    return pd.Series(profile.reindex(range(7)).to_numpy(), index=WEEKDAYS, name='mood_score')
+
+def hour_profile(observations):
+    """Mean score per hour of day, 0-23"""
+    profile = observations.groupby(observations['timestamp'].dt.hour)['mood_score'].mean()
+    return profile.reindex(range(24)).rename('mood_score')
+
+def compute_analytics(observations, today=None):
+    """All Analytics page metrics for one user's observations"""
+    daily = daily_scores(observations, today)
+    current_streak, longest_streak = streaks(daily)
+    scored_days = daily['score'].notna()
+
+    return {
+        'total_entries': len(observations),
+        'days_tracked': int(scored_days.sum()),
+        'avg_mood': float(observations['mood_score'].mean()) if len(observations) else None,
+        'positive_percent': float((daily['score'] >= POSITIVE_DAY_SCORE).sum() / scored_days.sum() * 100)
+        if scored_days.any() else None,
+        'current_streak': current_streak,
+        'longest_streak': longest_streak,
+        'week_over_week': week_over_week(daily, today),
+        'mood_counts': observations['mood'].value_counts(),
+        'daily': daily,
+        'weekday_profile': weekday_profile(observations),
+        'hour_profile': hour_profile(observations)
+    }
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# Most points sent per trend trace, whatever the history length
+MAX_TREND_POINTS = 400
+
+# Zoom choices for the trend chart, in days; None means all
+TREND_RANGES = {
+    'Last 30 days': 30,
+    'Last 90 days': 90,
+    'Last year': 365,
+    'All time': None
+}
+
+def lttb_indices(x, y, threshold):
+    """Positions kept by Largest-Triangle-Three-Buckets downsampling
+
+    Always keeps the first and last points; in each bucket between them it
+    keeps the point forming the largest triangle with the previously kept
+    point and the next bucket's average, which preserves peaks and dips.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+
+    # Average of every bucket, with the last point standing in after the final bucket
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    avg_x = np.append(sums_x / sizes, x[-1])
+    avg_y = np.append(sums_y / sizes, y[-1])
+
+    kept = np.empty(threshold, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        areas = np.abs(
+            (x[previous] - avg_x[bucket + 1]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y[bucket + 1] - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return kept
+
+def downsample(series, max_points=MAX_TREND_POINTS):
+    """A time-indexed series reduced to at most max_points with LTTB
+
+    Missing values are dropped first. Short series come back unchanged,
+    gaps included.
+    """
+    if len(series) <= max_points:
+        return series
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+    kept = lttb_indices(series.index.asi8, series.to_numpy(), max_points)
+    return series.iloc[kept]
+
+def zoom_window(daily, days=None, today=None):
+    """The last `days` calendar days of a daily frame, or all of it"""
+    if days is None or daily.empty:
+        return daily
+    today = pd.Timestamp(today or pd.Timestamp.now()).normalize()
+    return daily.loc[today - pd.Timedelta(days=days - 1):]
@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict
+
+from utils.tracing import current_span
+
+# Bump when the message markup changes so cached HTML is rebuilt
+RENDER_VERSION = 1
+
+# Messages shown on first load and added per "load earlier" click
+CHAT_WINDOW = 30
+
+# Rendered messages kept across all sessions
+MAX_CACHED_MESSAGES = 5000
+
+MOOD_EMOJIS = {
+    'positive': '😊',
+    'neutral': '😐',
+    'anxious': '😰',
+    'stressed': '😤',
+    'negative': '😔',
+    'crisis': '🆘'
+}
+
+def _render_user(message):
+    return (
+        '<div class="chat-message user-message">'
+        f'<strong>You:</strong> {message.content}'
+        f'<br><small style="opacity: 0.8;">{message.created_at.strftime("%H:%M")}</small>'
+        '</div>'
+    )
+
+def _render_assistant(message):
+    mood = message.mood_name
+    parts = [
+        '<div class="chat-message ai-message">'
+        f'<strong>🧠 MindMate:</strong> {message.content}'
+        f'<span class="mood-indicator mood-{mood}">{MOOD_EMOJIS.get(mood, "😐")} {mood.title()}</span>'
+        f'<br><small style="opacity: 0.6;">{message.created_at.strftime("%H:%M")}</small>'
+        '</div>'
+    ]
+
+    if message.needs_exercise:
+        parts.append(
+            '<div class="chat-hint">💡 I think some wellness exercises might help you feel better. '
+            'Check out the Exercises page!</div>'
+        )
+
+    if message.events:
+        items = ''.join(
+            f"<li>{event.get('description', 'Event')} - {event.get('date', 'Date not specified')}</li>"
+            for event in message.events
+        )
+        parts.append(f'<details class="chat-events"><summary>📅 Events I remembered</summary><ul>{items}</ul></details>')
+
+    return ''.join(parts)
+
+class ChatRenderer:
+    """Builds chat HTML once per message and reuses it on later reruns
+
+    Messages are immutable, so a message's key plus RENDER_VERSION fully
+    identifies its markup.
+    """
+
+    def __init__(self, max_cached=MAX_CACHED_MESSAGES):
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def message_html(self, message):
+        """Rendered HTML for one message, from cache when possible"""
+        return self._lookup(message)[0]
+
+    def _lookup(self, message):
+        cache_key = (message.key, RENDER_VERSION)
+
+        with self._lock:
+            html = self._cache.get(cache_key)
+            if html is not None:
+                self._cache.move_to_end(cache_key)
+                self.hits += 1
+                return html, True
+
+        html = _render_user(message) if message.is_user else _render_assistant(message)
+
+        with self._lock:
+            self.misses += 1
+            self._cache[cache_key] = html
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return html, False
+
+    def window_html(self, messages):
+        """Concatenated HTML for a run of messages"""
+        parts = []
+        hits = 0
+        for message in messages:
+            html, hit = self._lookup(message)
+            parts.append(html)
+            hits += hit
+        current_span().set(rendered=len(parts), cache_hits=hits)
+        return ''.join(parts)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'cached_messages': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+def visible_window(history, window_size):
+    """The most recent window_size messages and how many are hidden before them"""
+    window = history.tail(window_size)
+    return window, len(history) - len(window)
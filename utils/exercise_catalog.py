@@ -0,0 +1,154 @@
+import bisect
+import json
+import os
+import threading
+from types import MappingProxyType
+from typing import NamedTuple
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'exercises.json')
+
+# Mood used when a query names a mood with no exercises
+DEFAULT_MOOD = 'neutral'
+
+class Exercise(NamedTuple):
+    """One wellness exercise from the catalog"""
+    id: str
+    title: str
+    emoji: str
+    description: str
+    moods: tuple
+    type: str
+    difficulty: str
+    duration_minutes: int
+    instructions: tuple
+    benefits: str
+    suggestion: str
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            id=data['id'],
+            title=data['title'],
+            emoji=data.get('emoji', '🧘'),
+            description=data['description'],
+            moods=tuple(data.get('moods', ())),
+            type=data['type'],
+            difficulty=data.get('difficulty', 'easy'),
+            duration_minutes=int(data['duration_minutes']),
+            instructions=tuple(data.get('instructions', ())),
+            benefits=data.get('benefits', ''),
+            suggestion=data.get('suggestion', data['description'])
+        )
+
+    @property
+    def duration(self):
+        """Duration as shown to users, e.g. '5 minutes'"""
+        return f"{self.duration_minutes} minutes"
+
+    def to_dict(self):
+        """Plain dict in the shape the pages and Gemini fallbacks use"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'duration': self.duration,
+            'type': self.type,
+            'difficulty': self.difficulty,
+            'instructions': list(self.instructions),
+            'benefits': self.benefits
+        }
+
+def _index_by(exercises, values_of):
+    index = {}
+    for position, exercise in enumerate(exercises):
+        for value in values_of(exercise):
+            index.setdefault(value, []).append(position)
+    return MappingProxyType({value: tuple(positions) for value, positions in index.items()})
+
+class ExerciseCatalog:
+    """Immutable exercise list with indexes by mood, type, difficulty and duration"""
+    __slots__ = ('version', '_exercises', '_by_id', '_by_mood', '_by_type', '_by_difficulty',
+                 '_durations', '_duration_positions')
+
+    def __init__(self, exercises, version=1):
+        self.version = version
+        self._exercises = tuple(exercises)
+        self._by_id = MappingProxyType({exercise.id: exercise for exercise in self._exercises})
+        self._by_mood = _index_by(self._exercises, lambda exercise: exercise.moods)
+        self._by_type = _index_by(self._exercises, lambda exercise: (exercise.type,))
+        self._by_difficulty = _index_by(self._exercises, lambda exercise: (exercise.difficulty,))
+
+        by_duration = sorted(range(len(self._exercises)), key=lambda i: self._exercises[i].duration_minutes)
+        self._durations = tuple(self._exercises[i].duration_minutes for i in by_duration)
+        self._duration_positions = tuple(by_duration)
+
+    @classmethod
+    def from_file(cls, path=CATALOG_PATH):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(
+            (Exercise.from_dict(item) for item in data['exercises']),
+            version=data.get('version', 1)
+        )
+
+    def __len__(self):
+        return len(self._exercises)
+
+    def __iter__(self):
+        return iter(self._exercises)
+
+    def get(self, exercise_id):
+        return self._by_id.get(exercise_id)
+
+    def moods(self):
+        return tuple(self._by_mood)
+
+    def query(self, mood=None, type=None, difficulty=None, min_minutes=None, max_minutes=None, limit=None):
+        """Exercises matching every given filter, in catalog order
+
+        A mood with no exercises falls back to DEFAULT_MOOD so callers always
+        get something to suggest.
+        """
+        candidates = None
+
+        if mood is not None:
+            mood = mood.lower()
+            candidates = self._by_mood.get(mood) or self._by_mood.get(DEFAULT_MOOD, ())
+        for index, value in ((self._by_type, type), (self._by_difficulty, difficulty)):
+            if value is None:
+                continue
+            positions = index.get(value.lower(), ())
+            if candidates is None:
+                candidates = positions
+            else:
+                allowed = set(positions)
+                candidates = tuple(p for p in candidates if p in allowed)
+
+        if min_minutes is not None or max_minutes is not None:
+            lo = 0 if min_minutes is None else bisect.bisect_left(self._durations, min_minutes)
+            hi = len(self._durations) if max_minutes is None else bisect.bisect_right(self._durations, max_minutes)
+            in_range = set(self._duration_positions[lo:hi])
+            candidates = tuple(sorted(in_range)) if candidates is None else tuple(p for p in candidates if p in in_range)
+
+        if candidates is None:
+            candidates = range(len(self._exercises))
+
+        results = tuple(self._exercises[p] for p in candidates)
+        return results[:limit] if limit is not None else results
+
+    def first(self, mood=None, **filters):
+        """Top exercise for a mood, or None if nothing matches"""
+        results = self.query(mood=mood, limit=1, **filters)
+        return results[0] if results else None
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_exercise_catalog():
+    """Process-wide catalog, loaded from data/exercises.json on first use"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = ExerciseCatalog.from_file(os.getenv('MINDMATE_EXERCISE_CATALOG', CATALOG_PATH))
+    return _catalog
@@ -0,0 +1,135 @@
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from utils.exercise_catalog import DEFAULT_MOOD
+from utils.messages import MOOD_SCORES
+
+# Pseudo-completions worth of weight given to the prior for each exercise
+PRIOR_STRENGTH = 5.0
+
+# Expected mood-score change for an exercise nobody has rated yet
+DEFAULT_IMPROVEMENT = 0.5
+
+# Extra expected improvement for exercises written for the user's current mood
+MOOD_MATCH_BONUS = 1.0
+
+# Completions that started from a different mood count this much
+OTHER_MOOD_WEIGHT = 0.5
+
+# Small integer per mood so starting moods can be compared as an array
+MOOD_CODES = {mood: code for code, mood in enumerate(MOOD_SCORES)}
+
+def mood_score(mood):
+    return MOOD_SCORES.get(str(mood).lower(), MOOD_SCORES['neutral'])
+
+def mood_code(mood):
+    return MOOD_CODES.get(str(mood).lower(), MOOD_CODES['neutral'])
+
+def completion_record(exercise_id, exercise, mood_before, mood_after, timestamp):
+    """Completion entry as stored in exercise_completions"""
+    return {
+        'exercise_id': exercise_id,
+        'exercise': exercise,
+        'mood_before': mood_before,
+        'mood_after': mood_after,
+        'improvement': mood_score(mood_after) - mood_score(mood_before) if mood_after else None,
+        'timestamp': timestamp
+    }
+
+class OutcomeStats:
+    """Process-wide improvement totals per exercise, used as ranking priors"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sums = {}
+        self._counts = {}
+        # Completions from here on are counted live by record()
+        self.started_at = datetime.now()
+
+    def prime(self, completions):
+        """Add stored completions made before this process started counting"""
+        sums = {}
+        counts = {}
+        for record in completions:
+            exercise_id = record.get('exercise_id')
+            timestamp = record.get('timestamp')
+            if not exercise_id or record.get('improvement') is None:
+                continue
+            if isinstance(timestamp, datetime) and timestamp >= self.started_at:
+                continue
+            sums[exercise_id] = sums.get(exercise_id, 0.0) + record['improvement']
+            counts[exercise_id] = counts.get(exercise_id, 0) + 1
+
+        with self._lock:
+            for exercise_id, count in counts.items():
+                self._sums[exercise_id] = self._sums.get(exercise_id, 0.0) + sums[exercise_id]
+                self._counts[exercise_id] = self._counts.get(exercise_id, 0) + count
+
+    def record(self, exercise_id, improvement):
+        with self._lock:
+            self._sums[exercise_id] = self._sums.get(exercise_id, 0.0) + improvement
+            self._counts[exercise_id] = self._counts.get(exercise_id, 0) + 1
+
+    def priors(self, exercise_ids):
+        """Mean improvement per exercise, DEFAULT_IMPROVEMENT where unseen"""
+        with self._lock:
+            return np.array([
+                self._sums[exercise_id] / self._counts[exercise_id]
+                if self._counts.get(exercise_id) else DEFAULT_IMPROVEMENT
+                for exercise_id in exercise_ids
+            ])
+
+def outcome_arrays(completions, positions):
+    """Exercise positions, improvements and starting mood codes as NumPy arrays
+
+    Completions without a mood after, or for exercises not in positions,
+    are dropped.
+    """
+    rows = [
+        (positions[record['exercise_id']], record['improvement'], mood_code(record.get('mood_before')))
+        for record in completions
+        if record.get('improvement') is not None and record.get('exercise_id') in positions
+    ]
+    if not rows:
+        empty = np.empty(0)
+        return empty.astype(np.intp), empty, empty
+
+    table = np.array(rows, dtype=float)
+    return table[:, 0].astype(np.intp), table[:, 1], table[:, 2]
+
+def rank_exercises(catalog, completions, mood, stats=None, prior_strength=PRIOR_STRENGTH, outcomes=None):
+    """Catalog exercises ordered by expected mood improvement for this user
+
+    Each exercise's estimate is the user's weighted mean improvement shrunk
+    toward a prior: the process-wide mean for that exercise (or
+    DEFAULT_IMPROVEMENT) plus MOOD_MATCH_BONUS when it targets the mood.
+    outcomes, if given, is outcome_arrays() for the same completions and
+    catalog, e.g. cached between reruns. Returns a list of (exercise,
+    score) pairs, best first.
+    """
+    exercises = tuple(catalog)
+    if not exercises:
+        return []
+
+    ids = [exercise.id for exercise in exercises]
+    positions = {exercise_id: i for i, exercise_id in enumerate(ids)}
+
+    priors = stats.priors(ids) if stats is not None else np.full(len(ids), DEFAULT_IMPROVEMENT)
+    matches = np.array([mood in exercise.moods for exercise in exercises])
+    if not matches.any():
+        matches = np.array([DEFAULT_MOOD in exercise.moods for exercise in exercises])
+    priors = priors + MOOD_MATCH_BONUS * matches
+
+    index, improvement, before = outcomes if outcomes is not None else outcome_arrays(completions, positions)
+    weights = np.where(before == mood_code(mood), 1.0, OTHER_MOOD_WEIGHT)
+
+    weighted_sums = np.bincount(index, weights=weights * improvement, minlength=len(ids))
+    weight_totals = np.bincount(index, weights=weights, minlength=len(ids))
+
+    scores = (weighted_sums + prior_strength * priors) / (weight_totals + prior_strength)
+
+    # Stable sort keeps catalog order between equal scores
+    order = np.argsort(-scores, kind='stable')
+    return [(exercises[i], float(scores[i])) for i in order]
@@ -0,0 +1,276 @@
+import csv
+import gzip
+import io
+import json
+import re
+import tempfile
+from datetime import datetime, date
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from utils.messages import MOOD_SCORES
+
+# Records per page pulled from storage and per write batch
+EXPORT_PAGE_SIZE = 500
+
+# Days per Parquet row group / Arrow record batch
+EXPORT_ROW_GROUP_DAYS = 4096
+
+# Moods in code order; mood_code in daily exports indexes this
+EXPORT_MOODS = tuple(MOOD_SCORES)
+
+DAILY_EXPORT_FIELDS = ['date', 'mood', 'mood_code', 'mood_score', 'check_ins', 'conversations']
+
+DAILY_EXPORT_SCHEMA = pa.schema([
+    ('date', pa.date32()),
+    ('mood', pa.dictionary(pa.int8(), pa.string())),
+    ('mood_code', pa.int8()),
+    ('mood_score', pa.float32()),
+    ('check_ins', pa.int32()),
+    ('conversations', pa.int32())
+]) if pa is not None else None
+
+def iter_pages(records, page_size=EXPORT_PAGE_SIZE):
+    """Yield successive pages from an in-memory sequence"""
+    for start in range(0, len(records), page_size):
+        yield records[start:start + page_size]
+
+def _serialize_value(obj):
+    """JSON fallback for dates and other non-native values"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return str(obj)
+
+def iter_ndjson(pages):
+    """Yield one NDJSON chunk per page of records"""
+    for page in pages:
+        lines = [
+            json.dumps(record, default=_serialize_value, ensure_ascii=False)
+            for record in page
+        ]
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+def iter_csv(pages, fieldnames):
+    """Yield a CSV header followed by one chunk per page of records"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for page in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        for record in page:
+            writer.writerow({
+                key: _serialize_value(value) if isinstance(value, (datetime, date)) else value
+                for key, value in record.items()
+            })
+        chunk = buffer.getvalue()
+        if chunk:
+            yield chunk
+
+def iter_encoded(chunks, compress=False, compresslevel=6):
+    """Encode text chunks to bytes, optionally gzip-compressing on the fly"""
+    if not compress:
+        for chunk in chunks:
+            yield chunk.encode('utf-8')
+        return
+
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=compresslevel) as gz:
+        for chunk in chunks:
+            gz.write(chunk.encode('utf-8'))
+            if buffer.tell():
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+    # Flush the gzip trailer written on close
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def spool_export(byte_chunks):
+    """Write byte chunks into a temporary file and return it rewound"""
+    # Unbuffered so st.download_button accepts it as a raw binary stream
+    spool = tempfile.TemporaryFile(mode='w+b', buffering=0)
+    for chunk in byte_chunks:
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+def export_filename(prefix, extension, compress=False):
+    """Build a dated export filename"""
+    name = f"{prefix}_{datetime.now().strftime('%Y%m%d')}.{extension}"
+    return f"{name}.gz" if compress else name
+
+def export_mime_type(extension, compress=False):
+    """Return the MIME type for an export format"""
+    if compress:
+        return "application/gzip"
+    return {
+        'ndjson': "application/x-ndjson",
+        'csv': "text/csv",
+        'parquet': "application/vnd.apache.parquet",
+        'arrow': "application/vnd.apache.arrow.file"
+    }.get(extension, "application/octet-stream")
+
+def tag_records(pages, record_type):
+    """Add a record type field to every record of every page"""
+    for page in pages:
+        yield [dict(record, record_type=record_type) for record in page]
+
+# ISO strings that carry their own UTC offset, e.g. 2024-03-01T09:30:00+00:00 or ...Z
+_ISO_WITH_OFFSET = re.compile(r'\d[T ]\d.*(Z|[+-]\d{2}:?\d{2})$')
+
+def _has_timezone(value):
+    if isinstance(value, str):
+        return bool(_ISO_WITH_OFFSET.search(value.strip()))
+    return getattr(value, 'tzinfo', None) is not None
+
+def _local_days(values):
+    """Calendar days, in local time, for a column of timestamp values
+
+    Aware values (Firestore timestamps, ISO strings with an offset) are
+    converted to local time; naive ones are already local, as the app
+    writes them with datetime.now().
+    """
+    series = pd.Series(values, dtype=object)
+    aware = series.map(_has_timezone).to_numpy(dtype=bool)
+    stamps = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    if aware.any():
+        local = pd.to_datetime(series[aware], utc=True, errors='coerce', format='mixed')
+        stamps[aware] = local.dt.tz_convert(datetime.now().astimezone().tzinfo).dt.tz_localize(None)
+    if not aware.all():
+        stamps[~aware] = pd.to_datetime(series[~aware], errors='coerce', format='mixed')
+    return stamps.dt.normalize()
+
+# Page summaries buffered before they are merged into the running totals
+DAILY_EXPORT_MERGE_PAGES = 32
+
+# Per-day counter columns: score total, check-ins, conversations, then one per mood
+_COUNTERS = ['score', 'check_ins', 'conversations', *EXPORT_MOODS]
+
+class DailyExport:
+    """Per-day mood and conversation totals, accumulated one storage page at a time
+
+    Each page is reduced to per-day counters (one bincount over day and
+    mood codes for mood entries, value_counts for chat turns); summaries are
+    merged every DAILY_EXPORT_MERGE_PAGES pages, so memory grows with days
+    tracked, not with the number of entries or messages.
+    """
+
+    def __init__(self):
+        self._totals = None
+        self._pending = []
+
+    def _add(self, summary):
+        self._pending.append(summary)
+        if len(self._pending) >= DAILY_EXPORT_MERGE_PAGES:
+            self._merge()
+
+    def _merge(self):
+        if self._pending:
+            frames = self._pending if self._totals is None else [self._totals, *self._pending]
+            self._totals = pd.concat(frames).fillna(0).groupby(level=0).sum()
+            self._pending = []
+
+    def add_mood_page(self, page):
+        if not page:
+            return
+        frame = pd.DataFrame(page, columns=['timestamp', 'mood'])
+        days = _local_days(frame['timestamp'])
+        codes = pd.Categorical(frame['mood'].astype(str).str.lower(), categories=EXPORT_MOODS).codes
+        valid = days.notna().to_numpy() & (codes >= 0)
+
+        # Count (day, mood) pairs in one bincount over a flattened grid
+        day_index, unique_days = pd.factorize(days[valid])
+        counts = np.bincount(
+            day_index * len(EXPORT_MOODS) + codes[valid],
+            minlength=len(unique_days) * len(EXPORT_MOODS)
+        ).reshape(len(unique_days), len(EXPORT_MOODS))
+
+        summary = pd.DataFrame(counts, index=unique_days, columns=EXPORT_MOODS)
+        summary.insert(0, 'conversations', 0)
+        summary.insert(0, 'check_ins', counts.sum(axis=1))
+        summary.insert(0, 'score', counts @ np.array([MOOD_SCORES[mood] for mood in EXPORT_MOODS]))
+        self._add(summary)
+
+    def add_conversation_page(self, page):
+        """Count chat turns; session messages count once per user message"""
+        turns = [record.get('timestamp') for record in page if record.get('role', 'user') == 'user']
+        if turns:
+            self._add(_local_days(turns).value_counts().to_frame('conversations'))
+
+    def to_frame(self):
+        """One row per day with data, oldest first, typed for export"""
+        self._merge()
+        if self._totals is None:
+            return pd.DataFrame({
+                'date': pd.Series(dtype=object),
+                'mood': pd.Categorical([], categories=EXPORT_MOODS),
+                'mood_code': pd.Series(dtype='Int8'),
+                'mood_score': pd.Series(dtype=np.float32),
+                'check_ins': pd.Series(dtype=np.int32),
+                'conversations': pd.Series(dtype=np.int32)
+            })
+        totals = self._totals.reindex(columns=_COUNTERS, fill_value=0).sort_index()
+        check_ins = totals['check_ins'].to_numpy()
+        has_mood = check_ins > 0
+        codes = np.where(has_mood, totals[list(EXPORT_MOODS)].to_numpy().argmax(axis=1), -1)
+
+        return pd.DataFrame({
+            'date': pd.DatetimeIndex(totals.index).date,
+            'mood': pd.Categorical.from_codes(codes, categories=EXPORT_MOODS),
+            'mood_code': pd.Series(codes, dtype='Int8').mask(~has_mood).array,
+            'mood_score': np.where(has_mood, totals['score'].to_numpy() / np.maximum(check_ins, 1), np.nan).astype(np.float32),
+            'check_ins': check_ins.astype(np.int32),
+            'conversations': totals['conversations'].to_numpy().astype(np.int32)
+        }, columns=DAILY_EXPORT_FIELDS)
+
+def _record_batches(frame, rows=EXPORT_ROW_GROUP_DAYS):
+    for start in range(0, len(frame), rows):
+        yield pa.RecordBatch.from_pandas(
+            frame.iloc[start:start + rows], schema=DAILY_EXPORT_SCHEMA, preserve_index=False
+        )
+
+def columnar_export_available():
+    return pa is not None
+
+def spool_daily_export(frame, fmt, compress=False):
+    """Write a DailyExport frame as 'csv', 'parquet' or 'arrow' into a rewound temp file
+
+    Parquet and Arrow IPC files get one row group / record batch per
+    EXPORT_ROW_GROUP_DAYS days. compress gzips CSV output only; the
+    columnar formats are compressed internally.
+    """
+    if fmt == 'csv':
+        frame = frame.assign(mood_score=frame['mood_score'].astype(float).round(3))
+        records = frame.astype(object).where(frame.notna(), None).to_dict('records')
+        return spool_export(iter_encoded(iter_csv(iter_pages(records), DAILY_EXPORT_FIELDS), compress=compress))
+
+    if pa is None:
+        raise RuntimeError(f"pyarrow is required for {fmt} exports")
+
+    spool = tempfile.TemporaryFile(mode='w+b', buffering=0)
+    if fmt == 'parquet':
+        with pq.ParquetWriter(spool, DAILY_EXPORT_SCHEMA, compression='zstd') as writer:
+            for batch in _record_batches(frame):
+                writer.write_batch(batch)
+    elif fmt == 'arrow':
+        options = pa.ipc.IpcWriteOptions(compression='zstd')
+        with pa.ipc.new_file(spool, DAILY_EXPORT_SCHEMA, options=options) as writer:
+            for batch in _record_batches(frame):
+                writer.write_batch(batch)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    spool.seek(0)
+    return spool
@@ -0,0 +1,116 @@
+import copy
+import math
+from datetime import date, timedelta
+
+import numpy as np
+
+from utils.messages import MOOD_SCORES
+
+# Smoothing for the short-term level, the long-term baseline, the
+# day-of-week offsets and the squared forecast error
+ALPHA_LEVEL = 0.3
+ALPHA_BASELINE = 0.05
+ALPHA_SEASONAL = 0.1
+ALPHA_ERROR = 0.1
+
+# Forecast spread assumed until there are errors to learn it from
+DEFAULT_SD = 1.0
+
+# Days of data needed before a forecast is offered
+MIN_FORECAST_DAYS = 3
+
+# A day this far below the baseline counts as a bad day
+BAD_DAY_DROP = 1.0
+
+# Deterioration score at which the app suggests an exercise ahead of time
+DETERIORATION_ALERT = 0.5
+
+class MoodForecaster:
+    """Next-day mood forecast from a smoothed level plus day-of-week offsets
+
+    Entries for the current day are summed until a later day arrives; then
+    the day's mean updates the state in O(1). forecast() treats the open
+    day as complete on a copy, so check-ins count before midnight.
+    """
+
+    def __init__(self):
+        self.day = None
+        self.day_total = 0.0
+        self.day_count = 0
+        self.days_seen = 0
+        self.level = None
+        self.baseline = None
+        self.seasonal = np.zeros(7)
+        self.variance = DEFAULT_SD ** 2
+
+    @classmethod
+    def from_observations(cls, observations):
+        """Forecaster primed with every day in an analytics_engine observation frame"""
+        forecaster = cls()
+        if observations.empty:
+            return forecaster
+
+        days = observations['timestamp'].dt.normalize()
+        daily = observations.groupby(days)['mood_score'].agg(['sum', 'count'])
+        for day, total, count in zip(daily.index.date[:-1], daily['sum'].to_numpy()[:-1], daily['count'].to_numpy()[:-1]):
+            forecaster._fold(day, total / count)
+
+        forecaster.day = daily.index[-1].date()
+        forecaster.day_total = float(daily['sum'].iloc[-1])
+        forecaster.day_count = int(daily['count'].iloc[-1])
+        return forecaster
+
+    def add(self, timestamp, mood):
+        """Record one mood entry"""
+        day = timestamp.date()
+        if self.day is not None and day > self.day:
+            self._close_day()
+        if self.day is None or day > self.day:
+            self.day = day
+        # Late entries for an earlier day count toward the open one
+        self.day_total += MOOD_SCORES.get(str(mood).lower(), MOOD_SCORES['neutral'])
+        self.day_count += 1
+
+    def _close_day(self):
+        if self.day_count:
+            self._fold(self.day, self.day_total / self.day_count)
+        self.day_total = 0.0
+        self.day_count = 0
+
+    def _fold(self, day, score):
+        weekday = day.weekday()
+        if self.days_seen == 0:
+            self.level = self.baseline = score
+        else:
+            error = score - (self.level + self.seasonal[weekday])
+            self.variance += ALPHA_ERROR * (error * error - self.variance)
+            self.level += ALPHA_LEVEL * (score - self.seasonal[weekday] - self.level)
+            self.seasonal[weekday] += ALPHA_SEASONAL * (score - self.level - self.seasonal[weekday])
+            self.baseline += ALPHA_BASELINE * (score - self.baseline)
+        self.days_seen += 1
+
+    def forecast(self, today=None):
+        """Tomorrow's forecast dict, or None until MIN_FORECAST_DAYS days are known
+
+        deterioration is the chance the next day lands BAD_DAY_DROP or more
+        below the user's long-term baseline, assuming normal errors.
+        """
+        state = self
+        if self.day_count:
+            state = copy.deepcopy(self)
+            state._close_day()
+        if state.days_seen < MIN_FORECAST_DAYS:
+            return None
+
+        target = (today or date.today()) + timedelta(days=1)
+        score = float(np.clip(state.level + state.seasonal[target.weekday()], 1, 5))
+        sd = max(math.sqrt(state.variance), 0.1)
+        threshold = state.baseline - BAD_DAY_DROP
+        return {
+            'date': target,
+            'score': score,
+            'low': max(score - sd, 1.0),
+            'high': min(score + sd, 5.0),
+            'baseline': float(state.baseline),
+            'deterioration': 0.5 * math.erfc((score - threshold) / (sd * math.sqrt(2)))
+        }
@@ -1,16 +1,412 @@
 import streamlit as st
+import streamlit.components.v1 as components
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import os
 import re
+import functools
+import hashlib
+import hmac
+import secrets
+import threading
+import uuid
+from http.cookies import SimpleCookie
 from datetime import datetime, timedelta
 import random
-import json
+from contextlib import contextmanager
+from utils.export import DailyExport, iter_pages, iter_ndjson, iter_encoded, spool_daily_export, tag_records
+from utils.messages import ConversationLog
+from utils.exercise_catalog import get_exercise_catalog
+from utils.analytics import bump_analytics_version, get_mood_forecaster, keep_mood_forecaster
+from utils.analytics_engine import build_observations
+from utils.metrics import SESSION_INIT_LATENCY, SESSIONS_STARTED
+from utils.tracing import current_span, span, traced
 
+# Mood history entries kept in session state
+MAX_MOOD_HISTORY = 10000
+
+# Initialize services
+@st.cache_resource
+def get_task_executor():
+    from services.task_executor import TaskExecutor
+    
+    return TaskExecutor()
+
+@st.cache_resource
+def init_services():
+    from services.cassette import REPLAY, cassette_from_env
+    
+    cassette = cassette_from_env()
+    if cassette is not None and cassette.mode == REPLAY:
+        # Recorded responses only; no client is created
+        firebase, gemini = cassette.firebase(), cassette.gemini()
+    else:
+        if os.getenv('MINDMATE_LOCAL_SERVICES'):
+            # In-process stand-ins for load tests and offline development
+            from services.local_services import LocalFirebaseService as FirebaseService
+            from services.local_services import LocalGeminiService as GeminiService
+        else:
+            from services.firebase_service import FirebaseService
+            from services.gemini_service import GeminiService
+        
+        firebase = FirebaseService()
+        gemini = GeminiService()
+        if cassette is not None:
+            firebase, gemini = cassette.firebase(firebase), cassette.gemini(gemini)
+    
+    executor = get_task_executor()
+    get_metrics_server()
+    # Warm exercise suggestions at startup rather than on the first Exercises visit
+    _suggestion_cache(id(gemini), gemini)
+    
+    return firebase, gemini, executor
+
+# Ports tried from MINDMATE_METRICS_PORT up, so each server process on a host gets its own
+DEFAULT_METRICS_PORTS = 16
+
+@st.cache_resource
+def get_metrics_server():
+    """Sidecar serving /metrics on the first free port from MINDMATE_METRICS_PORT, or None when unset"""
+    from utils.metrics import SESSIONS, TASK_QUEUE_DEPTH, start_metrics_server
+    
+    port = os.getenv('MINDMATE_METRICS_PORT')
+    if not port:
+        return None
+    base_port = int(port)
+    ports = int(os.getenv('MINDMATE_METRICS_PORTS', DEFAULT_METRICS_PORTS))
+    
+    # Read at scrape time from the shared services
+    manager = get_session_manager()
+    executor = get_task_executor()
+    SESSIONS.set_function(lambda: manager.stats()['resident_sessions'], state='resident')
+    SESSIONS.set_function(lambda: manager.stats()['spilled_sessions'], state='spilled')
+    TASK_QUEUE_DEPTH.set_function(executor.queue_depth)
+    
+    host = os.getenv('MINDMATE_METRICS_HOST', '127.0.0.1')
+    for candidate in range(base_port, base_port + ports):
+        try:
+            server = start_metrics_server(candidate, host)
+        except OSError:
+            # Taken, usually by another server process on this host
+            continue
+        print(f"Serving metrics for process {os.getpid()} at http://{host}:{candidate}/metrics")
+        return server
+    
+    print(f"Metrics server not started: ports {base_port}-{base_port + ports - 1} are all in use")
+    return None
+
+@st.cache_resource
+def get_chat_pipeline():
+    from services.chat_pipeline import ChatPipeline
+    
+    try:
+        firebase, gemini, executor = init_services()
+    except Exception as e:
+        print(f"Chat services unavailable, using local analysis only: {e}")
+        return ChatPipeline()
+    
+    return ChatPipeline(gemini, firebase, executor)
+
+@st.cache_resource
+def get_chat_renderer():
+    from utils.chat_renderer import ChatRenderer
+    
+    return ChatRenderer()
+
+def get_suggestion_cache():
+    """Shared AI exercise suggestions, created and warmed by init_services()"""
+    from services.suggestion_cache import SuggestionCache
+    
+    try:
+        _, gemini, _ = init_services()
+    except Exception as e:
+        # Not cached, so a later call retries once the services come up
+        print(f"Exercise suggestions limited to the catalog: {e}")
+        return SuggestionCache()
+    return _suggestion_cache(id(gemini), gemini)
+
+@st.cache_resource
+def _suggestion_cache(gemini_id, _gemini):
+    """One cache per Gemini service, keyed on the instance init_services() holds"""
+    from services.suggestion_cache import SuggestionCache
+    
+    cache = SuggestionCache(_gemini)
+    cache.start()
+    return cache
+
+@st.cache_resource
+def get_outcome_stats():
+    from utils.exercise_ranking import OutcomeStats
+    
+    stats = OutcomeStats()
+    try:
+        store = get_session_store()
+    except Exception as e:
+        print(f"Exercise outcome priors start empty: {e}")
+        return stats
+    
+    # Seed the priors from every stored session without holding up the first page
+    threading.Thread(target=_prime_outcome_stats, args=(stats, store), name='mindmate-outcomes', daemon=True).start()
+    return stats
+
+def _prime_outcome_stats(stats, store):
+    try:
+        for _, state in store.iter_states():
+            stats.prime(state.get('exercise_completions') or ())
+    except Exception as e:
+        print(f"Error priming exercise outcome stats: {e}")
+
+@st.cache_resource
+def get_session_manager():
+    from services.session_manager import SessionStateManager
+    
+    def is_session_active(session_id):
+        # Without a server runtime (e.g. AppTest) there is nothing to close sessions
+        return not runtime.exists() or runtime.get_instance().is_active_session(session_id)
+    
+    def is_session_running(session_id):
+        if not runtime.exists():
+            return False
+        try:
+            from streamlit.runtime.app_session import AppSessionState
+            
+            info = runtime.get_instance()._session_mgr.get_session_info(session_id)
+            return info is not None and info.session._state == AppSessionState.APP_IS_RUNNING
+        except Exception:
+            # Unknown run state; leave the session alone
+            return True
+    
+    return SessionStateManager(is_session_active=is_session_active, is_session_running=is_session_running)
+
+def track_session_activity():
+    """Mark this session active and restore state spilled while it was idle"""
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    
+    from services.session_manager import SessionRestoreError
+    
+    manager = get_session_manager()
+    try:
+        manager.touch(ctx.session_id, ctx.session_state)
+    except SessionRestoreError as e:
+        print(f"Error restoring session: {e}")
+        _recover_spilled_session(manager, ctx.session_id)
+
+def _recover_spilled_session(manager, session_id):
+    """Reload spilled fields from the shared store, or stop before anything is saved without them"""
+    from services.session_manager import HEAVY_FIELDS
+    
+    try:
+        state, _ = get_session_store().load(st.session_state.user_id)
+    except Exception as e:
+        print(f"Error loading session for {st.session_state.get('user_id')}: {e}")
+        st.error("We couldn't load your conversation just now. Please refresh the page in a moment.")
+        st.stop()
+    
+    for field in HEAVY_FIELDS:
+        if state and field in state and field not in st.session_state:
+            st.session_state[field] = state[field]
+    manager.discard_spill(session_id)
+
+@st.cache_resource
+def get_session_store():
+    from services.session_store import create_session_store
+    
+    return create_session_store()
+
+USER_COOKIE = 'mindmate_uid'
+
+# Browser-only users live in their own namespace so a cookie can never name an account
+ANONYMOUS_PREFIX = 'anon:'
+
+@functools.lru_cache(maxsize=None)
+def _cookie_secret():
+    secret = os.getenv('MINDMATE_COOKIE_SECRET')
+    if secret:
+        return secret.encode('utf-8')
+    
+    print("MINDMATE_COOKIE_SECRET is not set; user cookies will only be valid for this process")
+    return secrets.token_bytes(32)
+
+def _sign_user_token(token):
+    return hmac.new(_cookie_secret(), f"{ANONYMOUS_PREFIX}{token}".encode('utf-8'), hashlib.sha256).hexdigest()
+
+def _read_user_cookie():
+    """Anonymous user ID from a correctly signed browser cookie, if any"""
+    try:
+        from streamlit.web.server.websocket_headers import _get_websocket_headers
+        headers = _get_websocket_headers() or {}
+    except Exception:
+        return None
+    
+    cookie = SimpleCookie()
+    cookie.load(headers.get('Cookie', ''))
+    morsel = cookie.get(USER_COOKIE)
+    if not morsel:
+        return None
+    
+    token, _, signature = morsel.value.partition('.')
+    if not re.fullmatch(r'[0-9a-f]{32}', token) or not hmac.compare_digest(signature, _sign_user_token(token)):
+        return None
+    return f"{ANONYMOUS_PREFIX}{token}"
+
+def _write_user_cookie(token):
+    """Remember the anonymous user in the browser so any worker can pick the session up
+    
+    The value is signed here on the server; the browser only stores it.
+    """
+    value = f"{token}.{_sign_user_token(token)}"
+    components.html(f"""
+    <script>
+        window.parent.document.cookie = "{USER_COOKIE}={value}; path=/; max-age=31536000; SameSite=Strict";
+    </script>
+    """, height=0)
+
+def resolve_user_id():
+    """Identify the user by auth account, then signed browser cookie, else a new anonymous ID"""
+    user = st.session_state.get('user')
+    if user and user.get('uid'):
+        return user['uid']
+    
+    user_id = _read_user_cookie()
+    if user_id:
+        return user_id
+    
+    token = uuid.uuid4().hex
+    _write_user_cookie(token)
+    return f"{ANONYMOUS_PREFIX}{token}"
+
+def _switch_user(user_id):
+    """Move this browser session onto an account, keeping what was done before signing in"""
+    from services.session_store import merge_states
+    
+    try:
+        state, version = get_session_store().load(user_id)
+    except Exception as e:
+        print(f"Error loading session for {user_id}: {e}")
+        state, version = None, 0
+    
+    # History from both sides; the account's own mood and profile win
+    fields = merge_states(state or {}, _persisted_fields())
+    st.session_state.user_id = user_id
+    for field, value in fields.items():
+        st.session_state[field] = value
+    st.session_state.session_version = version
+    # Force the merged state to be saved under the account
+    st.session_state.session_fingerprint = None
+    persist_session_state()
+
+def _session_fingerprint(fields):
+    """Cheap change marker for persisted fields"""
+    fingerprint = []
+    for field in sorted(fields):
+        value = fields[field]
+        if isinstance(value, (str, dict)) or not hasattr(value, '__len__'):
+            fingerprint.append(repr(value))
+        else:
+            fingerprint.append((len(value), repr(value[-1]) if len(value) else None))
+    return hash(tuple(fingerprint))
+
+def _persisted_fields():
+    from services.session_store import PERSISTED_FIELDS
+    
+    return {field: st.session_state[field] for field in PERSISTED_FIELDS if field in st.session_state}
+
+def _apply_stored_state(state, version):
+    for field, value in state.items():
+        st.session_state[field] = value
+    st.session_state.session_version = version
+    st.session_state.session_fingerprint = _session_fingerprint(_persisted_fields())
+    # Cached analytics and the forecaster were built from the replaced data
+    bump_analytics_version()
+
+def persist_session_state(max_attempts=3):
+    """Save shared session fields, merging with newer writes from other workers"""
+    from services.session_store import SessionConflictError, merge_states
+    
+    fields = _persisted_fields()
+    fingerprint = _session_fingerprint(fields)
+    if fingerprint == st.session_state.get('session_fingerprint'):
+        return True
+    
+    try:
+        store = get_session_store()
+        user_id = st.session_state.user_id
+        version = st.session_state.get('session_version', 0)
+        
+        for _ in range(max_attempts):
+            try:
+                version = store.save(user_id, fields, version)
+                st.session_state.session_version = version
+                st.session_state.session_fingerprint = fingerprint
+                return True
+            except SessionConflictError:
+                remote, version = store.load(user_id)
+                fields = merge_states(fields, remote or {})
+                _apply_stored_state(fields, version)
+                fingerprint = _session_fingerprint(fields)
+        
+        print(f"Giving up saving session for {user_id} after {max_attempts} conflicts")
+        return False
+        
+    except Exception as e:
+        print(f"Error persisting session: {e}")
+        return False
+
+def sync_session_state():
+    """Push local changes or pull a newer stored session for this user"""
+    try:
+        store = get_session_store()
+        user_id = st.session_state.user_id
+        
+        if st.session_state.get('session_fingerprint') is None:
+            # First run in this process for this browser session
+            state, version = store.load(user_id)
+            if state:
+                _apply_stored_state(state, version)
+            return
+        
+        if _session_fingerprint(_persisted_fields()) != st.session_state.session_fingerprint:
+            persist_session_state()
+        elif store.version(user_id) > st.session_state.get('session_version', 0):
+            state, version = store.load(user_id)
+            _apply_stored_state(state, version)
+            
+    except Exception as e:
+        print(f"Error syncing session: {e}")
+
+@contextmanager
+def trace_page(page):
+    """Span around one run of a page script, the root of its trace"""
+    with span('page.run', page=page) as page_span:
+        try:
+            yield page_span
+        finally:
+            page_span.set(user=st.session_state.get('user_id'))
+
+@SESSION_INIT_LATENCY.time()
+@traced('session.init')
 def init_session_state():
     """Initialize all session state variables"""
-    if 'user_id' not in st.session_state:
-        st.session_state.user_id = f"user_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    track_session_activity()
+    
+    new_session = 'user_id' not in st.session_state
+    if new_session:
+        st.session_state.user_id = resolve_user_id()
+    current_span().set(user=st.session_state.user_id, new_session=new_session)
+    if new_session:
+        SESSIONS_STARTED.inc()
+    
+    user = st.session_state.get('user')
+    if user and user.get('uid') and user['uid'] != st.session_state.user_id:
+        # Signed in since this session started
+        _switch_user(user['uid'])
+    
+    sync_session_state()
     
     if 'conversation_history' not in st.session_state:
-        st.session_state.conversation_history = []
+        st.session_state.conversation_history = ConversationLog()
     
     if 'current_mood' not in st.session_state:
         st.session_state.current_mood = 'neutral'
@@ -191,84 +587,28 @@ def get_supportive_response(mood, user_name="Friend", context=""):
 
 def get_exercise_for_mood(mood):
     """Return appropriate exercise suggestions based on mood"""
-    exercises = {
-        'anxious': {
-            'title': '4-7-8 Breathing',
-            'description': 'A powerful technique to calm anxiety',
-            'instructions': [
-                'Sit comfortably with your back straight',
-                'Exhale completely through your mouth',
-                'Close your mouth and inhale through nose for 4 counts',
-                'Hold your breath for 7 counts',
-                'Exhale through mouth for 8 counts',
-                'Repeat 3-4 times'
-            ],
-            'duration': '5 minutes',
-            'benefits': 'Activates relaxation response, reduces anxiety'
-        },
-        
-        'stressed': {
-            'title': 'Progressive Muscle Relaxation',
-            'description': 'Release physical tension systematically',
-            'instructions': [
-                'Start with your toes - tense for 5 seconds, then relax',
-                'Move to your calves, thighs, buttocks',
-                'Tense your abdomen, then chest and shoulders',
-                'Make fists, tense arms, then relax',
-                'Scrunch face muscles, then relax',
-                'Notice the difference between tension and relaxation'
-            ],
-            'duration': '12 minutes',
-            'benefits': 'Releases physical stress, promotes calm'
-        },
-        
-        'negative': {
-            'title': 'Gratitude Practice',
-            'description': 'Shift perspective to positive aspects',
-            'instructions': [
-                'Get a pen and paper or open notes app',
-                'Write down 3 things you\'re grateful for today',
-                'For each item, write WHY you\'re grateful',
-                'Think of someone who helped make this possible',
-                'Consider how your life would be different without it',
-                'Take a moment to really feel the gratitude'
-            ],
-            'duration': '8 minutes',
-            'benefits': 'Improves mood, shifts focus to positive'
-        },
-        
-        'positive': {
-            'title': 'Loving-Kindness Meditation',
-            'description': 'Spread positive energy to yourself and others',
-            'instructions': [
-                'Sit comfortably and close your eyes',
-                'Start by sending love to yourself: "May I be happy"',
-                'Extend to loved ones: "May you be happy"',
-                'Include neutral people in your life',
-                'Even include difficult people',
-                'End with all beings: "May all beings be happy"'
-            ],
-            'duration': '12 minutes',
-            'benefits': 'Increases compassion, spreads positivity'
-        },
-        
-        'neutral': {
-            'title': 'Mindful Breathing',
-            'description': 'Simple awareness practice to center yourself',
-            'instructions': [
-                'Sit quietly and close your eyes',
-                'Notice your natural breathing rhythm',
-                'Don\'t try to change it, just observe',
-                'When mind wanders, gently return to breath',
-                'Notice the pause between inhale and exhale',
-                'End by taking three deeper breaths'
-            ],
-            'duration': '7 minutes',
-            'benefits': 'Increases mindfulness, promotes calm'
-        }
-    }
-    
-    return exercises.get(mood, exercises['neutral'])
+    return get_exercise_catalog().first(mood).to_dict()
+
+def get_ranked_exercises(mood, limit=None):
+    """Exercises ordered by how much they have helped this user from this mood"""
+    from utils.exercise_ranking import rank_exercises
+    
+    catalog = get_exercise_catalog()
+    completions = st.session_state.get('exercise_completions', [])
+    ranked = rank_exercises(catalog, completions, mood, get_outcome_stats(), outcomes=_outcome_arrays(catalog, completions))
+    return [exercise for exercise, _ in ranked[:limit]]
+
+def _outcome_arrays(catalog, completions):
+    """This session's outcome_arrays, rebuilt only when completions are added"""
+    from utils.exercise_ranking import outcome_arrays
+    
+    key = (id(catalog), len(completions))
+    cached = st.session_state.get('exercise_outcomes')
+    if cached is None or cached[0] != key:
+        positions = {exercise.id: i for i, exercise in enumerate(catalog)}
+        cached = (key, outcome_arrays(completions, positions))
+        st.session_state.exercise_outcomes = cached
+    return cached[1]
 
 def calculate_mood_streak():
     """Calculate current positive mood streak"""
@@ -331,23 +671,36 @@ def format_timestamp(timestamp):
     else:
         return "Just now"
 
-def save_mood_entry(mood, description=""):
-    """Save mood entry to session state"""
+def clear_conversation():
+    """Empty the chat history, marking when so a conflicting save can't restore it"""
+    st.session_state.conversation_history = ConversationLog()
+    st.session_state.conversation_cleared_at = int(datetime.now().timestamp())
+
+def save_mood_entry(mood, description="", timestamp=None):
+    """Save mood entry to session state, dated now unless timestamp is given"""
     if 'mood_history' not in st.session_state:
         st.session_state.mood_history = []
     
+    timestamp = timestamp or datetime.now()
     mood_entry = {
         'mood': mood,
         'description': description,
-        'timestamp': datetime.now(),
-        'date': datetime.now().date().isoformat()
+        'timestamp': timestamp,
+        'date': timestamp.date().isoformat()
     }
     
+    # Primed from the existing history before this entry is added
+    forecaster = get_mood_forecaster()
+    forecaster.add(mood_entry['timestamp'], mood)
     st.session_state.mood_history.append(mood_entry)
+    bump_analytics_version()
+    
+    # Keep years of daily entries for analytics, but not without bound
+    if len(st.session_state.mood_history) > MAX_MOOD_HISTORY:
+        st.session_state.mood_history = st.session_state.mood_history[-MAX_MOOD_HISTORY:]
     
-    # Keep only last 100 entries
-    if len(st.session_state.mood_history) > 100:
-        st.session_state.mood_history = st.session_state.mood_history[-100:]
+    # Already holds the new entry, so the version bump needn't re-prime it
+    keep_mood_forecaster(forecaster)
 
 def get_mood_analytics():
     """Calculate mood analytics from session data"""
@@ -398,24 +751,71 @@ def get_crisis_resources():
         'message': 'If you\'re having thoughts of self-harm, please reach out for immediate help. You matter, and support is available 24/7.'
     }
 
-def export_user_data():
-    """Export all user data for download"""
-    export_data = {
-        'profile': st.session_state.get('user_profile', {}),
-        'conversation_history': st.session_state.get('conversation_history', []),
-        'mood_history': st.session_state.get('mood_history', []),
-        'exercise_completions': st.session_state.get('exercise_completions', []),
-        'export_timestamp': datetime.now().isoformat(),
-        'app_version': '1.0.0'
-    }
-    
-    # Convert datetime objects to strings for JSON serialization
-    def serialize_datetime(obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+def format_crisis_resources(resources=None):
+    """Markdown for the crisis support banner"""
+    resources = resources or get_crisis_resources()
+    return f"""
+    🚨 **Crisis Support Resources**
+    
+    {resources['message']}
+    • **Crisis Text Line**: {resources['crisis_text_line']}
+    • **National Suicide Prevention Lifeline**: {resources['suicide_prevention']}
+    • **Emergency Services**: {resources['emergency']}
+    """
+
+def export_user_data(firebase=None, compress=False):
+    """Stream all user data as NDJSON bytes for download"""
+    user_id = st.session_state.get('user_id')
+    profile = st.session_state.get('user_profile', {})
+    conversation_history = st.session_state.get('conversation_history', ConversationLog())
+    mood_history = st.session_state.get('mood_history', [])
+    exercise_completions = st.session_state.get('exercise_completions', [])
+    
+    # Prefer the full stored history over the in-session window
+    use_storage = firebase is not None and firebase.enabled and user_id
+    
+    def record_pages():
+        yield [{
+            'record_type': 'metadata',
+            'user_id': user_id,
+            'export_timestamp': datetime.now().isoformat(),
+            'app_version': '1.0.0'
+        }]
+        yield [dict(profile, record_type='profile')]
+        
+        if use_storage:
+            yield from tag_records(firebase.iter_user_conversations(user_id), 'conversation')
+            yield from tag_records(firebase.iter_mood_entries(user_id), 'mood')
+        else:
+            message_pages = (page.to_records() for page in iter_pages(conversation_history))
+            yield from tag_records(message_pages, 'message')
+            yield from tag_records(iter_pages(mood_history), 'mood')
+        
+        yield from tag_records(iter_pages(exercise_completions), 'exercise_completion')
     
-    return json.dumps(export_data, indent=2, default=serialize_datetime)
+    return iter_encoded(iter_ndjson(record_pages()), compress=compress)
+
+def export_daily_moods(fmt, firebase=None, compress=False):
+    """Per-day mood export as a rewound temp file in 'csv', 'parquet' or 'arrow' format"""
+    user_id = st.session_state.get('user_id')
+    daily = DailyExport()
+    
+    # Prefer the full stored history over the in-session window
+    if firebase is not None and firebase.enabled and user_id:
+        for page in firebase.iter_mood_entries(user_id):
+            daily.add_mood_page(page)
+        for page in firebase.iter_user_conversations(user_id):
+            daily.add_conversation_page(page)
+    else:
+        # The same observations as the Analytics page, chat moods from the conversation log included
+        conversation_history = st.session_state.get('conversation_history', ConversationLog())
+        observations = build_observations(st.session_state.get('mood_history', []), conversation_history)
+        for page in iter_pages(observations):
+            daily.add_mood_page(page.to_dict('records'))
+        for page in iter_pages(conversation_history):
+            daily.add_conversation_page(page.to_records())
+    
+    return spool_daily_export(daily.to_frame(), fmt, compress=compress)
 
 def validate_input(text, max_length=1000):
     """Validate user input"""
@@ -436,8 +836,8 @@ def get_conversation_context(history, limit=5):
     context_parts = []
     
     for msg in recent_messages:
-        role = "User" if msg['role'] == 'user' else "Assistant"
-        content = msg.get('content', '')
+        role = "User" if msg.is_user else "Assistant"
+        content = msg.content or ''
         context_parts.append(f"{role}: {content}")
     
     return "\n".join(context_parts)
@@ -449,7 +849,7 @@ def should_suggest_exercise(mood, recent_messages):
     
     # Check recent conversation for stress indicators
     if recent_messages:
-        recent_text = " ".join([msg.get('content', '') for msg in recent_messages[-3:]])
+        recent_text = " ".join([msg.content or '' for msg in recent_messages[-3:]])
         stress_indicators = ['overwhelmed', 'can\'t cope', 'too much', 'exhausted']
         return any(indicator in recent_text.lower() for indicator in stress_indicators)
     
@@ -0,0 +1,237 @@
+import numpy as np
+
+from utils.analytics_engine import POSITIVE_DAY_SCORE, WEEKDAYS
+
+# Observations a time-of-day or weekday group needs before it is compared
+MIN_GROUP_SIZE = 5
+
+# Smallest mean difference, in score points, worth reporting
+MIN_EFFECT = 0.3
+
+# |t| above this counts as a confident effect or trend
+CONFIDENT_T = 2.0
+
+# Recent days used for the trend slope
+TREND_DAYS = 28
+
+# Completions an exercise needs before its effect is reported
+MIN_EXERCISE_COMPLETIONS = 2
+
+STREAK_GOALS = (3, 7, 14, 30, 60, 100, 180, 365)
+
+# Hour ranges for the time-of-day insight; night wraps past midnight
+DAY_PARTS = {
+    'morning': range(5, 12),
+    'afternoon': range(12, 17),
+    'evening': range(17, 22),
+    'night': (22, 23, 0, 1, 2, 3, 4)
+}
+
+class GroupStats:
+    """Running count, sum and sum of squares per group, folded in with bincount"""
+
+    def __init__(self, groups):
+        self.count = np.zeros(groups)
+        self.total = np.zeros(groups)
+        self.squares = np.zeros(groups)
+
+    def add(self, groups, values):
+        size = len(self.count)
+        self.count += np.bincount(groups, minlength=size)
+        self.total += np.bincount(groups, weights=values, minlength=size)
+        self.squares += np.bincount(groups, weights=values * values, minlength=size)
+
+    def combine(self, members):
+        """Stats for a union of groups, as (count, mean, variance)"""
+        members = list(members)
+        return _moments(self.count[members].sum(), self.total[members].sum(), self.squares[members].sum())
+
+def _moments(count, total, squares):
+    if count == 0:
+        return 0, float('nan'), float('nan')
+    mean = total / count
+    variance = (squares - count * mean * mean) / (count - 1) if count > 1 else float('nan')
+    return int(count), float(mean), float(max(variance, 0.0))
+
+def _welch_t(group, rest):
+    """t statistic for the difference between two (count, mean, variance) groups"""
+    (n1, m1, v1), (n2, m2, v2) = group, rest
+    if n1 < 2 or n2 < 2:
+        return 0.0
+    error = np.sqrt(v1 / n1 + v2 / n2)
+    return float((m1 - m2) / error) if error > 0 else float('inf') * np.sign(m1 - m2)
+
+class InsightState:
+    """Hour and weekday score totals, updated with only the rows added since last time
+
+    Observations are append-only in practice (new moods are timestamped
+    now), so update() folds in the tail. If the rows it already saw have
+    changed, it starts over.
+    """
+
+    def __init__(self):
+        self.seen = 0
+        self.last_timestamp = None
+        self.hours = GroupStats(24)
+        self.weekdays = GroupStats(7)
+        self.overall = GroupStats(1)
+
+    def update(self, observations):
+        timestamps = observations['timestamp']
+        if len(observations) < self.seen or (
+            self.seen and timestamps.iloc[self.seen - 1] != self.last_timestamp
+        ):
+            self.__init__()
+
+        new = observations.iloc[self.seen:]
+        if len(new):
+            scores = new['mood_score'].to_numpy(dtype=float)
+            self.hours.add(new['timestamp'].dt.hour.to_numpy(), scores)
+            self.weekdays.add(new['timestamp'].dt.dayofweek.to_numpy(), scores)
+            self.overall.add(np.zeros(len(new), dtype=np.intp), scores)
+            self.seen = len(observations)
+            self.last_timestamp = timestamps.iloc[-1]
+        return self
+
+    def _best_and_worst(self, stats, groups):
+        """(name, t, difference) for the groups furthest above and below the rest"""
+        found = []
+        for name, members in groups.items():
+            group = stats.combine(members)
+            others = [i for i in range(len(stats.count)) if i not in set(members)]
+            rest = stats.combine(others)
+            if group[0] < MIN_GROUP_SIZE or rest[0] < MIN_GROUP_SIZE:
+                continue
+            found.append((name, _welch_t(group, rest), group[1] - rest[1]))
+        if not found:
+            return None, None
+        found.sort(key=lambda item: item[2])
+        return found[-1], found[0]
+
+    def time_of_day(self):
+        return self._best_and_worst(self.hours, DAY_PARTS)
+
+    def day_of_week(self):
+        return self._best_and_worst(self.weekdays, {day: (i,) for i, day in enumerate(WEEKDAYS)})
+
+def trend(daily, days=TREND_DAYS):
+    """Least-squares slope of daily scores over the last `days` days
+
+    Returns (slope per week, t statistic, days used), or None with fewer
+    than 5 days of data.
+    """
+    recent = daily['score'].iloc[-days:]
+    y = recent.to_numpy(dtype=float)
+    x = np.arange(len(y), dtype=float)
+    valid = ~np.isnan(y)
+    if valid.sum() < 5:
+        return None
+
+    x, y = x[valid], y[valid]
+    dx = x - x.mean()
+    sxx = (dx * dx).sum()
+    slope = (dx * (y - y.mean())).sum() / sxx
+    residuals = y - y.mean() - slope * dx
+    error = np.sqrt((residuals * residuals).sum() / (len(y) - 2) / sxx)
+    t = slope / error if error > 0 else float('inf') * np.sign(slope)
+    return float(slope * 7), float(t), int(len(y))
+
+def exercise_effects(completions):
+    """Mean mood improvement per exercise, as (title, mean, count), best first"""
+    rows = [
+        (record.get('exercise') or record.get('exercise_id'), record['improvement'])
+        for record in completions
+        if record.get('improvement') is not None
+    ]
+    if not rows:
+        return []
+
+    titles, codes = np.unique(np.array([title for title, _ in rows], dtype=object).astype(str), return_inverse=True)
+    improvements = np.array([improvement for _, improvement in rows], dtype=float)
+    counts = np.bincount(codes, minlength=len(titles))
+    means = np.bincount(codes, weights=improvements, minlength=len(titles)) / counts
+
+    order = np.argsort(-means, kind='stable')
+    return [(titles[i], float(means[i]), int(counts[i])) for i in order if counts[i] >= MIN_EXERCISE_COMPLETIONS]
+
+def next_streak_goal(streak):
+    return next((goal for goal in STREAK_GOALS if goal > streak), streak + 30)
+
+def build_insights(state, views, completions=()):
+    """Insight cards, as dicts with icon, title, description and action"""
+    insights = []
+
+    best, worst = state.time_of_day()
+    if best and best[2] >= MIN_EFFECT and best[1] >= CONFIDENT_T:
+        insights.append({
+            'icon': "🌅" if best[0] == 'morning' else "🕐",
+            'title': f"{best[0].title()} Pattern",
+            'description': f"Your mood averages {best[2]:.1f} points higher in the {best[0]} than at other times.",
+            'action': f"Plan important tasks for the {best[0]}"
+        })
+    if worst and worst[2] <= -MIN_EFFECT and worst[1] <= -CONFIDENT_T:
+        insights.append({
+            'icon': "🌙" if worst[0] in ('evening', 'night') else "🕐",
+            'title': f"Tough {worst[0].title()}s",
+            'description': f"Your mood averages {-worst[2]:.1f} points lower in the {worst[0]}.",
+            'action': f"Try a short exercise in the {worst[0]}"
+        })
+
+    best, worst = state.day_of_week()
+    if best and best[2] >= MIN_EFFECT and best[1] >= CONFIDENT_T:
+        insights.append({
+            'icon': "📅",
+            'title': f"Best Day: {best[0]}",
+            'description': f"{best[0]}s average {best[2]:.1f} points above your other days.",
+            'action': f"Notice what goes well on {best[0]}s"
+        })
+    if worst and worst[2] <= -MIN_EFFECT and worst[1] <= -CONFIDENT_T:
+        insights.append({
+            'icon': "🗓️",
+            'title': f"Harder Day: {worst[0]}",
+            'description': f"{worst[0]}s average {-worst[2]:.1f} points below your other days.",
+            'action': f"Schedule some self-care on {worst[0]}s"
+        })
+
+    slope = trend(views['daily'])
+    if slope is not None:
+        per_week, t, days = slope
+        if abs(t) >= CONFIDENT_T and abs(per_week) >= 0.1:
+            improving = per_week > 0
+            insights.append({
+                'icon': "📈" if improving else "📉",
+                'title': "Positive Trend" if improving else "Downward Trend",
+                'description': f"Over the last {days} days with check-ins your mood has "
+                               f"{'risen' if improving else 'fallen'} about {abs(per_week):.2f} points per week.",
+                'action': "Keep up current habits" if improving else "Reach out to someone you trust"
+            })
+        else:
+            insights.append({
+                'icon': "➖",
+                'title': "Steady Mood",
+                'description': f"No clear upward or downward trend over the last {days} days with check-ins.",
+                'action': "Keep checking in to spot changes early"
+            })
+
+    effects = exercise_effects(completions)
+    if effects and effects[0][1] > 0:
+        title, mean, count = effects[0]
+        insights.append({
+            'icon': "🧘",
+            'title': "What Helps You",
+            'description': f"{title} has lifted your mood by {mean:.1f} points on average over {count} sessions.",
+            'action': f"Try {title} on stressful days"
+        })
+
+    streak = views['current_streak']
+    goal = next_streak_goal(streak)
+    positive_days = views['positive_percent']
+    insights.append({
+        'icon': "🎯",
+        'title': "Streak Goal",
+        'description': f"You're on a {streak}-day check-in streak (best: {views['longest_streak']}). "
+                       f"{goal - streak} more to reach {goal} days."
+                       + (f" {positive_days:.0f}% of your days scored {POSITIVE_DAY_SCORE:.0f}+." if positive_days is not None else ""),
+        'action': "Check in today" if streak == 0 else "Keep the streak going"
+    })
+    return insights
@@ -0,0 +1,198 @@
+import sys
+import time
+import uuid
+import zlib
+from collections.abc import Sequence
+from datetime import datetime
+from enum import Enum
+from typing import NamedTuple, Optional
+
+class Role(str, Enum):
+    """Who authored a chat message"""
+    USER = 'user'
+    ASSISTANT = 'assistant'
+
+class Mood(str, Enum):
+    """Moods tracked on chat messages"""
+    POSITIVE = 'positive'
+    NEUTRAL = 'neutral'
+    ANXIOUS = 'anxious'
+    STRESSED = 'stressed'
+    NEGATIVE = 'negative'
+    CRISIS = 'crisis'
+
+    @property
+    def score(self):
+        """Mood on the 1-5 scale used by analytics"""
+        return MOOD_SCORES[self.value]
+
+    @classmethod
+    def coerce(cls, value, default=None):
+        """Map a mood string onto its shared enum member"""
+        if value is None or isinstance(value, cls):
+            return value if value is not None else default
+        try:
+            return cls(str(value).lower())
+        except ValueError:
+            return default
+
+# 1 (worst) to 5 (best), matching the Analytics page's mood score
+MOOD_SCORES = {
+    'positive': 5,
+    'neutral': 3,
+    'anxious': 2,
+    'stressed': 2,
+    'negative': 1,
+    'crisis': 1
+}
+
+def _parse_timestamp(value):
+    """Convert a datetime, ISO string or number to epoch seconds"""
+    if value is None:
+        return int(time.time())
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value).timestamp())
+    return int(value)
+
+class Message(NamedTuple):
+    """A single chat turn stored without a per-instance __dict__"""
+    role: Role
+    content: str
+    timestamp: int
+    mood: Optional[Mood] = None
+    kind: Optional[str] = None
+    needs_exercise: bool = False
+    events: tuple = ()
+    id: Optional[str] = None
+
+    @classmethod
+    def create(cls, role, content, mood=None, kind=None, needs_exercise=False, events=None, timestamp=None, message_id=None):
+        """Build a message, interning repeated values"""
+        return cls(
+            role=Role(role),
+            content=content,
+            timestamp=_parse_timestamp(timestamp),
+            mood=Mood.coerce(mood, Mood.NEUTRAL) if mood else None,
+            kind=sys.intern(kind) if kind else None,
+            needs_exercise=bool(needs_exercise),
+            events=tuple(events or ()),
+            id=message_id or uuid.uuid4().hex
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a message from its dict form"""
+        return cls.create(
+            data['role'],
+            data.get('content', ''),
+            mood=data.get('mood') or data.get('mood_detected'),
+            kind=data.get('type'),
+            needs_exercise=data.get('needs_exercise', False),
+            events=data.get('events'),
+            timestamp=data.get('timestamp'),
+            message_id=data.get('id')
+        )
+
+    @property
+    def is_user(self):
+        return self.role is Role.USER
+
+    @property
+    def created_at(self):
+        """Timestamp as a local datetime"""
+        return datetime.fromtimestamp(self.timestamp)
+
+    @property
+    def key(self):
+        """Stable identity, derived from content for messages saved before IDs existed"""
+        return self.id or f"{self.timestamp}:{self.role.value}:{zlib.crc32(self.content.encode())}"
+
+    @property
+    def mood_name(self):
+        """Mood value as a plain string, defaulting to neutral"""
+        return self.mood.value if self.mood else Mood.NEUTRAL.value
+
+    def to_dict(self):
+        """Plain dict form for persistence and export"""
+        data = {
+            'id': self.key,
+            'role': self.role.value,
+            'content': self.content,
+            'timestamp': self.created_at.isoformat()
+        }
+        if self.mood:
+            data['mood'] = self.mood.value
+        if self.kind:
+            data['type'] = self.kind
+        if self.needs_exercise:
+            data['needs_exercise'] = True
+        if self.events:
+            data['events'] = list(self.events)
+        return data
+
+class _LogView(Sequence):
+    """Read-only window over a conversation log that does not copy messages"""
+    __slots__ = ('_messages', '_range')
+
+    def __init__(self, messages, index_range):
+        self._messages = messages
+        self._range = index_range
+
+    def __len__(self):
+        return len(self._range)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return _LogView(self._messages, self._range[index])
+        return self._messages[self._range[index]]
+
+    def __iter__(self):
+        messages = self._messages
+        for i in self._range:
+            yield messages[i]
+
+    def to_records(self):
+        return [message.to_dict() for message in self]
+
+class ConversationLog(Sequence):
+    """Append-only conversation history with cheap slicing views"""
+    __slots__ = ('_messages',)
+
+    def __init__(self, messages=()):
+        self._messages = list(messages)
+
+    @classmethod
+    def from_records(cls, records):
+        return cls(Message.from_dict(record) for record in records)
+
+    def append(self, message):
+        self._messages.append(message)
+
+    def clear(self):
+        self._messages.clear()
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return _LogView(self._messages, range(len(self._messages))[index])
+        return self._messages[index]
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def __getstate__(self):
+        return (self._messages,)
+
+    def __setstate__(self, state):
+        self._messages, = state
+
+    def tail(self, count):
+        """View over the most recent messages"""
+        return self[-count:] if count > 0 else self[0:0]
+
+    def to_records(self):
+        return [message.to_dict() for message in self._messages]
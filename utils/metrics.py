@@ -0,0 +1,280 @@
+"""Process-wide counters, gauges and latency histograms in Prometheus format
+
+Metrics are defined once at import time and updated from the services:
+
+    FIRESTORE_ERRORS.inc(operation='save_conversation')
+    with GEMINI_LATENCY.time(method='generate_response'):
+        ...
+
+REGISTRY.render() returns the text exposition format, and
+start_metrics_server() serves it at /metrics for scraping. Labels must
+stay low-cardinality: never label by user or session.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds in seconds, from a cached Firestore read to a slow LLM reply
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}  # label values -> value
+        if not self.labelnames:
+            # Unlabelled series are reported from the start, so rates work from the first scrape
+            self._values[()] = self._zero()
+
+    def _zero(self):
+        return 0
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self._samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return '\n'.join(lines)
+
+class Counter(_Metric):
+    """Monotonic total, e.g. requests or errors"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        if not name.endswith('_total'):
+            name += '_total'
+        super().__init__(name, documentation, labelnames)
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only go up")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+class Gauge(_Metric):
+    """Value that goes up and down, set directly or read from a function at scrape time"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._functions = {}
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function, **labels):
+        """Report function() at each scrape instead of a stored value"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def value(self, **labels):
+        key = self._key(labels)
+        with self._lock:
+            function = self._functions.get(key)
+            if function is None:
+                return self._values.get(key, 0)
+        return function()
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                values[key] = function()
+            except Exception as e:
+                print(f"Error reading gauge {self.name}: {e}")
+                values.pop(key, None)
+        return [(self.name, key, (), value) for key, value in sorted(values.items())]
+
+class Histogram(_Metric):
+    """Distribution of observations, e.g. latencies in seconds, in cumulative buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(float(bound) for bound in buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames)
+
+    def _zero(self):
+        return ([0] * len(self.buckets), 0.0)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or self._zero()
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block; usable as a decorator too"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def _samples(self):
+        with self._lock:
+            entries = [(key, list(counts), total) for key, (counts, total) in sorted(self._values.items())]
+
+        samples = []
+        for key, counts, total in entries:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", key, (('le', _format_value(bound)),), cumulative))
+            samples.append((f"{self.name}_sum", key, (), total))
+            samples.append((f"{self.name}_count", key, (), cumulative))
+        return samples
+
+class MetricsRegistry:
+    """Named metrics, created once and rendered together"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **options):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **options)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered differently")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        if not name.endswith('_total'):
+            name += '_total'
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+GEMINI_LATENCY = REGISTRY.histogram(
+    'mindmate_gemini_request_seconds', "Time spent waiting on the Gemini model; fallbacks are not timed", ('method',)
+)
+GEMINI_ERRORS = REGISTRY.counter(
+    'mindmate_gemini_errors', "Gemini calls that raised and were answered by a fallback", ('method',)
+)
+GEMINI_FALLBACKS = REGISTRY.counter(
+    'mindmate_gemini_fallbacks', "Replies built without the model, by reason (disabled or error)", ('method', 'reason')
+)
+
+FIRESTORE_LATENCY = REGISTRY.histogram(
+    'mindmate_firestore_request_seconds', "Time spent in FirebaseService operations", ('operation',)
+)
+FIRESTORE_ERRORS = REGISTRY.counter(
+    'mindmate_firestore_errors', "FirebaseService operations that failed", ('operation',)
+)
+
+SESSION_INIT_LATENCY = REGISTRY.histogram(
+    'mindmate_session_init_seconds', "Time spent in init_session_state per script run"
+)
+SESSIONS_STARTED = REGISTRY.counter(
+    'mindmate_sessions_started', "Browser sessions that initialized their state"
+)
+SESSIONS = REGISTRY.gauge(
+    'mindmate_sessions', "Sessions tracked by the session manager, by memory state", ('state',)
+)
+TASK_QUEUE_DEPTH = REGISTRY.gauge(
+    'mindmate_task_queue_depth', "Background tasks waiting for a worker"
+)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the Streamlit log
+        pass
+
+def start_metrics_server(port, host='127.0.0.1', registry=REGISTRY):
+    """Serve registry at http://host:port/metrics from a daemon thread"""
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='mindmate-metrics', daemon=True)
+    thread.start()
+    return server
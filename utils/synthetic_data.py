@@ -0,0 +1,260 @@
+"""Seedable synthetic MindMate users for benchmarks and load tests
+
+    python -m utils.synthetic_data --users 10000 --years 2 --seed 7 \\
+        --store sqlite:///synthetic_sessions.db [--firestore --confirm-project ID]
+
+Every user is generated from its own (seed, user index) stream, so a user
+looks the same whatever --users is, and users are written one at a time.
+Users go to their own session store by default, never the app's
+MINDMATE_SESSION_STORE, since stored completions feed every user's
+exercise ranking. Firestore writes need the target project confirmed.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from utils.analytics_engine import CHAT_MOOD_NOTE
+from utils.exercise_catalog import get_exercise_catalog
+from utils.exercise_ranking import completion_record
+from utils.messages import ConversationLog, Message, Role
+
+# Score thresholds turning the latent 1-5 mood into a mood label
+MOOD_CUTS = (1.8, 2.5, 3.4)
+
+# Weekday offsets to the latent mood, Monday first
+WEEKLY_PATTERN = np.array([-0.25, -0.1, 0.0, 0.05, 0.15, 0.35, 0.3])
+
+# Amplitude of the yearly swing, lowest in midwinter
+SEASONAL_AMPLITUDE = 0.3
+
+# Day-to-day persistence of the mood noise
+AR_COEFFICIENT = 0.6
+
+# Check-in hours and how often each is picked
+CHECK_IN_HOURS = np.array([7, 8, 9, 12, 13, 18, 19, 20, 21, 22])
+CHECK_IN_WEIGHTS = np.array([0.08, 0.14, 0.1, 0.08, 0.07, 0.1, 0.12, 0.13, 0.11, 0.07])
+
+USER_MESSAGES = {
+    'positive': ("Today went really well!", "I'm feeling great after my walk.", "Had a lovely time with friends."),
+    'neutral': ("Just a normal day.", "Nothing special happened today.", "Work was okay I guess."),
+    'anxious': ("I'm worried about my presentation tomorrow.", "I feel nervous and can't focus.",
+                "My exam is coming up and I'm anxious."),
+    'stressed': ("Work is overwhelming right now.", "Too many deadlines this week.", "I'm so stressed about money."),
+    'negative': ("I feel really down today.", "Everything feels hard lately.", "I've been sad all week.")
+}
+
+ASSISTANT_MESSAGES = {
+    'positive': "That's wonderful to hear! What made today feel so good?",
+    'neutral': "Thanks for checking in. Is there anything on your mind?",
+    'anxious': "That sounds stressful. Would a short breathing exercise help right now?",
+    'stressed': "That's a lot to carry. Let's break it into smaller pieces together.",
+    'negative': "I'm sorry you're feeling this way. I'm here to listen."
+}
+
+EVENTS = (
+    ('job interview', 'work'), ('exam', 'school'), ('presentation', 'work'),
+    ('doctor appointment', 'health'), ('family visit', 'personal'), ('deadline', 'work')
+)
+
+MOOD_NAMES = ('negative', 'stressed', 'neutral', 'positive')
+
+def _mood_labels(latent, rng):
+    """Mood labels for latent scores; the middle-low band splits into anxious or stressed"""
+    labels = np.array(MOOD_NAMES, dtype=object)[np.searchsorted(MOOD_CUTS, latent)]
+    low = labels == 'stressed'
+    labels[low & (rng.random(len(labels)) < 0.5)] = 'anxious'
+    return labels
+
+def generate_user(user_index, years=1, seed=0, end=None):
+    """One synthetic user's session fields plus their extracted events
+
+    Returns a dict with user_id, user_profile, current_mood, mood_history,
+    conversation_history, exercise_completions and events.
+    """
+    rng = np.random.default_rng([seed, user_index])
+    end = (end or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    days = int(years * 365)
+    dates = [end - timedelta(days=days - 1 - i) for i in range(days)]
+
+    # Latent daily mood: personal baseline + weekly + seasonal + AR(1) noise
+    baseline = rng.normal(3.3, 0.4)
+    weekday = np.array([date.weekday() for date in dates])
+    day_of_year = np.array([date.timetuple().tm_yday for date in dates])
+    seasonal = SEASONAL_AMPLITUDE * -np.cos(2 * np.pi * (day_of_year - 15) / 365.25)
+    shocks = rng.normal(0, 0.55, days)
+    noise = np.empty(days)
+    noise[0] = shocks[0]
+    for i in range(1, days):
+        noise[i] = AR_COEFFICIENT * noise[i - 1] + shocks[i]
+    latent = np.clip(baseline + WEEKLY_PATTERN[weekday] + seasonal + noise, 1, 5)
+
+    # Engagement: how often this user checks in and chats
+    check_in_rate = rng.beta(2, 2)
+    entries = rng.poisson(check_in_rate * 1.6, days) * (rng.random(days) < 0.2 + 0.75 * check_in_rate)
+    entry_day = np.repeat(np.arange(days), entries)
+    entry_hour = rng.choice(CHECK_IN_HOURS, len(entry_day), p=CHECK_IN_WEIGHTS / CHECK_IN_WEIGHTS.sum())
+    entry_minute = rng.integers(0, 60, len(entry_day))
+    entry_latent = latent[entry_day] + rng.normal(0, 0.3, len(entry_day))
+    entry_moods = _mood_labels(entry_latent, rng)
+    chatted = rng.random(len(entry_day)) < 0.35
+
+    mood_history = []
+    conversation = ConversationLog()
+    events = []
+    for day, hour, minute, mood, chat in zip(entry_day, entry_hour, entry_minute, entry_moods, chatted):
+        timestamp = dates[day] + timedelta(hours=int(hour), minutes=int(minute))
+        mood_history.append({
+            'mood': mood,
+            'description': CHAT_MOOD_NOTE if chat else "",
+            'timestamp': timestamp,
+            'date': timestamp.date().isoformat()
+        })
+        if not chat:
+            continue
+
+        message_events = ()
+        if rng.random() < 0.1:
+            description, kind = EVENTS[rng.integers(len(EVENTS))]
+            event = {
+                'description': description,
+                'date': (timestamp + timedelta(days=int(rng.integers(1, 14)))).date().isoformat(),
+                'type': kind
+            }
+            message_events = (event,)
+            events.append(event)
+
+        options = USER_MESSAGES[mood]
+        conversation.append(Message.create(Role.USER, options[rng.integers(len(options))], timestamp=timestamp))
+        conversation.append(Message.create(
+            Role.ASSISTANT, ASSISTANT_MESSAGES[mood], mood=mood,
+            needs_exercise=mood in ('anxious', 'stressed', 'negative'),
+            events=message_events, timestamp=timestamp + timedelta(seconds=int(rng.integers(2, 20)))
+        ))
+
+    exercise_completions = []
+    exercises = tuple(get_exercise_catalog())
+    if exercises:
+        # Each user responds to each exercise a little differently
+        effects = rng.normal(0.6, 0.5, len(exercises))
+        low_days = np.flatnonzero(latent < 2.8)
+        sessions = low_days[rng.random(len(low_days)) < 0.25 * check_in_rate]
+        for day in sessions:
+            choice = rng.integers(len(exercises))
+            before = _mood_labels(latent[day:day + 1], rng)[0]
+            after = _mood_labels(latent[day:day + 1] + effects[choice] + rng.normal(0, 0.4, 1), rng)[0]
+            timestamp = dates[day] + timedelta(hours=int(rng.choice(CHECK_IN_HOURS)), minutes=30)
+            exercise_completions.append(completion_record(
+                exercises[choice].id, exercises[choice].title, before, after, timestamp
+            ))
+
+    created_at = dates[0]
+    return {
+        'user_id': f"synthetic-{seed}-{user_index}",
+        'user_profile': {
+            'name': f"User {user_index}",
+            'age_range': '',
+            'goals': [],
+            'preferences': [],
+            'notifications': True,
+            'privacy_level': 'Medium',
+            'created_at': created_at
+        },
+        'current_mood': mood_history[-1]['mood'] if mood_history else 'neutral',
+        'mood_history': mood_history,
+        'conversation_history': conversation,
+        'exercise_completions': exercise_completions,
+        'events': events
+    }
+
+def iter_users(users, years=1, seed=0, start=0, end=None):
+    """Generate users start .. start + users - 1, one at a time"""
+    for user_index in range(start, start + users):
+        yield generate_user(user_index, years=years, seed=seed, end=end)
+
+def write_session_store(store, user):
+    """Save a generated user's session fields, replacing any stored session"""
+    from services.session_store import PERSISTED_FIELDS
+
+    state = {field: user[field] for field in PERSISTED_FIELDS if field in user}
+    return store.save(user['user_id'], state, store.version(user['user_id']))
+
+# Session store written when --store is not given
+DEFAULT_STORE = 'sqlite:///synthetic_sessions.db'
+
+# Firestore caps a batch at 500 writes
+FIRESTORE_BATCH_SIZE = 500
+
+def write_firestore(firebase, user):
+    """Write a generated user's history into the Firestore collections the app reads"""
+    if not firebase.enabled:
+        return 0
+
+    user_id = user['user_id']
+    documents = [('mood_entries', dict(entry, user_id=user_id)) for entry in user['mood_history']]
+
+    messages = list(user['conversation_history'])
+    for question, answer in zip(messages[::2], messages[1::2]):
+        documents.append(('conversations', {
+            'user_id': user_id,
+            'user_message': question.content,
+            'ai_response': answer.content,
+            'mood_detected': answer.mood_name,
+            'events': list(answer.events or ()),
+            'timestamp': question.created_at
+        }))
+    documents.extend(
+        ('events', dict(event, user_id=user_id, timestamp=datetime.fromisoformat(event['date'])))
+        for event in user['events']
+    )
+    documents.extend(
+        ('exercise_completions', dict(record, user_id=user_id)) for record in user['exercise_completions']
+    )
+
+    for start in range(0, len(documents), FIRESTORE_BATCH_SIZE):
+        batch = firebase.db.batch()
+        for collection, data in documents[start:start + FIRESTORE_BATCH_SIZE]:
+            batch.set(firebase.db.collection(collection).document(), data)
+        batch.commit()
+    return len(documents)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic MindMate users into storage")
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--years', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--start', type=int, default=0, help="first user index, to extend an earlier run")
+    parser.add_argument('--store', help=f"session store URL (default: {DEFAULT_STORE}, or none with --firestore)")
+    parser.add_argument('--firestore', action='store_true', help="also write to the configured Firestore project")
+    parser.add_argument('--confirm-project', help="ID of the Firestore project to write, required with --firestore")
+    args = parser.parse_args(argv)
+    if args.firestore and not args.confirm_project:
+        parser.error("--firestore writes fake users into a real project; name it with --confirm-project")
+
+    from services.session_store import create_session_store
+
+    store_url = args.store or (None if args.firestore else DEFAULT_STORE)
+    store = create_session_store(store_url) if store_url else None
+    firebase = None
+    if args.firestore:
+        from services.firebase_service import FirebaseService
+        firebase = FirebaseService()
+        project = getattr(firebase.db, 'project', None) if firebase.enabled else None
+        if project != args.confirm_project:
+            parser.error(f"Firestore project is {project}, not {args.confirm_project}; nothing written")
+
+    started = time.perf_counter()
+    entries = 0
+    for count, user in enumerate(iter_users(args.users, args.years, args.seed, args.start), 1):
+        if store is not None:
+            write_session_store(store, user)
+        if firebase is not None:
+            write_firestore(firebase, user)
+        entries += len(user['mood_history'])
+        if count % 500 == 0 or count == args.users:
+            elapsed = time.perf_counter() - started
+            print(f"{count} users, {entries} mood entries, {elapsed:.1f}s ({count / elapsed:.0f} users/s)")
+
+if __name__ == '__main__':
+    main()
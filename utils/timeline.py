@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from utils.chat_renderer import MOOD_EMOJIS
+
+# Period choices for the Recent Activity timeline, in days; None means all
+TIMELINE_PERIODS = {
+    'Last 7 days': 7,
+    'Last 30 days': 30,
+    'Last 90 days': 90,
+    'Last year': 365,
+    'All time': None
+}
+
+# Scroll instead of growing the page once the list is taller than this
+TIMELINE_MAX_HEIGHT = 480
+
+# Shared row styling, sent once instead of inline on every entry
+TIMELINE_STYLE = """
+<style>
+    .mm-timeline { max-height: %dpx; overflow-y: auto; }
+    .mm-timeline-row {
+        display: flex;
+        justify-content: space-between;
+        align-items: center;
+        padding: 10px;
+        margin: 5px 0;
+        background: #f8f9fa;
+        border-radius: 5px;
+        border-left: 4px solid var(--mood-color);
+    }
+    .mm-timeline-row .mm-mood { color: var(--mood-color); }
+    .mm-timeline-row small { color: #888; margin-left: 8px; }
+</style>
+""" % TIMELINE_MAX_HEIGHT
+
+def timeline_days(daily, days=7, today=None):
+    """Days with a check-in in the last `days` calendar days, newest first"""
+    active = daily[daily['count'].to_numpy() > 0]
+    if days is not None and len(active):
+        today = pd.Timestamp(today or pd.Timestamp.now()).normalize()
+        active = active[active.index > today - pd.Timedelta(days=days)]
+    return active.iloc[::-1]
+
+def timeline_html(days, colors, emojis=MOOD_EMOJIS):
+    """Markup for a whole timeline, built column-wise in one pass
+
+    days is a frame from timeline_days(); colors maps mood to CSS color.
+    """
+    if days.empty:
+        return ''
+
+    moods = days['mood'].fillna('neutral').astype(str)
+    counts = days['count'].to_numpy()
+    check_ins = np.where(counts == 1, '1 check-in', counts.astype(str).astype(object) + ' check-ins')
+
+    # Mood-dependent markup is built once per mood, not once per row
+    openings = {
+        mood: f'<div class="mm-timeline-row" style="--mood-color: {colors.get(mood, "#6c757d")};"><span><strong>'
+        for mood in moods.unique()
+    }
+    labels = {
+        mood: f'</small></span><span class="mm-mood">{emojis.get(mood, "😐")} {mood.title()} <small>'
+        for mood in openings
+    }
+
+    index = days.index
+    dates = index.month_name() + ' ' + pd.Index(index.day).astype(str).str.zfill(2) + ', ' + pd.Index(index.year).astype(str)
+
+    rows = (
+        moods.map(openings).to_numpy()
+        + dates.to_numpy(dtype=object)
+        + '</strong><small>' + check_ins
+        + moods.map(labels).to_numpy()
+        + days['score'].round(1).astype(str).to_numpy()
+        + '/5</small></span></div>'
+    )
+    return TIMELINE_STYLE + '<div class="mm-timeline">' + ''.join(rows) + '</div>'
@@ -0,0 +1,144 @@
+import json
+import time
+from datetime import datetime
+
+import streamlit as st
+import streamlit.components.v1 as components
+from utils.exercise_ranking import completion_record
+from utils.helpers import get_outcome_stats
+
+# Start/pause/complete events kept per session
+MAX_EXERCISE_EVENTS = 200
+
+# Seconds per phase of the quick breathing exercise
+BREATHING_PATTERN = (
+    ('Breathe in...', 4),
+    ('Hold...', 2),
+    ('Breathe out...', 4)
+)
+
+def _timer_key(key):
+    return f'timer_{key}'
+
+def get_timer(key):
+    """Timer state for key, or None if it was never started"""
+    return st.session_state.get(_timer_key(key))
+
+def timer_remaining(timer, now=None):
+    """Seconds left on a timer, counting time since it was last resumed"""
+    elapsed = timer['elapsed']
+    if timer['started_at'] is not None:
+        elapsed += (now or time.time()) - timer['started_at']
+    return max(0.0, timer['duration'] - elapsed)
+
+def start_timer(key, duration_seconds):
+    """Start or resume a countdown; the browser does the ticking"""
+    timer = get_timer(key)
+    if timer is None or timer_remaining(timer) <= 0:
+        timer = {'duration': duration_seconds, 'elapsed': 0.0, 'started_at': None}
+    if timer['started_at'] is None:
+        timer['started_at'] = time.time()
+    st.session_state[_timer_key(key)] = timer
+    return timer
+
+def pause_timer(key):
+    timer = get_timer(key)
+    if timer and timer['started_at'] is not None:
+        timer['elapsed'] += time.time() - timer['started_at']
+        timer['started_at'] = None
+    return timer
+
+def reset_timer(key):
+    st.session_state.pop(_timer_key(key), None)
+
+def record_exercise_event(exercise, event, mood=None, exercise_id=None, mood_after=None):
+    """Log a start, pause or complete event; completions are also kept for ranking and analytics"""
+    entry = {
+        'exercise': exercise,
+        'event': event,
+        'mood': mood,
+        'timestamp': datetime.now()
+    }
+
+    events = st.session_state.setdefault('exercise_events', [])
+    events.append(entry)
+    if len(events) > MAX_EXERCISE_EVENTS:
+        del events[:-MAX_EXERCISE_EVENTS]
+
+    if event == 'complete':
+        completion = completion_record(exercise_id, exercise, mood, mood_after, entry['timestamp'])
+        st.session_state.setdefault('exercise_completions', []).append(completion)
+        if exercise_id and completion['improvement'] is not None:
+            get_outcome_stats().record(exercise_id, completion['improvement'])
+    return entry
+
+def render_countdown(timer, height=90):
+    """Client-side countdown display for a timer's current state"""
+    remaining = timer_remaining(timer)
+    running = timer['started_at'] is not None
+
+    components.html(f"""
+    <div id="countdown" style="font-family: sans-serif; font-size: 2rem; font-weight: 600; color: #333;"></div>
+    <script>
+        const running = {json.dumps(running)};
+        const endsAt = Date.now() + {remaining * 1000:.0f};
+        const remainingAtLoad = {remaining:.3f};
+        const el = document.getElementById('countdown');
+
+        function draw() {{
+            const left = running ? Math.max(0, (endsAt - Date.now()) / 1000) : remainingAtLoad;
+            const seconds = Math.ceil(left);
+            const mm = String(Math.floor(seconds / 60)).padStart(2, '0');
+            const ss = String(seconds % 60).padStart(2, '0');
+            el.textContent = left > 0
+                ? '⏰ ' + mm + ':' + ss + (running ? '' : ' (paused)')
+                : '🎉 Time is up! Mark the exercise complete when you are ready.';
+            if (running && left > 0) {{
+                setTimeout(draw, 250);
+            }}
+        }}
+        draw();
+    </script>
+    """, height=height)
+
+def render_breathing(started_at, total_seconds=60, pattern=BREATHING_PATTERN, height=120):
+    """Client-side guided breathing with a progress bar, resuming from started_at"""
+    phases = [[label, seconds] for label, seconds in pattern]
+    elapsed = max(0.0, time.time() - started_at)
+
+    components.html(f"""
+    <div style="font-family: sans-serif;">
+        <div id="phase" style="font-size: 1.2rem; margin-bottom: 0.5rem;"></div>
+        <div style="background: #eee; border-radius: 6px; height: 12px;">
+            <div id="bar" style="background: #667eea; border-radius: 6px; height: 12px; width: 0%;"></div>
+        </div>
+    </div>
+    <script>
+        const phases = {json.dumps(phases)};
+        const cycle = phases.reduce((sum, p) => sum + p[1], 0);
+        const total = {total_seconds};
+        const startedAt = Date.now() - {elapsed * 1000:.0f};
+        const phaseEl = document.getElementById('phase');
+        const barEl = document.getElementById('bar');
+
+        function draw() {{
+            const elapsed = (Date.now() - startedAt) / 1000;
+            if (elapsed >= total) {{
+                phaseEl.textContent = '🎉 Complete! How do you feel?';
+                barEl.style.width = '100%';
+                return;
+            }}
+            let t = elapsed % cycle;
+            for (const [label, seconds] of phases) {{
+                if (t < seconds) {{
+                    phaseEl.textContent = label + ' ' + (Math.floor(t) + 1) + '/' + seconds;
+                    break;
+                }}
+                t -= seconds;
+            }}
+            barEl.style.width = (100 * elapsed / total) + '%';
+            setTimeout(draw, 200);
+        }}
+        draw();
+    </script>
+    """, height=height)
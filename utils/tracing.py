@@ -0,0 +1,299 @@
+"""Lightweight tracing of page runs and service calls
+
+Nothing is recorded until an exporter is configured:
+
+    MINDMATE_TRACE_EXPORTER=jsonl:///mindmate_spans.jsonl
+    MINDMATE_TRACE_EXPORTER=otlp-file:////var/log/mindmate/traces.jsonl
+    MINDMATE_TRACE_SAMPLE_RATE=0.05
+
+The sampling decision is made once per trace, at its root span, and every
+span in the trace inherits it. A page run that is not sampled therefore
+costs one random() call plus a context lookup per span. Finished spans go
+on a bounded queue, and a background thread writes them out in batches.
+"""
+import atexit
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    from streamlit.runtime.scriptrunner import RerunException, StopException
+
+    # st.rerun() and st.stop() end a script run early without failing it
+    CONTROL_FLOW_EXCEPTIONS = (RerunException, StopException)
+except ImportError:
+    CONTROL_FLOW_EXCEPTIONS = ()
+
+# Finished spans held for export; the oldest are dropped beyond this
+MAX_QUEUED_SPANS = 10000
+EXPORT_BATCH_SIZE = 512
+EXPORT_INTERVAL_SECONDS = 2.0
+
+SERVICE_NAME = 'mindmate'
+
+_current_span = contextvars.ContextVar('mindmate_current_span', default=None)
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    sampled = True
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def record_exception(self, exc):
+        """Mark the span failed for an exception the caller handles itself"""
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start_ns / 1e9,
+            'duration_ms': round(self.duration_ms, 3),
+            'status': 'error' if self.error else 'ok',
+            'error': self.error,
+            'attributes': self.attributes
+        }
+
+class _UnsampledSpan:
+    """Stands in for every span of a trace that is not recorded"""
+
+    sampled = False
+
+    def set(self, **attributes):
+        pass
+
+    def record_exception(self, exc):
+        pass
+
+UNSAMPLED = _UnsampledSpan()
+
+def current_span():
+    """The innermost open span on this thread or task, if any"""
+    return _current_span.get() or UNSAMPLED
+
+class JsonlExporter:
+    """One JSON object per span, appended to a file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = ''.join(json.dumps(span.to_dict(), default=str) + '\n' for span in spans)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def _otlp_attributes(attributes):
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+class OtlpFileExporter(JsonlExporter):
+    """OTLP/JSON trace requests, one per line, as the OpenTelemetry Collector's file exporter writes them"""
+
+    def __init__(self, path, service_name=SERVICE_NAME):
+        super().__init__(path)
+        self.resource = {'attributes': _otlp_attributes({'service.name': service_name})}
+
+    def export(self, spans):
+        request = {'resourceSpans': [{
+            'resource': self.resource,
+            'scopeSpans': [{
+                'scope': {'name': SERVICE_NAME},
+                'spans': [{
+                    'traceId': span.trace_id,
+                    'spanId': span.span_id,
+                    'parentSpanId': span.parent_id or '',
+                    'name': span.name,
+                    'kind': 1,  # SPAN_KIND_INTERNAL
+                    'startTimeUnixNano': str(span.start_ns),
+                    'endTimeUnixNano': str(span.end_ns),
+                    'attributes': _otlp_attributes(span.attributes),
+                    'status': {'code': 2, 'message': span.error} if span.error else {'code': 1}
+                } for span in spans]
+            }]
+        }]}
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(request, default=str) + '\n')
+
+# URL scheme -> factory taking the rest of the URL
+TRACE_EXPORTERS = {
+    'jsonl': JsonlExporter,
+    'otlp-file': OtlpFileExporter
+}
+
+def register_trace_exporter(scheme, factory):
+    """Make a span exporter available under a URL scheme
+
+    The factory gets the rest of the URL and returns an object with an
+    export(spans) method.
+    """
+    TRACE_EXPORTERS[scheme] = factory
+
+def create_trace_exporter(url):
+    """Build an exporter from a URL such as jsonl:///mindmate_spans.jsonl"""
+    scheme, _, location = url.partition('://')
+    factory = TRACE_EXPORTERS.get(scheme)
+    if factory is None:
+        raise ValueError(f"Unsupported trace exporter: {url}")
+    # jsonl:///relative.jsonl and jsonl:////absolute/path.jsonl, as for sqlite session stores
+    return factory(location[1:] if location.startswith('/') else location)
+
+class Tracer:
+    """Creates spans and hands finished, sampled ones to an exporter"""
+
+    def __init__(self, exporter=None, sample_rate=1.0, max_queue=MAX_QUEUED_SPANS):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._queue = deque(maxlen=max_queue)
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._worker = None
+        self.counts = {'finished': 0, 'exported': 0, 'dropped': 0, 'export_errors': 0}
+
+    @property
+    def enabled(self):
+        return self.exporter is not None and self.sample_rate > 0
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the block as a child of the current span, or as a new trace"""
+        parent = _current_span.get()
+        if not self.enabled or parent is UNSAMPLED:
+            yield UNSAMPLED
+            return
+        if parent is None and random.random() >= self.sample_rate:
+            token = _current_span.set(UNSAMPLED)
+            try:
+                yield UNSAMPLED
+            finally:
+                _current_span.reset(token)
+            return
+
+        span = Span(name, parent, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except CONTROL_FLOW_EXCEPTIONS:
+            raise
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span):
+        with self._lock:
+            self.counts['finished'] += 1
+            if len(self._queue) == self._queue.maxlen:
+                self.counts['dropped'] += 1
+            self._queue.append(span)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._export_loop, name='mindmate-tracing', daemon=True)
+                self._worker.start()
+        if len(self._queue) >= EXPORT_BATCH_SIZE:
+            self._wake.set()
+
+    def _export_loop(self):
+        while True:
+            self._wake.wait(EXPORT_INTERVAL_SECONDS)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Export every queued span now"""
+        while True:
+            with self._lock:
+                batch = [self._queue.popleft() for _ in range(min(EXPORT_BATCH_SIZE, len(self._queue)))]
+            if not batch:
+                return
+            try:
+                self.exporter.export(batch)
+                with self._lock:
+                    self.counts['exported'] += len(batch)
+            except Exception as e:
+                with self._lock:
+                    self.counts['export_errors'] += 1
+                print(f"Error exporting {len(batch)} spans: {e}")
+                return
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, queued=len(self._queue))
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+def get_tracer():
+    """Process-wide tracer configured from MINDMATE_TRACE_EXPORTER and MINDMATE_TRACE_SAMPLE_RATE"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                url = os.getenv('MINDMATE_TRACE_EXPORTER')
+                exporter = None
+                if url:
+                    try:
+                        exporter = create_trace_exporter(url)
+                    except Exception as e:
+                        print(f"Tracing disabled: {e}")
+                _tracer = Tracer(exporter, float(os.getenv('MINDMATE_TRACE_SAMPLE_RATE', 1.0)))
+                if exporter is not None:
+                    atexit.register(_tracer.flush)
+    return _tracer
+
+def span(name, **attributes):
+    """Span on the process-wide tracer: with span('gemini.parse', chars=n): ..."""
+    return get_tracer().span(name, **attributes)
+
+def traced(name=None, **attributes):
+    """Decorator form of span() on the process-wide tracer, resolved per call"""
+    def decorate(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(span_name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def propagate(fn):
+    """Wrap fn to run in the caller's trace context, for handing work to another thread"""
+    context = contextvars.copy_context()
+    return functools.partial(context.run, fn)